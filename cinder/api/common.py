@@ -14,6 +14,7 @@
 #    under the License.
 
 
+import base64
 import os
 import re
 
@@ -23,6 +24,7 @@ import webob
 
 from cinder.api.openstack import wsgi
 from cinder.api import xmlutil
+from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder import utils
 
@@ -37,6 +39,12 @@ api_common_opts = [
                help='Base URL that will be presented to users in links '
                     'to the OpenStack Volume API',
                deprecated_name='osapi_compute_link_prefix'),
+    cfg.BoolOpt('osapi_keyset_pagination',
+                default=False,
+                help='Page volume, snapshot and backup listings by '
+                     'cursor: next links carry the sort key values of '
+                     'the last item instead of its id, so that the next '
+                     'page is a single indexed range query'),
 ]
 
 CONF = cfg.CONF
@@ -102,6 +110,42 @@ def _get_marker_param(request):
     return request.GET['marker']
 
 
+def use_keyset_pagination(request):
+    """Whether request is paged with keyset pagination cursors."""
+    return 'cursor' in request.GET or CONF.osapi_keyset_pagination
+
+
+def get_keyset_params(request, max_limit=CONF.osapi_max_limit):
+    """Return cursor, limit tuple for keyset pagination of request.
+
+    The cursor is the decoded 'cursor' GET variable, or None for the first
+    page.  Unlike with limited(), the limit is enforced by the database,
+    so it always is at most max_limit.
+    """
+    cursor = None
+    if 'cursor' in request.GET:
+        cursor = decode_cursor(request.GET['cursor'])
+    limit = _get_limit_param(request) if 'limit' in request.GET else 0
+    return cursor, min(max_limit, limit or max_limit)
+
+
+def encode_cursor(values):
+    """Encode the sort key values of the last item of a page as a cursor."""
+    return base64.urlsafe_b64encode(jsonutils.dumps(values))
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by encode_cursor() or fail."""
+    try:
+        values = jsonutils.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        values = None
+    if not isinstance(values, list):
+        msg = _('cursor param is not valid')
+        raise webob.exc.HTTPBadRequest(explanation=msg)
+    return values
+
+
 def limited(items, request, max_limit=CONF.osapi_max_limit):
     """Return a slice of items according to requested offset and limit.
 
@@ -216,10 +260,12 @@ class ViewBuilder(object):
                 {"rel": "bookmark",
                  "href": self._get_bookmark_link(request, identifier), }]
 
-    def _get_next_link(self, request, identifier):
+    def _get_next_link(self, request, identifier, key="marker"):
         """Return href string with proper limit and marker params."""
         params = request.params.copy()
-        params["marker"] = identifier
+        params.pop("marker", None)
+        params.pop("cursor", None)
+        params[key] = identifier
         prefix = self._update_link_prefix(request.application_url,
                                           CONF.osapi_volume_base_URL)
         url = os.path.join(prefix,
@@ -246,13 +292,17 @@ class ViewBuilder(object):
                             self._collection_name,
                             str(identifier))
 
-    def _get_collection_links(self, request, items, id_key="uuid"):
+    def _get_collection_links(self, request, items, id_key="uuid",
+                              keyset=False):
         """Retrieve 'next' link, if applicable. This is included if:
         1) 'limit' param is specified and equals the number of volumes.
         2) 'limit' param is specified but it exceeds CONF.osapi_max_limit,
         in this case the number of volumes is CONF.osapi_max_limit.
         3) 'limit' param is NOT specified but the number of volumes is
         CONF.osapi_max_limit.
+
+        Only collections whose listing honors a cursor pass keyset=True,
+        their next link then carries a cursor in keyset mode.
         """
         links = []
         max_items = min(
@@ -260,6 +310,16 @@ class ViewBuilder(object):
             CONF.osapi_max_limit)
         if max_items and max_items == len(items):
             last_item = items[-1]
+            if keyset and use_keyset_pagination(request):
+                sort_key = request.params.get("sort_key", "created_at")
+                cursor = encode_cursor([last_item[sort_key],
+                                        last_item["created_at"],
+                                        last_item["id"]])
+                links.append({
+                    "rel": "next",
+                    "href": self._get_next_link(request, cursor, "cursor"),
+                })
+                return links
             if id_key in last_item:
                 last_item_id = last_item[id_key]
             else:
@@ -197,8 +197,15 @@ class BackupsController(wsgi.Controller):
     def _get_backups(self, req, is_detail):
         """Returns a list of backups, transformed through view builder."""
         context = req.environ['cinder.context']
-        backups = self.backup_api.get_all(context)
-        limited_list = common.limited(backups, req)
+        if common.use_keyset_pagination(req):
+            cursor, limit = common.get_keyset_params(req)
+            limited_list = self.backup_api.get_all(
+                context, limit=limit,
+                sort_key=req.params.get('sort_key', 'created_at'),
+                sort_dir=req.params.get('sort_dir', 'desc'), cursor=cursor)
+        else:
+            backups = self.backup_api.get_all(context)
+            limited_list = common.limited(backups, req)
 
         if is_detail:
             backups = self._view_builder.detail_list(req, limited_list)
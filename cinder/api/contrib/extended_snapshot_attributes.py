@@ -37,8 +37,11 @@ class ExtendedSnapshotAttributesController(wsgi.Controller):
                                                                    **kwargs)
         self.volume_api = volume.API()
 
-    def _get_snapshots(self, context):
-        snapshots = self.volume_api.get_all_snapshots(context)
+    def _get_snapshots(self, context, snapshot_ids):
+        # NOTE: with a sort key the filters are applied by the database,
+        # where a list of ids is a single IN test.
+        snapshots = self.volume_api.get_all_snapshots(
+            context, search_opts={'id': snapshot_ids}, sort_key='created_at')
         rval = dict((snapshot['id'], snapshot) for snapshot in snapshots)
         return rval
 
@@ -71,7 +74,11 @@ class ExtendedSnapshotAttributesController(wsgi.Controller):
             resp_obj.attach(xml=ExtendedSnapshotAttributesTemplate())
 
             snapshots = list(resp_obj.obj.get('snapshots', []))
-            db_snapshots = self._get_snapshots(context)
+            # The snapshots controller caches the page it listed.
+            db_snapshots = req.cached_resource()
+            if db_snapshots is None:
+                db_snapshots = self._get_snapshots(
+                    context, [snapshot['id'] for snapshot in snapshots])
 
             for snapshot_object in snapshots:
                 try:
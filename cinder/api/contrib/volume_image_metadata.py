@@ -33,10 +33,11 @@ class VolumeImageMetadataController(wsgi.Controller):
         super(VolumeImageMetadataController, self).__init__(*args, **kwargs)
         self.volume_api = volume.API()
 
-    def _get_all_images_metadata(self, context):
-        """Returns the image metadata for all volumes."""
+    def _get_all_images_metadata(self, context, volume_ids=None):
+        """Returns the image metadata for all volumes, or the given ones."""
         try:
-            all_metadata = self.volume_api.get_volumes_image_metadata(context)
+            all_metadata = self.volume_api.get_volumes_image_metadata(
+                context, volume_ids=volume_ids)
         except Exception as e:
             LOG.debug('Problem retrieving volume image metadata. '
                       'It will be skipped. Error: %s', e)
@@ -75,8 +76,11 @@ class VolumeImageMetadataController(wsgi.Controller):
         context = req.environ['cinder.context']
         if authorize(context):
             resp_obj.attach(xml=VolumesImageMetadataTemplate())
-            all_meta = self._get_all_images_metadata(context)
-            for volume in list(resp_obj.obj.get('volumes', [])):
+            volumes = list(resp_obj.obj.get('volumes', []))
+            # Only the metadata of the volumes of this page is needed.
+            all_meta = self._get_all_images_metadata(
+                context, volume_ids=[volume['id'] for volume in volumes])
+            for volume in volumes:
                 image_meta = all_meta.get(volume['id'], {})
                 self._add_image_metadata(context, volume, image_meta)
 
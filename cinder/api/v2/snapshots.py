@@ -20,6 +20,7 @@ from webob import exc
 
 from cinder.api import common
 from cinder.api.openstack import wsgi
+from cinder.api.v2.views import snapshots as snapshot_views
 from cinder.api.v2 import volumes
 from cinder.api import xmlutil
 from cinder import exception
@@ -95,6 +96,8 @@ class SnapshotsTemplate(xmlutil.TemplateBuilder):
 class SnapshotsController(wsgi.Controller):
     """The Volumes API controller for the OpenStack API."""
 
+    _view_builder_class = snapshot_views.ViewBuilder
+
     def __init__(self, ext_mgr=None):
         self.volume_api = volume.API()
         self.ext_mgr = ext_mgr
@@ -147,6 +150,12 @@ class SnapshotsController(wsgi.Controller):
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
 
+        keyset = common.use_keyset_pagination(req)
+        if keyset:
+            search_opts.pop('cursor', None)
+            sort_key = search_opts.pop('sort_key', 'created_at')
+            sort_dir = search_opts.pop('sort_dir', 'desc')
+
         #filter out invalid option
         allowed_search_options = ('status', 'volume_id', 'name')
         volumes.remove_invalid_options(context, search_opts,
@@ -157,11 +166,23 @@ class SnapshotsController(wsgi.Controller):
             search_opts['display_name'] = search_opts['name']
             del search_opts['name']
 
-        snapshots = self.volume_api.get_all_snapshots(context,
-                                                      search_opts=search_opts)
-        limited_list = common.limited(snapshots, req)
+        if keyset:
+            cursor, limit = common.get_keyset_params(req)
+            limited_list = self.volume_api.get_all_snapshots(
+                context, search_opts=search_opts, limit=limit,
+                sort_key=sort_key, sort_dir=sort_dir, cursor=cursor)
+        else:
+            snapshots = self.volume_api.get_all_snapshots(
+                context, search_opts=search_opts)
+            limited_list = common.limited(snapshots, req)
+        req.cache_resource(limited_list)
         res = [entity_maker(context, snapshot) for snapshot in limited_list]
-        return {'snapshots': res}
+        snapshots = {'snapshots': res}
+        if keyset:
+            links = self._view_builder.collection_links(req, limited_list)
+            if links:
+                snapshots['snapshots_links'] = links
+        return snapshots
 
     @wsgi.response(202)
     @wsgi.serializers(xml=SnapshotTemplate)
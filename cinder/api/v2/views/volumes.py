@@ -119,7 +119,8 @@ class ViewBuilder(common.ViewBuilder):
         volumes_list = [func(request, volume)['volume'] for volume in volumes]
         volumes_links = self._get_collection_links(request,
                                                    volumes,
-                                                   self._collection_name)
+                                                   self._collection_name,
+                                                   keyset=True)
         volumes_dict = dict(volumes=volumes_list)
 
         if volumes_links:
@@ -36,6 +36,8 @@ from cinder.volume import volume_types
 LOG = logging.getLogger(__name__)
 SCHEDULER_HINTS_NAMESPACE =\
     "http://docs.openstack.org/block-service/ext/scheduler-hints/api/v2"
+# The only volume columns the summary view of a volume list shows.
+SUMMARY_COLUMNS = ('id', 'display_name')
 
 
 def make_attachment(elem):
@@ -212,8 +214,16 @@ class VolumeController(wsgi.Controller):
         sort_key = params.pop('sort_key', 'created_at')
         sort_dir = params.pop('sort_dir', 'desc')
         params.pop('offset', None)
+        params.pop('cursor', None)
         filters = params
 
+        if common.use_keyset_pagination(req):
+            cursor, limit = common.get_keyset_params(req)
+            # The sort key values of the cursor mark the last volume
+            # without having to look it up.
+            if cursor is not None:
+                marker = cursor
+
         remove_invalid_options(context,
                                filters, self._get_volume_filter_options())
 
@@ -225,23 +235,54 @@ class VolumeController(wsgi.Controller):
         if 'metadata' in filters:
             filters['metadata'] = ast.literal_eval(filters['metadata'])
 
+        # The summary view doesn't need the volume relationships, so only
+        # the columns it shows are queried.
+        columns = None if is_detail else SUMMARY_COLUMNS
         volumes = self.volume_api.get_all(context, marker, limit, sort_key,
-                                          sort_dir, filters)
+                                          sort_dir, filters, columns=columns)
 
         volumes = [dict(vol.iteritems()) for vol in volumes]
 
-        for volume in volumes:
-            utils.add_visible_admin_metadata(context, volume, self.volume_api)
-
         limited_list = common.limited(volumes, req)
 
         if is_detail:
+            self._add_visible_admin_metadata(context, limited_list)
             volumes = self._view_builder.detail_list(req, limited_list)
         else:
             volumes = self._view_builder.summary_list(req, limited_list)
         req.cache_resource(limited_list)
         return volumes
 
+    def _add_visible_admin_metadata(self, context, volumes):
+        """Add the user-visible admin metadata to a list of volumes.
+
+        Non-admin listings don't load the admin metadata, so it is
+        fetched for all the volumes at once rather than one by one.
+        """
+        if context.is_admin:
+            for volume in volumes:
+                utils.add_visible_admin_metadata(context, volume,
+                                                 self.volume_api)
+            return
+        if not volumes:
+            return
+
+        elevated = context.elevated()
+        ids = [volume['id'] for volume in volumes]
+        try:
+            admin_volumes = self.volume_api.get_all(elevated,
+                                                    filters={'id': ids})
+        except Exception:
+            return
+        admin_metadata = dict((vol['id'], vol.get('volume_admin_metadata', []))
+                              for vol in admin_volumes)
+        for volume in volumes:
+            volume['volume_admin_metadata'] = admin_metadata.get(volume['id'],
+                                                                 [])
+            utils.add_visible_admin_metadata(elevated, volume,
+                                             self.volume_api)
+            del volume['volume_admin_metadata']
+
     def _image_uuid_from_href(self, image_href):
         # If the image href was generated by nova api, strip image_href
         # down to an id.
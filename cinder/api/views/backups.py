@@ -81,7 +81,8 @@ class ViewBuilder(common.ViewBuilder):
         backups_list = [func(request, backup)['backup'] for backup in backups]
         backups_links = self._get_collection_links(request,
                                                    backups,
-                                                   self._collection_name)
+                                                   self._collection_name,
+                                                   keyset=True)
         backups_dict = dict(backups=backups_list)
 
         if backups_links:
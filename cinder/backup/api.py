@@ -61,26 +61,28 @@ class API(base.Base):
     def delete(self, context, backup_id):
         """Make the RPC call to delete a volume backup."""
         check_policy(context, 'delete')
-        backup = self.get(context, backup_id)
-        if backup['status'] not in ['available', 'error']:
-            msg = _('Backup status must be available or error')
-            raise exception.InvalidBackup(reason=msg)
-
-        self.db.backup_update(context, backup_id, {'status': 'deleting'})
+        backup = self.db.backup_mark_deleting(context, backup_id)
         self.backup_rpcapi.delete_backup(context,
                                          backup['host'],
                                          backup['id'])
 
-    # TODO(moorehef): Add support for search_opts, discarded atm
-    def get_all(self, context, search_opts=None):
+    def get_all(self, context, search_opts=None, limit=None, sort_key=None,
+                sort_dir=None, cursor=None):
         if search_opts is None:
             search_opts = {}
         check_policy(context, 'get_all')
         if context.is_admin:
-            backups = self.db.backup_get_all(context)
+            backups = self.db.backup_get_all(context, filters=search_opts,
+                                             limit=limit, sort_key=sort_key,
+                                             sort_dir=sort_dir, cursor=cursor)
         else:
             backups = self.db.backup_get_all_by_project(context,
-                                                        context.project_id)
+                                                        context.project_id,
+                                                        filters=search_opts,
+                                                        limit=limit,
+                                                        sort_key=sort_key,
+                                                        sort_dir=sort_dir,
+                                                        cursor=cursor)
 
         return backups
 
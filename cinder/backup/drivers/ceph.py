@@ -46,9 +46,12 @@ import eventlet
 import fcntl
 import os
 import re
+import stat
+import struct
 import subprocess
 import time
 
+from eventlet import tpool
 from oslo.config import cfg
 
 from cinder.backup.driver import BackupDriver
@@ -86,12 +89,21 @@ service_opts = [
                help='RBD stripe count to use when creating a backup image.'),
     cfg.BoolOpt('restore_discard_excess_bytes', default=True,
                 help='If True, always discard excess bytes when restoring '
-                     'volumes i.e. pad with zeroes.')
+                     'volumes i.e. pad with zeroes.'),
+    cfg.IntOpt('backup_ceph_read_ahead_chunks', default=1,
+               help='The number of chunks read ahead of the chunk being '
+                    'written when doing a full backup or restore. Each '
+                    'chunk in flight holds backup_ceph_chunk_size bytes of '
+                    'memory.')
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(service_opts)
 
+# _IO(0x12, 127) from linux/fs.h
+BLKZEROOUT = 0x127f
+ZERO_BLOCK = '\0' * units.MiB
+
 
 class VolumeMetadataBackup(object):
 
@@ -272,32 +284,94 @@ class CephBackupDriver(BackupDriver):
     def _discard_bytes(self, volume, offset, length):
         """Trim length bytes from offset.
 
-        If the volume is an rbd do a discard() otherwise assume it is a file
-        and pad with zeroes.
+        If the volume is an rbd do a discard(). If it is a block device ask
+        the kernel to zero the range, which lets devices that support it
+        unmap or write-same rather than transfer zeroes. Otherwise assume it
+        is a file and pad with zeroes. In all cases volume is left positioned
+        at offset + length.
         """
         if length:
             LOG.debug(_("Discarding %(length)s bytes from offset %(offset)s") %
                       {'length': length, 'offset': offset})
             if self._file_is_rbd(volume):
                 volume.rbd_image.discard(offset, length)
-            else:
-                zeroes = '\0' * length
-                chunks = int(length / self.chunk_size)
-                for chunk in xrange(0, chunks):
-                    LOG.debug(_("Writing zeroes chunk %d") % (chunk))
-                    volume.write(zeroes)
-                    volume.flush()
+                volume.seek(offset + length)
+            elif not self._zero_block_device(volume, offset, length):
+                volume.seek(offset)
+                for pos in xrange(0, length, len(ZERO_BLOCK)):
+                    if length - pos < len(ZERO_BLOCK):
+                        volume.write(ZERO_BLOCK[:length - pos])
+                    else:
+                        volume.write(ZERO_BLOCK)
                     # yield to any other pending backups
                     eventlet.sleep(0)
+                volume.flush()
 
-                rem = int(length % self.chunk_size)
-                if rem:
-                    zeroes = '\0' * rem
-                    volume.write(zeroes)
-                    volume.flush()
+    def _zero_block_device(self, volume, offset, length):
+        """Zero a range of a block device with the BLKZEROOUT ioctl.
+
+        Returns False if volume is not a block device or the kernel does not
+        support the ioctl, in which case the caller must write the zeroes.
+        """
+        try:
+            fileno = volume.fileno()
+            if not stat.S_ISBLK(os.fstat(fileno).st_mode):
+                return False
+        except (AttributeError, IOError, OSError):
+            return False
 
-    def _transfer_data(self, src, src_name, dest, dest_name, length):
-        """Transfer data between files (Python IO objects)."""
+        volume.flush()
+        try:
+            fcntl.ioctl(fileno, BLKZEROOUT, struct.pack('QQ', offset, length))
+        except IOError as e:
+            LOG.debug(_("BLKZEROOUT not supported (%s) - writing zeroes") % e)
+            return False
+
+        volume.seek(offset + length)
+        return True
+
+    @staticmethod
+    def _is_zeroes(data):
+        """Return True if data only contains null bytes."""
+        view = memoryview(data)
+        zeroes = memoryview(ZERO_BLOCK)
+        for offset in xrange(0, len(data), len(ZERO_BLOCK)):
+            block = view[offset:offset + len(ZERO_BLOCK)]
+            if block != zeroes[:len(block)]:
+                return False
+        return True
+
+    def _read_chunks(self, src, length, chunks):
+        """Read up to length bytes from src into the chunks queue.
+
+        Runs in its own greenthread so that the next chunk is read while the
+        previous one is written. Reads are done in a native thread since
+        neither file nor librbd I/O yields to other greenthreads. Puts a
+        (offset, data) tuple per chunk and None once done.
+        """
+        offset = 0
+        try:
+            while offset < length:
+                data = tpool.execute(src.read,
+                                     min(self.chunk_size, length - offset))
+                if not data:
+                    break
+                chunks.put((offset, data))
+                offset += len(data)
+        except Exception:
+            # Wake up the writer, which collects the error from wait().
+            chunks.put(None)
+            raise
+        chunks.put(None)
+
+    def _transfer_data(self, src, src_name, dest, dest_name, length,
+                       dest_is_zeroed=False):
+        """Transfer data between files (Python IO objects).
+
+        Chunks containing only zeroes are not written. If dest_is_zeroed is
+        True, e.g. dest is a newly created RBD image, they are skipped
+        altogether, otherwise the range is discarded from dest.
+        """
         LOG.debug(_("Transferring data between '%(src)s' and '%(dest)s'") %
                   {'src': src_name, 'dest': dest_name})
 
@@ -305,42 +379,42 @@ class CephBackupDriver(BackupDriver):
         LOG.debug(_("%(chunks)s chunks of %(bytes)s bytes to be transferred") %
                   {'chunks': chunks, 'bytes': self.chunk_size})
 
-        for chunk in xrange(0, chunks):
-            before = time.time()
-            data = src.read(self.chunk_size)
-            # If we have reach end of source, discard any extraneous bytes from
-            # destination volume if trim is enabled and stop writing.
-            if data == '':
-                if CONF.restore_discard_excess_bytes:
-                    self._discard_bytes(dest, dest.tell(),
-                                        length - dest.tell())
-
-                return
-
-            dest.write(data)
-            dest.flush()
-            delta = (time.time() - before)
-            rate = (self.chunk_size / delta) / 1024
-            LOG.debug((_("Transferred chunk %(chunk)s of %(chunks)s "
-                         "(%(rate)dK/s)") %
-                       {'chunk': chunk + 1, 'chunks': chunks,
-                        'rate': rate}))
-
-            # yield to any other pending backups
-            eventlet.sleep(0)
-
-        rem = int(length % self.chunk_size)
-        if rem:
-            LOG.debug(_("Transferring remaining %s bytes") % (rem))
-            data = src.read(rem)
-            if data == '':
-                if CONF.restore_discard_excess_bytes:
-                    self._discard_bytes(dest, dest.tell(), rem)
-            else:
-                dest.write(data)
-                dest.flush()
-                # yield to any other pending backups
-                eventlet.sleep(0)
+        before = time.time()
+        start = dest.tell()
+        chunk_queue = eventlet.queue.LightQueue(
+            CONF.backup_ceph_read_ahead_chunks)
+        reader = eventlet.spawn(self._read_chunks, src, length, chunk_queue)
+        offset = 0
+        written = 0
+        try:
+            for offset, data in iter(chunk_queue.get, None):
+                if not self._is_zeroes(data):
+                    tpool.execute(dest.write, data)
+                    written += len(data)
+                elif dest_is_zeroed:
+                    dest.seek(start + offset + len(data))
+                else:
+                    self._discard_bytes(dest, start + offset, len(data))
+                offset += len(data)
+            reader.wait()
+        finally:
+            reader.kill()
+
+        dest.flush()
+
+        # If we have reached the end of source, discard any extraneous bytes
+        # from destination volume if trim is enabled.
+        if offset < length and CONF.restore_discard_excess_bytes:
+            self._discard_bytes(dest, start + offset, length - offset)
+
+        delta = time.time() - before
+        rate = float(offset) / units.MiB / delta if delta else 0.0
+        LOG.info(_("Transferred %(total)s bytes from '%(src)s' to '%(dest)s' "
+                   "in %(delta).2f seconds (%(rate).1f MiB/s), "
+                   "%(skipped)s bytes were zeroes and not written") %
+                 {'total': offset, 'src': src_name, 'dest': dest_name,
+                  'delta': delta, 'rate': rate,
+                  'skipped': offset - written})
 
     def _create_base_image(self, name, size, rados_client):
         """Create a base backup image.
@@ -698,7 +772,7 @@ class CephBackupDriver(BackupDriver):
                                                        self._ceph_backup_conf)
                 rbd_fd = rbd_driver.RBDImageIOWrapper(rbd_meta)
                 self._transfer_data(src_volume, src_name, rbd_fd, backup_name,
-                                    length)
+                                    length, dest_is_zeroed=True)
             finally:
                 dest_rbd.close()
 
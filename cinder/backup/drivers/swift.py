@@ -28,15 +28,30 @@
 :backup_compression_algorithm: Compression algorithm to use for volume
                                backups. Supported options are:
                                None (to disable), zlib and bz2 (default: zlib)
+:backup_swift_upload_concurrency: The number of backup objects compressed
+                                  and uploaded at the same time (default: 4).
+:backup_swift_max_queued_bytes: The most volume data read ahead of the
+                                uploads of a backup (default: 209715200).
+:backup_swift_restore_prefetch: The number of backup objects downloaded
+                                ahead of the restore writes (default: 4).
+:backup_swift_restore_sync_bytes: The bytes restored between two syncs of
+                                  the volume to disk (default: 268435456).
+:backup_swift_incremental: Only upload the objects which changed since the
+                           last backup of the volume (default: False).
 """
 
+import contextlib
 import hashlib
+import itertools
 import json
 import os
 import six
 import socket
+import time
 
 import eventlet
+from eventlet import semaphore
+from eventlet import tpool
 from oslo.config import cfg
 
 from cinder.backup.driver import BackupDriver
@@ -77,6 +92,28 @@ swiftbackup_service_opts = [
     cfg.StrOpt('backup_compression_algorithm',
                default='zlib',
                help='Compression algorithm (None to disable)'),
+    cfg.IntOpt('backup_swift_upload_concurrency',
+               default=4,
+               help='The number of backup objects compressed and uploaded '
+                    'to Swift at the same time'),
+    cfg.IntOpt('backup_swift_max_queued_bytes',
+               default=209715200,
+               help='The maximum number of bytes of volume data read ahead '
+                    'of the Swift uploads of a backup'),
+    cfg.IntOpt('backup_swift_restore_prefetch',
+               default=4,
+               help='The number of backup objects downloaded from Swift and '
+                    'decompressed ahead of the writes of a restore'),
+    cfg.IntOpt('backup_swift_restore_sync_bytes',
+               default=268435456,
+               help='The number of bytes written by a restore between two '
+                    'syncs of the volume to disk; 0 syncs every object'),
+    cfg.BoolOpt('backup_swift_incremental',
+                default=False,
+                help='Make incremental backups, which only upload the '
+                     'objects whose data changed since the last backup of '
+                     'the volume and reference the objects of that backup '
+                     'for the rest'),
 ]
 
 CONF = cfg.CONF
@@ -86,8 +123,9 @@ CONF.register_opts(swiftbackup_service_opts)
 class SwiftBackupDriver(BackupDriver):
     """Provides backup, restore and delete of backup objects within Swift."""
 
-    DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    DRIVER_VERSION = '2.0.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '2.0.0': '_restore_v2'}
 
     def _get_compressor(self, algorithm):
         try:
@@ -117,22 +155,39 @@ class SwiftBackupDriver(BackupDriver):
             self._get_compressor(CONF.backup_compression_algorithm)
         LOG.debug('Connect to %s in "%s" mode' % (CONF.backup_swift_url,
                                                   CONF.backup_swift_auth))
+        if (CONF.backup_swift_auth == 'single_user' and
+                CONF.backup_swift_user is None):
+            LOG.error(_("single_user auth mode enabled, "
+                        "but %(param)s not set")
+                      % {'param': 'backup_swift_user'})
+            raise exception.ParameterNotFound(param='backup_swift_user')
+        self.conn = self._get_connection()
+
+    def _get_connection(self):
+        """Return a new connection to Swift.
+
+        A connection can only carry one request at a time, so concurrent
+        uploads each need their own.
+        """
         if CONF.backup_swift_auth == 'single_user':
-            if CONF.backup_swift_user is None:
-                LOG.error(_("single_user auth mode enabled, "
-                            "but %(param)s not set")
-                          % {'param': 'backup_swift_user'})
-                raise exception.ParameterNotFound(param='backup_swift_user')
-            self.conn = swift.Connection(authurl=CONF.backup_swift_url,
-                                         user=CONF.backup_swift_user,
-                                         key=CONF.backup_swift_key,
-                                         retries=self.swift_attempts,
-                                         starting_backoff=self.swift_backoff)
-        else:
-            self.conn = swift.Connection(retries=self.swift_attempts,
-                                         preauthurl=self.swift_url,
-                                         preauthtoken=self.context.auth_token,
-                                         starting_backoff=self.swift_backoff)
+            return swift.Connection(authurl=CONF.backup_swift_url,
+                                    user=CONF.backup_swift_user,
+                                    key=CONF.backup_swift_key,
+                                    retries=self.swift_attempts,
+                                    starting_backoff=self.swift_backoff)
+        return swift.Connection(retries=self.swift_attempts,
+                                preauthurl=self.swift_url,
+                                preauthtoken=self.context.auth_token,
+                                starting_backoff=self.swift_backoff)
+
+    @contextlib.contextmanager
+    def _connection(self, connections):
+        """Lend a free connection of the list, or a new one if none is."""
+        conn = connections.pop() if connections else self._get_connection()
+        try:
+            yield conn
+        finally:
+            connections.append(conn)
 
     def _create_container(self, context, backup):
         backup_id = backup['id']
@@ -174,7 +229,7 @@ class SwiftBackupDriver(BackupDriver):
         return filename
 
     def _write_metadata(self, backup, volume_id, container, object_list,
-                        volume_meta):
+                        volume_meta, parent_id=None):
         filename = self._metadata_filename(backup)
         LOG.debug(_('_write_metadata started, container name: %(container)s,'
                     ' metadata filename: %(filename)s') %
@@ -188,6 +243,8 @@ class SwiftBackupDriver(BackupDriver):
         metadata['created_at'] = str(backup['created_at'])
         metadata['objects'] = object_list
         metadata['volume_meta'] = volume_meta
+        metadata['chunk_size'] = self.data_block_size_bytes
+        metadata['parent_id'] = parent_id
         metadata_json = json.dumps(metadata, sort_keys=True, indent=2)
         reader = six.StringIO(metadata_json)
         etag = self.conn.put_object(container, filename, reader,
@@ -244,20 +301,83 @@ class SwiftBackupDriver(BackupDriver):
                       'availability_zone': availability_zone,
                   })
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix,
-                       'volume_meta': None}
+                       'volume_meta': None, 'parent': None,
+                       'parent_objects': []}
+        if CONF.backup_swift_incremental:
+            (object_meta['parent'],
+             object_meta['parent_objects']) = self._get_parent_backup(backup)
+        # Record the parent before any of its objects is referenced, so that
+        # it cannot be deleted while this backup runs.
+        if (object_meta['parent'] is not None and
+                not self.db.backup_set_parent(self.context, backup['id'],
+                                              object_meta['parent']['id'])):
+            LOG.info(_('backup %s is no longer available, making a full '
+                       'backup') % object_meta['parent']['id'])
+            object_meta['parent'] = None
+            object_meta['parent_objects'] = []
         return object_meta, container
 
-    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
-        """Backup data chunk based on the object metadata and offset."""
-        object_prefix = object_meta['prefix']
-        object_list = object_meta['list']
-        object_id = object_meta['id']
-        object_name = '%s-%05d' % (object_prefix, object_id)
+    def _get_parent_backup(self, backup):
+        """Find the backup an incremental backup is based on.
+
+        That is the latest available backup of the volume made by this
+        driver, provided its metadata has the fingerprints of its objects
+        and they were cut to the current object size.  Returns the parent
+        backup and its objects, each with the container holding it, or
+        None and an empty list for a full backup.
+        """
+        backups = self.db.backup_get_all_by_project(
+            self.context, backup['project_id'],
+            filters={'volume_id': backup['volume_id'],
+                     'status': 'available',
+                     'service': __name__})
+        if not backups:
+            return None, []
+        parent = max(backups, key=lambda b: b['created_at'])
+        try:
+            metadata = self._read_metadata(parent)
+        except Exception as err:
+            LOG.warn(_('cannot read the metadata of backup %(parent_id)s, '
+                       'making a full backup: %(err)s') %
+                     {'parent_id': parent['id'], 'err': err})
+            return None, []
+        objects = metadata['objects']
+        if (metadata.get('chunk_size') != self.data_block_size_bytes or
+                not all('sha256' in obj.values()[0] for obj in objects)):
+            LOG.info(_('backup %s has no fingerprints of the current object '
+                       'size, making a full backup') % parent['id'])
+            return None, []
+
+        parent_objects = []
+        for obj in objects:
+            (object_name, object_info), = obj.items()
+            object_info.setdefault('container', parent['container'])
+            parent_objects.append({object_name: object_info})
+        LOG.debug(_('backup %(backup_id)s is incremental to %(parent_id)s') %
+                  {'backup_id': backup['id'], 'parent_id': parent['id']})
+        return parent, parent_objects
+
+    def _compress_chunk(self, object_name, data, data_offset,
+                        parent_object=None):
+        """Compress a chunk of data and describe it for the metadata.
+
+        Returns the object metadata entry of the chunk and the data to
+        upload.  When the chunk fingerprint is the one of parent_object,
+        that object is referenced instead and there is no data to upload.
+        This is CPU bound and runs in a native thread.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        if parent_object is not None:
+            (parent_name, parent_info), = parent_object.items()
+            if (parent_info['sha256'] == sha256 and
+                    parent_info['length'] == len(data)):
+                return {parent_name: parent_info}, None
+
         obj = {}
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
-        LOG.debug(_('reading chunk of data from volume'))
+        obj[object_name]['sha256'] = sha256
         if self.compressor is not None:
             algorithm = CONF.backup_compression_algorithm.lower()
             obj[object_name]['compression'] = algorithm
@@ -275,43 +395,154 @@ class SwiftBackupDriver(BackupDriver):
         else:
             LOG.debug(_('not compressing data'))
             obj[object_name]['compression'] = 'none'
+        md5 = hashlib.md5(data).hexdigest()
+        obj[object_name]['md5'] = md5
+        LOG.debug(_('backup MD5 for %(object_name)s: %(md5)s') %
+                  {'object_name': object_name, 'md5': md5})
+        return obj, data
 
+    def _upload_chunk(self, conn, container, object_name, data, md5):
+        """Upload a chunk of data and check it arrived intact."""
         reader = six.StringIO(data)
         LOG.debug(_('About to put_object'))
         try:
-            etag = self.conn.put_object(container, object_name, reader,
-                                        content_length=len(data))
+            etag = conn.put_object(container, object_name, reader,
+                                   content_length=len(data))
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=err)
         LOG.debug(_('swift MD5 for %(object_name)s: %(etag)s') %
                   {'object_name': object_name, 'etag': etag, })
-        md5 = hashlib.md5(data).hexdigest()
-        obj[object_name]['md5'] = md5
-        LOG.debug(_('backup MD5 for %(object_name)s: %(md5)s') %
-                  {'object_name': object_name, 'md5': md5})
         if etag != md5:
             err = _('error writing object to swift, MD5 of object in '
                     'swift %(etag)s is not the same as MD5 of object sent '
                     'to swift %(md5)s') % {'etag': etag, 'md5': md5}
             raise exception.InvalidBackup(reason=err)
-        object_list.append(obj)
-        object_id += 1
-        object_meta['list'] = object_list
+
+    def _backup_chunk(self, container, data, data_offset, object_id,
+                      object_meta, pipeline):
+        """Backup a data chunk; runs in a greenthread of the pipeline."""
+        object_name = '%s-%05d' % (object_meta['prefix'], object_id)
+        try:
+            if pipeline['errors']:
+                return
+            parent_objects = object_meta['parent_objects']
+            parent_object = (parent_objects[object_id - 1]
+                             if object_id <= len(parent_objects) else None)
+            start = time.time()
+            length = len(data)
+            obj, data = tpool.execute(self._compress_chunk, object_name,
+                                      data, data_offset, parent_object)
+            if data is None:
+                pipeline['stats']['reused'][0] += length
+                pipeline['objects'][object_id] = obj
+                return
+            pipeline['stats']['compress'][0] += length
+            pipeline['stats']['compress'][1] += time.time() - start
+
+            start = time.time()
+            with self._connection(pipeline['connections']) as conn:
+                self._upload_chunk(conn, container, object_name, data,
+                                   obj[object_name]['md5'])
+            pipeline['stats']['upload'][0] += len(data)
+            pipeline['stats']['upload'][1] += time.time() - start
+            pipeline['objects'][object_id] = obj
+        except Exception as err:
+            LOG.error(_('backup of %(object_name)s failed: %(err)s') %
+                      {'object_name': object_name, 'err': err})
+            pipeline['errors'].append(err)
+        finally:
+            pipeline['queued'].release()
+
+    def _backup_chunks(self, backup, container, volume_file, object_meta):
+        """Backup the volume data in a pipeline of concurrent uploads.
+
+        The volume is read sequentially while up to
+        backup_swift_upload_concurrency chunks are compressed in native
+        threads and uploaded, each on its own connection.  The reader
+        waits once backup_swift_max_queued_bytes of data are queued.
+        """
+        concurrency = max(1, CONF.backup_swift_upload_concurrency)
+        max_queued = max(1, CONF.backup_swift_max_queued_bytes //
+                         self.data_block_size_bytes)
+        pipeline = {
+            'connections': [self.conn],
+            'errors': [],
+            'objects': {},
+            'queued': semaphore.Semaphore(max_queued),
+            # bytes and busy seconds of each stage
+            'stats': {'read': [0, 0.0], 'compress': [0, 0.0],
+                      'upload': [0, 0.0], 'reused': [0, 0.0]},
+        }
+        pool = eventlet.GreenPool(concurrency)
+        backup_start = time.time()
+        object_id = object_meta['id']
+        while not pipeline['errors']:
+            pipeline['queued'].acquire()
+            start = time.time()
+            data = volume_file.read(self.data_block_size_bytes)
+            data_offset = volume_file.tell()
+            if data == '':
+                pipeline['queued'].release()
+                break
+            pipeline['stats']['read'][0] += len(data)
+            pipeline['stats']['read'][1] += time.time() - start
+            pool.spawn_n(self._backup_chunk, container, data, data_offset,
+                         object_id, object_meta, pipeline)
+            object_id += 1
+            # Let the workers take the chunk before reading the next one.
+            eventlet.sleep(0)
+        pool.waitall()
+        if pipeline['errors']:
+            raise pipeline['errors'][0]
+
+        objects = pipeline['objects']
+        object_meta['list'].extend(objects[i] for i in sorted(objects))
         object_meta['id'] = object_id
-        LOG.debug(_('Calling eventlet.sleep(0)'))
-        eventlet.sleep(0)
+        self._log_backup_stats(backup, pipeline['stats'],
+                               time.time() - backup_start)
+
+    def _log_backup_stats(self, backup, stats, elapsed):
+        """Log the throughput of each stage of a backup."""
+        def _rate(nbytes, seconds):
+            return float(nbytes) / units.MiB / seconds if seconds else 0.0
+
+        LOG.info(_('backup %(backup_id)s: read %(read)d bytes in '
+                   '%(elapsed).2f seconds (%(rate).1f MiB/s)') %
+                 {'backup_id': backup['id'],
+                  'read': stats['read'][0],
+                  'elapsed': elapsed,
+                  'rate': _rate(stats['read'][0], elapsed)})
+        for stage in ('read', 'compress', 'upload'):
+            nbytes, seconds = stats[stage]
+            LOG.info(_('backup %(backup_id)s: %(stage)s stage processed '
+                       '%(bytes)d bytes in %(seconds).2f busy seconds '
+                       '(%(rate).1f MiB/s per worker)') %
+                     {'backup_id': backup['id'],
+                      'stage': stage,
+                      'bytes': nbytes,
+                      'seconds': seconds,
+                      'rate': _rate(nbytes, seconds)})
+        if stats['reused'][0]:
+            LOG.info(_('backup %(backup_id)s: referenced %(bytes)d unchanged '
+                       'bytes of the parent backup') %
+                     {'backup_id': backup['id'],
+                      'bytes': stats['reused'][0]})
 
     def _finalize_backup(self, backup, container, object_meta):
         """Finalize the backup by updating its metadata on Swift."""
         object_list = object_meta['list']
         object_id = object_meta['id']
         volume_meta = object_meta['volume_meta']
+        parent_id = None
+        if object_meta['parent'] is not None:
+            parent_id = object_meta['parent']['id']
         try:
             self._write_metadata(backup,
                                  backup['volume_id'],
                                  container,
                                  object_list,
-                                 volume_meta)
+                                 volume_meta,
+                                 parent_id=parent_id)
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=err)
         self.db.backup_update(self.context, backup['id'],
@@ -337,13 +568,7 @@ class SwiftBackupDriver(BackupDriver):
         """Backup the given volume to Swift."""
 
         object_meta, container = self._prepare_backup(backup)
-        while True:
-            data = volume_file.read(self.data_block_size_bytes)
-            data_offset = volume_file.tell()
-            if data == '':
-                break
-            self._backup_chunk(backup, container, data,
-                               data_offset, object_meta)
+        self._backup_chunks(backup, container, volume_file, object_meta)
 
         if backup_metadata:
             try:
@@ -356,68 +581,137 @@ class SwiftBackupDriver(BackupDriver):
 
         self._finalize_backup(backup, container, object_meta)
 
-    def _restore_v1(self, backup, volume_id, metadata, volume_file):
-        """Restore a v1 swift volume backup from swift."""
-        backup_id = backup['id']
-        LOG.debug(_('v1 swift volume backup restore of %s started'), backup_id)
-        container = backup['container']
-        metadata_objects = metadata['objects']
-        metadata_object_names = sum((obj.keys() for obj in metadata_objects),
-                                    [])
-        LOG.debug(_('metadata_object_names = %s') % metadata_object_names)
+    def _fetch_object(self, connections, container, metadata_object):
+        """Download and decompress one object of a backup.
+
+        The object is checked against the MD5 recorded in the backup
+        metadata, when there is one, before it is decompressed.
+        """
+        object_name = metadata_object.keys()[0]
+        LOG.debug(_('restoring object from swift. container: %(container)s,'
+                    ' swift object name: %(object_name)s') %
+                  {'container': container, 'object_name': object_name})
+        # The objects of incremental backups may belong to a parent backup
+        container = metadata_object[object_name].get('container', container)
+        with self._connection(connections) as conn:
+            try:
+                (resp, body) = conn.get_object(container, object_name)
+            except socket.error as err:
+                raise exception.SwiftConnectionFailed(reason=err)
+        return tpool.execute(self._decompress_object, object_name,
+                             metadata_object[object_name], body)
+
+    def _decompress_object(self, object_name, object_info, body):
+        """Check and decompress the data of an object in a native thread."""
+        expected_md5 = object_info.get('md5')
+        if expected_md5 is not None:
+            md5 = hashlib.md5(body).hexdigest()
+            if md5 != expected_md5:
+                err = (_('restore_backup aborted, MD5 of object %(name)s '
+                         '%(md5)s is not the MD5 stored in the backup '
+                         'metadata %(expected)s') %
+                       {'name': object_name, 'md5': md5,
+                        'expected': expected_md5})
+                raise exception.InvalidBackup(reason=err)
+        compression_algorithm = object_info['compression']
+        decompressor = self._get_compressor(compression_algorithm)
+        if decompressor is None:
+            return body
+        LOG.debug(_('decompressing data using %s algorithm') %
+                  compression_algorithm)
+        return decompressor.decompress(body)
+
+    def _sync_volume_file(self, volume_file):
+        """Write the restored data through to the volume."""
+        # Be tolerant to IO implementations that do not support fileno()
+        try:
+            fileno = volume_file.fileno()
+        except IOError:
+            LOG.info("volume_file does not support fileno() so skipping "
+                     "fsync()")
+        else:
+            os.fsync(fileno)
+
+    def _check_object_names(self, backup, object_names):
+        """Check the objects of the backup in swift are the expected ones."""
         prune_list = [self._metadata_filename(backup)]
         swift_object_names = [swift_object_name for swift_object_name in
                               self._generate_object_names(backup)
                               if swift_object_name not in prune_list]
-        if sorted(swift_object_names) != sorted(metadata_object_names):
+        if sorted(swift_object_names) != sorted(object_names):
             err = _('restore_backup aborted, actual swift object list in '
                     'swift does not match object list stored in metadata')
             raise exception.InvalidBackup(reason=err)
 
-        for metadata_object in metadata_objects:
-            object_name = metadata_object.keys()[0]
-            LOG.debug(_('restoring object from swift. backup: %(backup_id)s, '
-                        'container: %(container)s, swift object name: '
-                        '%(object_name)s, volume: %(volume_id)s') %
-                      {
-                          'backup_id': backup_id,
-                          'container': container,
-                          'object_name': object_name,
-                          'volume_id': volume_id,
-                      })
-            try:
-                (resp, body) = self.conn.get_object(container, object_name)
-            except socket.error as err:
-                raise exception.SwiftConnectionFailed(reason=err)
-            compression_algorithm = metadata_object[object_name]['compression']
-            decompressor = self._get_compressor(compression_algorithm)
-            if decompressor is not None:
-                LOG.debug(_('decompressing data using %s algorithm') %
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                volume_file.write(decompressed)
-            else:
-                volume_file.write(body)
+    def _restore_objects(self, backup, volume_id, metadata_objects,
+                         volume_file):
+        """Write the objects of a backup to the volume in order.
 
+        The next backup_swift_restore_prefetch objects are downloaded and
+        decompressed concurrently while the objects are written.
+        """
+        LOG.debug(_('restoring backup %(backup_id)s to volume %(volume_id)s')
+                  % {'backup_id': backup['id'], 'volume_id': volume_id})
+        pool = eventlet.GreenPool(max(1, CONF.backup_swift_restore_prefetch))
+        connections = [self.conn]
+        unsynced_bytes = 0
+        for data in pool.imap(self._fetch_object,
+                              itertools.repeat(connections),
+                              itertools.repeat(backup['container']),
+                              metadata_objects):
+            volume_file.write(data)
             # force flush every write to avoid long blocking write on close
             volume_file.flush()
-
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.info("volume_file does not support fileno() so skipping "
-                         "fsync()")
-            else:
-                os.fsync(fileno)
+            unsynced_bytes += len(data)
+            if unsynced_bytes >= CONF.backup_swift_restore_sync_bytes:
+                self._sync_volume_file(volume_file)
+                unsynced_bytes = 0
 
             # Restoring a backup to a volume can take some time. Yield so other
             # threads can run, allowing for among other things the service
             # status to be updated
             eventlet.sleep(0)
+        if unsynced_bytes:
+            self._sync_volume_file(volume_file)
+
+    def _restore_v1(self, backup, volume_id, metadata, volume_file):
+        """Restore a v1 swift volume backup from swift."""
+        backup_id = backup['id']
+        LOG.debug(_('v1 swift volume backup restore of %s started'), backup_id)
+        metadata_objects = metadata['objects']
+        metadata_object_names = sum((obj.keys() for obj in metadata_objects),
+                                    [])
+        LOG.debug(_('metadata_object_names = %s') % metadata_object_names)
+        self._check_object_names(backup, metadata_object_names)
+        self._restore_objects(backup, volume_id, metadata_objects,
+                              volume_file)
         LOG.debug(_('v1 swift volume backup restore of %s finished'),
                   backup_id)
 
+    def _restore_v2(self, backup, volume_id, metadata, volume_file):
+        """Restore a v2 swift volume backup from swift.
+
+        The objects of v2 backups have fingerprints, and incremental
+        backups reference the unchanged objects of their parent backups
+        with the container holding them, so the volume is reassembled
+        from the whole chain of backups.
+        """
+        backup_id = backup['id']
+        LOG.debug(_('v2 swift volume backup restore of %(backup_id)s '
+                    'started, parent backup: %(parent_id)s') %
+                  {'backup_id': backup_id,
+                   'parent_id': metadata.get('parent_id')})
+        metadata_objects = metadata['objects']
+        own_object_names = [name for obj in metadata_objects
+                            for name, info in obj.items()
+                            if 'container' not in info]
+        LOG.debug(_('own object names = %s') % own_object_names)
+        self._check_object_names(backup, own_object_names)
+        self._restore_objects(backup, volume_id, metadata_objects,
+                              volume_file)
+        LOG.debug(_('v2 swift volume backup restore of %s finished'),
+                  backup_id)
+
     def restore(self, backup, volume_id, volume_file):
         """Restore the given volume backup from swift."""
         backup_id = backup['id']
@@ -155,13 +155,7 @@ class TgtAdm(TargetAdmin):
                         "id:%(vol_id)s: %(e)s")
                       % {'vol_id': name, 'e': e})
 
-    def create_iscsi_target(self, name, tid, lun, path,
-                            chap_auth=None, **kwargs):
-        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
-        # compatibility
-
-        fileutils.ensure_tree(self.volumes_dir)
-
+    def _write_volume_conf(self, name, path, chap_auth=None):
         vol_id = name.split(':')[1]
         if chap_auth is None:
             volume_conf = self.VOLUME_CONF % (name, path)
@@ -169,16 +163,84 @@ class TgtAdm(TargetAdmin):
             volume_conf = self.VOLUME_CONF_WITH_CHAP_AUTH % (name,
                                                              path, chap_auth)
 
-        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
-        volumes_dir = self.volumes_dir
-        volume_path = os.path.join(volumes_dir, vol_id)
-
+        volume_path = os.path.join(self.volumes_dir, vol_id)
         f = open(volume_path, 'w+')
         f.write(volume_conf)
         f.close()
         LOG.debug(_('Created volume path %(vp)s,\n'
                     'content: %(vc)s')
                   % {'vp': volume_path, 'vc': volume_conf})
+        return volume_path
+
+    def _get_targets(self):
+        """Return a dict of iqn: (tid, set of luns) from tgt-admin --show."""
+        (out, err) = self._execute('tgt-admin', '--show', run_as_root=True)
+        targets = {}
+        luns = None
+        for line in out.split('\n'):
+            parsed = line.split()
+            if line.startswith('Target ') and len(parsed) > 2:
+                luns = set()
+                targets[parsed[2]] = (parsed[1][:-1], luns)
+            elif luns is not None and parsed[:1] == ['LUN:']:
+                luns.add(parsed[1])
+        return targets
+
+    def create_iscsi_targets(self, targets):
+        """Create several targets with a single tgt-admin update.
+
+        Writes the persist file of every target, in place of the one of
+        its old name, then runs one tgt-admin --update and one
+        tgt-admin --show for the whole batch instead of four tgt commands
+        per target.
+
+        :param targets: list of (name, path, chap_auth, old_name) tuples
+        :returns: the targets which were not created or have no backing
+                  lun; pass them to create_iscsi_target, which retries.
+        """
+        if not targets:
+            return []
+
+        fileutils.ensure_tree(self.volumes_dir)
+        LOG.info(_('Creating %d iscsi_targets'), len(targets))
+        for name, path, chap_auth, old_name in targets:
+            # Remove the old persist files first, or the update would
+            # recreate their targets too.
+            if old_name is not None:
+                old_persist_file = os.path.join(self.volumes_dir, old_name)
+                if os.path.exists(old_persist_file):
+                    os.unlink(old_persist_file)
+            self._write_volume_conf(name, path, chap_auth)
+
+        try:
+            (out, err) = self._execute('tgt-admin', '--update', 'ALL',
+                                       run_as_root=True)
+            LOG.debug("StdOut from tgt-admin --update: %s", out)
+            LOG.debug("StdErr from tgt-admin --update: %s", err)
+            existing = self._get_targets()
+        except putils.ProcessExecutionError as e:
+            LOG.warning(_("Failed to update iscsi targets: %s"), e)
+            return list(targets)
+
+        failed = []
+        for target in targets:
+            name = target[0]
+            iqn = '%s%s' % (self.iscsi_target_prefix, name.split(':')[1])
+            if '1' not in existing.get(iqn, (None, ()))[1]:
+                failed.append(target)
+        return failed
+
+    def create_iscsi_target(self, name, tid, lun, path,
+                            chap_auth=None, **kwargs):
+        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
+        # compatibility
+
+        fileutils.ensure_tree(self.volumes_dir)
+
+        vol_id = name.split(':')[1]
+        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
+        volumes_dir = self.volumes_dir
+        volume_path = self._write_volume_conf(name, path, chap_auth)
 
         old_persist_file = None
         old_name = kwargs.get('old_name', None)
@@ -19,6 +19,7 @@ LVM class for performing LVM operations.
 
 import math
 import re
+import time
 
 import itertools
 
@@ -36,7 +37,7 @@ class LVM(executor.Executor):
 
     def __init__(self, vg_name, root_helper, create_vg=False,
                  physical_volumes=None, lvm_type='default',
-                 executor=putils.execute):
+                 executor=putils.execute, lv_cache_ttl=0):
 
         """Initialize the LVM object.
 
@@ -50,6 +51,8 @@ class LVM(executor.Executor):
         :param physical_volumes: List of PVs to build VG on
         :param lvm_type: VG and Volume type (default, or thin)
         :param executor: Execute method to use, None uses common/processutils
+        :param lv_cache_ttl: Seconds that get_volume may answer from the
+                             LVs found by the last lvs run, 0 disables
 
         """
         super(LVM, self).__init__(execute=executor, root_helper=root_helper)
@@ -65,6 +68,9 @@ class LVM(executor.Executor):
         self.vg_thin_pool_free_space = 0.0
         self._supports_snapshot_lv_activation = None
         self._supports_lvchange_ignoreskipactivation = None
+        self._lv_cache_ttl = lv_cache_ttl
+        self._lv_cache = None
+        self._lv_cache_time = 0
 
         if create_vg and physical_volumes is not None:
             self.pv_list = physical_volumes
@@ -131,6 +137,17 @@ class LVM(executor.Executor):
         :param thin_pool_name: the thin pool to gather info for
         :returns: Free space in GB (float), calculated using data_percent
 
+        """
+        return self._get_thin_pool_info(vg_name, thin_pool_name)[1]
+
+    def _get_thin_pool_info(self, vg_name, thin_pool_name):
+        """Returns thin pool size and available free space.
+
+        :param vg_name: the vg where the pool is placed
+        :param thin_pool_name: the thin pool to gather info for
+        :returns: tuple of size and free space in GB (floats), or None
+                  and 0.0 if the pool could not be queried
+
         """
         cmd = ['env', 'LC_ALL=C', 'lvs', '--noheadings', '--unit=g',
                '-o', 'size,data_percent', '--separator', ':', '--nosuffix']
@@ -139,6 +156,7 @@ class LVM(executor.Executor):
         # make sure to append the actual thin pool name
         cmd.append("/dev/%s/%s" % (vg_name, thin_pool_name))
 
+        pool_size = None
         free_space = 0.0
 
         try:
@@ -159,7 +177,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
 
-        return free_space
+        return pool_size, free_space
 
     @staticmethod
     def get_lvm_version(root_helper):
@@ -267,18 +285,47 @@ class LVM(executor.Executor):
 
         """
         self.lv_list = self.get_all_volumes(self._root_helper, self.vg_name)
+        self._lv_cache = dict((lv['name'], lv) for lv in self.lv_list)
+        self._lv_cache_time = time.time()
         return self.lv_list
 
     def get_volume(self, name):
         """Get reference object of volume specified by name.
 
+        Answers from the LVs found by the last lvs run while it is younger
+        than lv_cache_ttl.  LVs which are not found there are looked up
+        with a fresh lvs run, so LVs created outside of this object are
+        found too.
+
         :returns: dict representation of Logical Volume if exists
 
         """
-        ref_list = self.get_volumes()
-        for r in ref_list:
-            if r['name'] == name:
-                return r
+        if (self._lv_cache is not None and
+                time.time() - self._lv_cache_time < self._lv_cache_ttl):
+            lv = self._lv_cache.get(name)
+            if lv is not None:
+                return lv
+        self.get_volumes()
+        return self._lv_cache.get(name)
+
+    def _cache_lv(self, name, size_str=None):
+        """Record an LV this object created, renamed or resized.
+
+        Sizes are only recorded when given in GB, the unit lvs reports
+        them in; otherwise the LV is dropped from the cache and looked up
+        again on the next get_volume.
+        """
+        if self._lv_cache is None:
+            return
+        if size_str and size_str[-1] in 'gG':
+            self._lv_cache[name] = {'vg': self.vg_name, 'name': name,
+                                    'size': '%.2f' % float(size_str[:-1])}
+        else:
+            self._lv_cache.pop(name, None)
+
+    def _uncache_lv(self, name):
+        if self._lv_cache is not None:
+            self._lv_cache.pop(name, None)
 
     @staticmethod
     def get_all_physical_volumes(root_helper, vg_name=None):
@@ -376,12 +423,13 @@ class LVM(executor.Executor):
         self.vg_uuid = vg_list[0]['uuid']
 
         if self.vg_thin_pool is not None:
-            for lv in self.get_all_volumes(self._root_helper, self.vg_name):
-                if lv['name'] == self.vg_thin_pool:
-                    self.vg_thin_pool_size = lv['size']
-                    tpfs = self._get_thin_pool_free_space(self.vg_name,
-                                                          self.vg_thin_pool)
-                    self.vg_thin_pool_free_space = tpfs
+            # NOTE: a single lvs of the pool gives both its size and its
+            # data_percent, there is no need to list every LV in the VG.
+            pool_size, tpfs = self._get_thin_pool_info(self.vg_name,
+                                                       self.vg_thin_pool)
+            if pool_size is not None:
+                self.vg_thin_pool_size = pool_size
+                self.vg_thin_pool_free_space = tpfs
 
     def _calculate_thin_pool_size(self):
         """Calculates the correct size for a thin pool.
@@ -441,6 +489,7 @@ class LVM(executor.Executor):
                       run_as_root=True)
 
         self.vg_thin_pool = name
+        self._cache_lv(name, size_str)
         return size_str
 
     def create_volume(self, name, size_str, lv_type='default', mirror_count=0):
@@ -479,6 +528,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        self._cache_lv(name, size_str)
 
     def create_lv_snapshot(self, name, source_lv_name, lv_type='default'):
         """Creates a snapshot of a logical volume.
@@ -508,6 +558,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        self._cache_lv(name, '%sg' % source_lvref['size'].rstrip('gG'))
 
     def _mangle_lv_name(self, name):
         # Linux LVM reserves name that starts with snapshot, so that
@@ -564,6 +615,10 @@ class LVM(executor.Executor):
                           root_helper=self._root_helper, run_as_root=True,
                           check_exit_code=False)
 
+        # NOTE: drop the LV first, if the removal fails half way through
+        # the next lookup has to ask lvs about it anyway.
+        self._uncache_lv(name)
+
         try:
             need_force_remove = False
             # LV removal seems to be a race with udev in
@@ -617,6 +672,9 @@ class LVM(executor.Executor):
         self._execute('lvconvert', '--merge',
                       snapshot_name, root_helper=self._root_helper,
                       run_as_root=True)
+        # The merge removes the snapshot, possibly only once the origin
+        # is next activated, so forget about every LV.
+        self._lv_cache = None
 
     def lv_has_snapshot(self, name):
         out, err = self._execute(
@@ -643,6 +701,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        self._cache_lv(lv_name, new_size)
 
     def vg_mirror_free_space(self, mirror_count):
         free_capacity = 0.0
@@ -681,3 +740,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
+        if self._lv_cache is not None:
+            lv = self._lv_cache.pop(lv_name, None)
+            if lv is not None:
+                self._lv_cache[new_name] = dict(lv, name=new_name)
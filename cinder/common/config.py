@@ -166,6 +166,12 @@ global_opts = [
                default='/etc/cinder/rootwrap.conf',
                help='Path to the rootwrap configuration file to use for '
                     'running commands as root'),
+    cfg.BoolOpt('use_rootwrap_daemon',
+                default=False,
+                help='Run commands as root through a long-lived '
+                     'cinder-rootwrap-daemon, started with sudo on first '
+                     'use, instead of starting sudo cinder-rootwrap for '
+                     'each command'),
     cfg.BoolOpt('monkey_patch',
                 default=False,
                 help='Enable monkey patching'),
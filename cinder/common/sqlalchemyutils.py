@@ -22,6 +22,7 @@ import sqlalchemy
 
 from cinder import exception
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import timeutils
 
 
 LOG = logging.getLogger(__name__)
@@ -29,7 +30,7 @@ LOG = logging.getLogger(__name__)
 
 # copied from glance/db/sqlalchemy/api.py
 def paginate_query(query, model, limit, sort_keys, marker=None,
-                   sort_dir=None, sort_dirs=None):
+                   sort_dir=None, sort_dirs=None, marker_values=None):
     """Returns a query with sorting / pagination criteria added.
 
     Pagination works by requiring a unique sort_key, specified by sort_keys.
@@ -55,6 +56,11 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
                     results after this value.
     :param sort_dir: direction in which results should be sorted (asc, desc)
     :param sort_dirs: per-column array of sort_dirs, corresponding to sort_keys
+    :param marker_values: the values of sort_keys in the last item of the
+                          previous page, used instead of marker so that
+                          the marker doesn't have to be loaded (keyset
+                          pagination); datetimes may be given as strings
+                          in timeutils.strtime() format
 
     :rtype: sqlalchemy.orm.query.Query
     :return: The query with sorting/pagination added.
@@ -91,12 +97,18 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         query = query.order_by(sort_dir_func(sort_key_attr))
 
     # Add pagination
-    if marker is not None:
+    if marker_values is not None:
+        if len(marker_values) != len(sort_keys):
+            raise exception.InvalidInput(reason=_('Invalid marker values'))
+        marker_values = [_marker_value(model, sort_key, v)
+                         for sort_key, v in zip(sort_keys, marker_values)]
+    elif marker is not None:
         marker_values = []
         for sort_key in sort_keys:
             v = getattr(marker, sort_key)
             marker_values.append(v)
 
+    if marker_values is not None:
         # Build up an array of sort criteria as in the docstring
         criteria_list = []
         for i in xrange(0, len(sort_keys)):
@@ -124,3 +136,15 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         query = query.limit(limit)
 
     return query
+
+
+def _marker_value(model, sort_key, value):
+    """Convert a marker value of a sort key to the type of its column."""
+    column = getattr(model, sort_key, None)
+    if (isinstance(value, basestring) and column is not None and
+            isinstance(column.type, sqlalchemy.DateTime)):
+        try:
+            return timeutils.parse_strtime(value)
+        except ValueError:
+            raise exception.InvalidInput(reason=_('Invalid marker values'))
+    return value
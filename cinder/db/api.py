@@ -66,7 +66,11 @@ db_opts = [
                help='Template string to be used to generate snapshot names'),
     cfg.StrOpt('backup_name_template',
                default='backup-%s',
-               help='Template string to be used to generate backup names'), ]
+               help='Template string to be used to generate backup names'),
+    cfg.IntOpt('quota_reservation_batch_size',
+               default=1000,
+               help='Maximum number of expired quota reservations rolled '
+                    'back in a single transaction'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(db_opts)
@@ -137,6 +141,17 @@ def service_update(context, service_id, values):
     return IMPL.service_update(context, service_id, values)
 
 
+def service_heartbeat(context, service_ids, values=None):
+    """Bump the report count of services in a single statement.
+
+    Also sets their updated_at and the given values.  Returns the number
+    of services updated, which is lower than requested if some of them
+    do not exist anymore.
+
+    """
+    return IMPL.service_heartbeat(context, service_ids, values)
+
+
 ###################
 
 
@@ -206,10 +221,10 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, columns=None):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir,
-                               filters=filters)
+                               filters=filters, columns=columns)
 
 
 def volume_get_all_by_host(context, host):
@@ -223,10 +238,11 @@ def volume_get_all_by_instance_uuid(context, instance_uuid):
 
 
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None, columns=None):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
-                                          sort_key, sort_dir, filters=filters)
+                                          sort_key, sort_dir, filters=filters,
+                                          columns=columns)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -261,14 +277,21 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context):
+def snapshot_get_all(context, filters=None, limit=None, sort_key=None,
+                     sort_dir=None, cursor=None):
     """Get all snapshots."""
-    return IMPL.snapshot_get_all(context)
+    return IMPL.snapshot_get_all(context, filters=filters, limit=limit,
+                                 sort_key=sort_key, sort_dir=sort_dir,
+                                 cursor=cursor)
 
 
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, filters=None, limit=None,
+                                sort_key=None, sort_dir=None, cursor=None):
     """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id)
+    return IMPL.snapshot_get_all_by_project(context, project_id,
+                                            filters=filters, limit=limit,
+                                            sort_key=sort_key,
+                                            sort_dir=sort_dir, cursor=cursor)
 
 
 def snapshot_get_all_for_volume(context, volume_id):
@@ -547,9 +570,10 @@ def volume_glance_metadata_create(context, volume_id, key, value):
                                               value)
 
 
-def volume_glance_metadata_get_all(context):
-    """Return the glance metadata for all volumes."""
-    return IMPL.volume_glance_metadata_get_all(context)
+def volume_glance_metadata_get_all(context, volume_ids=None):
+    """Return the glance metadata for all volumes, or the given ones."""
+    return IMPL.volume_glance_metadata_get_all(context,
+                                               volume_ids=volume_ids)
 
 
 def volume_glance_metadata_get(context, volume_id):
@@ -722,6 +746,14 @@ def quota_reserve(context, resources, quotas, deltas, expire,
                               until_refresh, max_age, project_id=project_id)
 
 
+def quota_reserve_optimistic(context, resources, quotas, deltas, expire,
+                             until_refresh, max_age, project_id=None):
+    """Check quotas and create reservations without locking the usages."""
+    return IMPL.quota_reserve_optimistic(context, resources, quotas, deltas,
+                                         expire, until_refresh, max_age,
+                                         project_id=project_id)
+
+
 def reservation_commit(context, reservations, project_id=None):
     """Commit quota reservations."""
     return IMPL.reservation_commit(context, reservations,
@@ -740,7 +772,7 @@ def quota_destroy_all_by_project(context, project_id):
 
 
 def reservation_expire(context):
-    """Roll back any expired reservations."""
+    """Roll back any expired reservations, returning how many."""
     return IMPL.reservation_expire(context)
 
 
@@ -752,9 +784,12 @@ def backup_get(context, backup_id):
     return IMPL.backup_get(context, backup_id)
 
 
-def backup_get_all(context):
+def backup_get_all(context, filters=None, limit=None, sort_key=None,
+                   sort_dir=None, cursor=None):
     """Get all backups."""
-    return IMPL.backup_get_all(context)
+    return IMPL.backup_get_all(context, filters=filters, limit=limit,
+                               sort_key=sort_key, sort_dir=sort_dir,
+                               cursor=cursor)
 
 
 def backup_get_all_by_host(context, host):
@@ -767,9 +802,13 @@ def backup_create(context, values):
     return IMPL.backup_create(context, values)
 
 
-def backup_get_all_by_project(context, project_id):
+def backup_get_all_by_project(context, project_id, filters=None, limit=None,
+                              sort_key=None, sort_dir=None, cursor=None):
     """Get all backups belonging to a project."""
-    return IMPL.backup_get_all_by_project(context, project_id)
+    return IMPL.backup_get_all_by_project(context, project_id,
+                                          filters=filters, limit=limit,
+                                          sort_key=sort_key,
+                                          sort_dir=sort_dir, cursor=cursor)
 
 
 def backup_update(context, backup_id, values):
@@ -780,6 +819,24 @@ def backup_update(context, backup_id, values):
     return IMPL.backup_update(context, backup_id, values)
 
 
+def backup_mark_deleting(context, backup_id):
+    """Set the status of a backup to deleting.
+
+    Raises InvalidBackup if the backup is not available or in error, or if
+    incremental backups which are not in error are based on it.
+    """
+    return IMPL.backup_mark_deleting(context, backup_id)
+
+
+def backup_set_parent(context, backup_id, parent_id):
+    """Record the backup an incremental backup is based on.
+
+    Returns False, leaving the backup unchanged, if the parent is no longer
+    available.
+    """
+    return IMPL.backup_set_parent(context, backup_id, parent_id)
+
+
 def backup_destroy(context, backup_id):
     """Destroy the backup or raise if it does not exist."""
     return IMPL.backup_destroy(context, backup_id)
@@ -19,6 +19,7 @@
 """Implementation of SQLAlchemy backend."""
 
 
+import collections
 import sys
 import uuid
 import warnings
@@ -371,6 +372,19 @@ def service_update(context, service_id, values):
         service_ref.save(session=session)
 
 
+@require_admin_context
+def service_heartbeat(context, service_ids, values=None):
+    values = dict(values or {})
+    values['report_count'] = models.Service.report_count + 1
+    values['updated_at'] = timeutils.utcnow()
+    session = get_session()
+    with session.begin():
+        return model_query(context, models.Service, session=session,
+                           read_deleted="no").\
+            filter(models.Service.id.in_(service_ids)).\
+            update(values, synchronize_session=False)
+
+
 ###################
 
 
@@ -853,51 +867,191 @@ def quota_reserve(context, resources, quotas, deltas, expire,
     return reservations
 
 
-def _quota_reservations(session, context, reservations):
-    """Return the relevant reservations."""
+def _quota_usage_needs_refresh(usage, max_age):
+    """Whether quota_reserve() would refresh this usage."""
+    if usage is None or usage.in_use < 0:
+        return True
+    if usage.until_refresh is not None:
+        # The refresh countdown has to be decremented by quota_reserve().
+        return True
+    return bool(max_age and usage.updated_at is not None and (
+        (usage.updated_at - timeutils.utcnow()).seconds >= max_age))
 
-    # Get the listed reservations
-    return model_query(context, models.Reservation,
-                       read_deleted="no",
-                       session=session).\
+
+@require_context
+def quota_reserve_optimistic(context, resources, quotas, deltas, expire,
+                             until_refresh, max_age, project_id=None):
+    """Reserve quota without locking all the usages of the project.
+
+    Each usage which is reserved against is updated with a single
+    conditional UPDATE, which only matches if the reservation keeps the
+    usage within its quota, so concurrent reservations don't wait on each
+    other's row locks while checking quotas and creating reservations.
+    Only the usages touched by the deltas are written.
+
+    Usages which need to be created or refreshed, or whose row goes away
+    under us, are handled by the locking quota_reserve().
+    """
+    elevated = context.elevated()
+    if project_id is None:
+        project_id = context.project_id
+
+    usages = dict((row.resource, row) for row in
+                  model_query(context, models.QuotaUsage,
+                              read_deleted="no").
+                  filter_by(project_id=project_id).
+                  all())
+    if any(_quota_usage_needs_refresh(usages.get(resource), max_age)
+           for resource in deltas):
+        return quota_reserve(context, resources, quotas, deltas, expire,
+                             until_refresh, max_age, project_id=project_id)
+
+    unders = [r for r, delta in deltas.items()
+              if delta < 0 and delta + usages[r].in_use < 0]
+    if unders:
+        LOG.warning(_("Change will make usage less than 0 for the following "
+                      "resources: %s") % unders)
+
+    try:
+        return _quota_reserve_optimistic(context, elevated, quotas, deltas,
+                                         expire, usages, project_id)
+    except _QuotaUsageGone:
+        return quota_reserve(context, resources, quotas, deltas, expire,
+                             until_refresh, max_age, project_id=project_id)
+
+
+class _QuotaUsageGone(Exception):
+    pass
+
+
+def _quota_reserve_optimistic(context, elevated, quotas, deltas, expire,
+                              usages, project_id):
+    session = get_session()
+    with session.begin():
+        overs = []
+        # Update the usages in a fixed order to avoid deadlocks between
+        # concurrent reservations.
+        for resource in sorted(deltas):
+            delta = deltas[resource]
+            if delta <= 0:
+                # Only positive deltas are reserved, see quota_reserve().
+                continue
+            query = model_query(context, models.QuotaUsage,
+                                read_deleted="no", session=session).\
+                filter_by(id=usages[resource].id)
+            if quotas[resource] >= 0:
+                query = query.filter(models.QuotaUsage.in_use +
+                                     models.QuotaUsage.reserved +
+                                     delta <= quotas[resource])
+            updated = query.update(
+                {'reserved': models.QuotaUsage.reserved + delta},
+                synchronize_session=False)
+            if not updated:
+                overs.append(resource)
+
+        if overs:
+            current = dict((row.resource, row) for row in
+                           model_query(context, models.QuotaUsage,
+                                       read_deleted="no", session=session).
+                           filter_by(project_id=project_id).
+                           all())
+            if all(resource in current for resource in overs):
+                usages = dict((k, dict(in_use=v['in_use'],
+                                       reserved=v['reserved']))
+                              for k, v in current.items())
+                raise exception.OverQuota(overs=sorted(overs),
+                                          quotas=quotas, usages=usages)
+            # The usage disappeared, e.g. the project's quotas were
+            # destroyed meanwhile; start over with the locking path.
+            raise _QuotaUsageGone()
+
+        reservations = []
+        for resource, delta in deltas.items():
+            reservation = _reservation_create(elevated,
+                                              str(uuid.uuid4()),
+                                              usages[resource],
+                                              project_id,
+                                              resource, delta, expire,
+                                              session=session)
+            reservations.append(reservation.uuid)
+
+    return reservations
+
+
+def _quota_reservations(session, context, reservations):
+    """Return the id, usage_id and delta of the listed reservations."""
+    return model_query(context, models.Reservation.id,
+                       models.Reservation.usage_id,
+                       models.Reservation.delta,
+                       read_deleted="no", session=session).\
         filter(models.Reservation.uuid.in_(reservations)).\
         with_lockmode('update').\
         all()
 
 
-@require_context
-def reservation_commit(context, reservations, project_id=None):
-    session = get_session()
-    with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+def _reservations_release(context, session, reservations, commit):
+    """Release a batch of reservations with set-based updates.
 
-        for reservation in _quota_reservations(session, context, reservations):
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
-            usage.in_use += reservation.delta
+    The deltas are summed up per usage, so every affected usage is updated
+    with a single statement, and the reservations are soft-deleted with
+    another one.  Positive deltas are taken back from the reserved count;
+    when committing, all deltas are also added to the in_use count.
 
-            reservation.delete(session=session)
+    :param reservations: (id, usage_id, delta) tuples of locked
+                         reservations
+    """
+    reserved = collections.defaultdict(int)
+    in_use = collections.defaultdict(int)
+    for _id, usage_id, delta in reservations:
+        if delta >= 0:
+            reserved[usage_id] += delta
+        if commit:
+            in_use[usage_id] += delta
+
+    # Update the usages in a fixed order to avoid deadlocks between
+    # concurrent releases.
+    for usage_id in sorted(set(reserved) | set(in_use)):
+        values = {}
+        if reserved[usage_id]:
+            values['reserved'] = (models.QuotaUsage.reserved -
+                                  reserved[usage_id])
+        if in_use[usage_id]:
+            values['in_use'] = models.QuotaUsage.in_use + in_use[usage_id]
+        if values:
+            model_query(context, models.QuotaUsage, read_deleted="no",
+                        session=session).\
+                filter_by(id=usage_id).\
+                update(values, synchronize_session=False)
 
-        for usage in usages.values():
-            usage.save(session=session)
+    model_query(context, models.Reservation, read_deleted="no",
+                session=session).\
+        filter(models.Reservation.id.in_([r[0] for r in reservations])).\
+        update({'deleted': True,
+                'deleted_at': timeutils.utcnow()},
+               synchronize_session=False)
 
 
-@require_context
-def reservation_rollback(context, reservations, project_id=None):
+def _reservations_release_by_uuid(context, reservations, commit,
+                                  project_id):
+    # All the reservations are released in one transaction, so that the
+    # usages are never left partly updated.
     session = get_session()
     with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+        # Lock the usages before the reservations, like quota_reserve().
+        _get_quota_usages(context, session, project_id)
+        rows = _quota_reservations(session, context, reservations)
+        if rows:
+            _reservations_release(context, session, rows, commit)
 
-        for reservation in _quota_reservations(session, context, reservations):
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
 
-            reservation.delete(session=session)
+@require_context
+def reservation_commit(context, reservations, project_id=None):
+    _reservations_release_by_uuid(context, reservations, True, project_id)
+
 
-        for usage in usages.values():
-            usage.save(session=session)
+@require_context
+def reservation_rollback(context, reservations, project_id=None):
+    _reservations_release_by_uuid(context, reservations, False, project_id)
 
 
 @require_admin_context
@@ -931,21 +1085,53 @@ def quota_destroy_all_by_project(context, project_id):
 
 @require_admin_context
 def reservation_expire(context):
-    session = get_session()
-    with session.begin():
-        current_time = timeutils.utcnow()
-        results = model_query(context, models.Reservation, session=session,
-                              read_deleted="no").\
-            filter(models.Reservation.expire < current_time).\
-            all()
+    """Roll back the expired reservations in batches.
 
-        if results:
-            for reservation in results:
-                if reservation.delta >= 0:
-                    reservation.usage.reserved -= reservation.delta
-                    reservation.usage.save(session=session)
+    Each batch of at most quota_reservation_batch_size reservations is
+    rolled back in its own transaction, walking the reservations by
+    primary key, so a large backlog neither holds locks for long nor
+    loses its progress on errors.
 
-                reservation.delete(session=session)
+    :returns: the number of expired reservations
+    """
+    current_time = timeutils.utcnow()
+    batch_size = CONF.quota_reservation_batch_size
+    last_id = 0
+    expired = 0
+    while True:
+        session = get_session()
+        with session.begin():
+            candidates = model_query(context, models.Reservation.id,
+                                     models.Reservation.project_id,
+                                     read_deleted="no", session=session).\
+                filter(models.Reservation.expire < current_time).\
+                filter(models.Reservation.id > last_id).\
+                order_by(models.Reservation.id).\
+                limit(batch_size).\
+                all()
+            if not candidates:
+                break
+            # Lock the usages before the reservations, like commit and
+            # rollback do, so that they cannot deadlock with each other.
+            for project_id in sorted(set(c[1] for c in candidates)):
+                _get_quota_usages(context, session, project_id)
+            # Reservations committed or rolled back in the meantime are
+            # deleted and skipped.
+            rows = model_query(context, models.Reservation.id,
+                               models.Reservation.usage_id,
+                               models.Reservation.delta,
+                               read_deleted="no", session=session).\
+                filter(models.Reservation.id.in_([c[0] for c in candidates])).\
+                order_by(models.Reservation.id).\
+                with_lockmode('update').\
+                all()
+            if rows:
+                _reservations_release(context, session, rows, commit=False)
+        expired += len(rows)
+        last_id = candidates[-1][0]
+        if len(candidates) < batch_size:
+            break
+    return expired
 
 
 ###################
@@ -1156,12 +1342,13 @@ def volume_get(context, volume_id):
 
 @require_admin_context
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, columns=None):
     """Retrieves all volumes.
 
     :param context: context to query under
     :param marker: the last item of the previous page, used to determine the
-                   next page of results to return
+                   next page of results to return; either its id or the
+                   list of its (sort_key, created_at, id) values
     :param limit: maximum number of items to return
     :param sort_key: single attributes by which results should be sorted
     :param sort_dir: direction in which results should be sorted (asc, desc)
@@ -1169,16 +1356,21 @@ def volume_get_all(context, marker, limit, sort_key, sort_dir,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param columns: if given, only these columns (and the pagination keys)
+                    are queried and the volumes are returned as dicts
     :returns: list of matching volumes
     """
     session = get_session()
     with session.begin():
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         columns=columns)
         # No volumes would match, return empty list
         if query == None:
             return []
+        if columns:
+            return [dict(zip(row.keys(), row)) for row in query.all()]
         return query.all()
 
 
@@ -1204,13 +1396,14 @@ def volume_get_all_by_instance_uuid(context, instance_uuid):
 
 @require_context
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None, columns=None):
     """"Retrieves all volumes in a project.
 
     :param context: context to query under
     :param project_id: project for all volumes being retrieved
     :param marker: the last item of the previous page, used to determine the
-                   next page of results to return
+                   next page of results to return; either its id or the
+                   list of its (sort_key, created_at, id) values
     :param limit: maximum number of items to return
     :param sort_key: single attributes by which results should be sorted
     :param sort_dir: direction in which results should be sorted (asc, desc)
@@ -1218,6 +1411,8 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param columns: if given, only these columns (and the pagination keys)
+                    are queried and the volumes are returned as dicts
     :returns: list of matching volumes
     """
     session = get_session()
@@ -1228,15 +1423,18 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
         filters['project_id'] = project_id
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         columns=columns)
         # No volumes would match, return empty list
         if query == None:
             return []
+        if columns:
+            return [dict(zip(row.keys(), row)) for row in query.all()]
         return query.all()
 
 
 def _generate_paginate_query(context, session, marker, limit, sort_key,
-                             sort_dir, filters):
+                             sort_dir, filters, columns=None):
     """Generate the query to include the filters and the paginate options.
 
     Returns a query with sorting / pagination criteria added or None
@@ -1245,7 +1443,9 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
     :param context: context to query under
     :param session: the session to use
     :param marker: the last item of the previous page; we returns the next
-                    results after this value.
+                    results after this value.  If it is the list of the
+                    (sort_key, created_at, id) values of that item, the
+                    item itself doesn't need to be loaded.
     :param limit: maximum number of items to return
     :param sort_key: single attributes by which results should be sorted
     :param sort_dir: direction in which results should be sorted (asc, desc)
@@ -1253,9 +1453,22 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
                     tuples, sets, or frozensets cause an 'IN' test to
                     be performed, while exact matching ('==' operator)
                     is used for other values
+    :param columns: names of the only columns to query, instead of the
+                    volumes and their relationships; the pagination keys
+                    are added
     :returns: updated query or None
     """
-    query = _volume_get_query(context, session=session)
+    if columns:
+        try:
+            columns = [getattr(models.Volume, key)
+                       for key in set(columns) |
+                       set([sort_key, 'created_at', 'id'])]
+        except AttributeError:
+            raise exception.InvalidInput(
+                reason=_('Invalid sort key: %s') % sort_key)
+        query = model_query(context, *columns, session=session)
+    else:
+        query = _volume_get_query(context, session=session)
 
     if filters:
         filters = filters.copy()
@@ -1275,63 +1488,104 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
                 LOG.debug(log_msg)
                 return None
 
-        # Apply exact match filters for everything else, ensure that the
-        # filter value exists on the model
-        for key in filters.keys():
-            # metadata is unique, must be a dict
-            if key == 'metadata':
-                if not isinstance(filters[key], dict):
-                    log_msg = _("'metadata' filter value is not valid.")
-                    LOG.debug(log_msg)
-                    return None
-                continue
-            try:
-                column_attr = getattr(models.Volume, key)
-                # Do not allow relationship properties since those require
-                # schema specific knowledge
-                prop = getattr(column_attr, 'property')
-                if isinstance(prop, RelationshipProperty):
-                    log_msg = (_("'%s' filter key is not valid, "
-                                 "it maps to a relationship.")) % key
-                    LOG.debug(log_msg)
-                    return None
-            except AttributeError:
-                log_msg = _("'%s' filter key is not valid.") % key
+        # metadata is unique, must be a dict
+        if 'metadata' in filters:
+            metadata = filters.pop('metadata')
+            if not isinstance(metadata, dict):
+                log_msg = _("'metadata' filter value is not valid.")
                 LOG.debug(log_msg)
                 return None
-
-        # Holds the simple exact matches
-        filter_dict = {}
-
-        # Iterate over all filters, special case the filter is necessary
-        for key, value in filters.iteritems():
-            if key == 'metadata':
-                # model.VolumeMetadata defines the backref to Volumes as
-                # 'volume_metadata', use that column attribute key
-                key = 'volume_metadata'
-                column_attr = getattr(models.Volume, key)
-                for k, v in value.iteritems():
-                    query = query.filter(column_attr.any(key=k, value=v))
-            elif isinstance(value, (list, tuple, set, frozenset)):
-                # Looking for values in a list; apply to query directly
-                column_attr = getattr(models.Volume, key)
-                query = query.filter(column_attr.in_(value))
-            else:
-                # OK, simple exact match; save for later
-                filter_dict[key] = value
-
-        # Apply simple exact matches
-        if filter_dict:
-            query = query.filter_by(**filter_dict)
-
-    marker_volume = None
-    if marker is not None:
+            # model.VolumeMetadata defines the backref to Volumes as
+            # 'volume_metadata', use that column attribute key
+            column_attr = getattr(models.Volume, 'volume_metadata')
+            for k, v in metadata.iteritems():
+                query = query.filter(column_attr.any(key=k, value=v))
+
+        query = _process_model_filters(query, models.Volume, filters)
+        if query is None:
+            return None
+
+    marker_volume = marker_values = None
+    if isinstance(marker, list):
+        marker_values = marker
+    elif marker is not None:
         marker_volume = _volume_get(context, marker, session)
 
     return sqlalchemyutils.paginate_query(query, models.Volume, limit,
                                           [sort_key, 'created_at', 'id'],
                                           marker=marker_volume,
-                                          sort_dir=sort_dir)
+                                          sort_dir=sort_dir,
+                                          marker_values=marker_values)
+
+
+def _process_model_filters(query, model, filters):
+    """Apply the filters on the columns of model to query.
+
+    Returns the filtered query or None if the given filters will not
+    yield any results.
+
+    :param query: the query to filter
+    :param model: the model the filter keys are columns of
+    :param filters: dictionary of filters; values that are lists,
+                    tuples, sets, or frozensets cause an 'IN' test to
+                    be performed, while exact matching ('==' operator)
+                    is used for other values
+    :returns: updated query or None
+    """
+    # Ensure that the filter value exists on the model
+    for key in filters.keys():
+        try:
+            column_attr = getattr(model, key)
+            # Do not allow relationship properties since those require
+            # schema specific knowledge
+            prop = getattr(column_attr, 'property')
+            if isinstance(prop, RelationshipProperty):
+                log_msg = (_("'%s' filter key is not valid, "
+                             "it maps to a relationship.")) % key
+                LOG.debug(log_msg)
+                return None
+        except AttributeError:
+            log_msg = _("'%s' filter key is not valid.") % key
+            LOG.debug(log_msg)
+            return None
+
+    # Holds the simple exact matches
+    filter_dict = {}
+
+    for key, value in filters.iteritems():
+        if isinstance(value, (list, tuple, set, frozenset)):
+            # Looking for values in a list; apply to query directly
+            column_attr = getattr(model, key)
+            query = query.filter(column_attr.in_(value))
+        else:
+            # OK, simple exact match; save for later
+            filter_dict[key] = value
+
+    # Apply simple exact matches
+    if filter_dict:
+        query = query.filter_by(**filter_dict)
+
+    return query
+
+
+def _generate_keyset_query(query, model, filters, limit, sort_key,
+                           sort_dir, cursor):
+    """Filter and paginate query on indexed (sort_key, created_at, id).
+
+    Without limit, sort_key and cursor the query is only filtered.
+    Returns None if the given filters will not yield any results.
+    """
+    if filters:
+        query = _process_model_filters(query, model, filters)
+        if query is None:
+            return None
+    if limit is None and sort_key is None and cursor is None:
+        return query
+    return sqlalchemyutils.paginate_query(query, model, limit,
+                                          [sort_key or 'created_at',
+                                           'created_at', 'id'],
+                                          sort_dir=sort_dir or 'desc',
+                                          marker_values=cursor)
 
 
 @require_admin_context
@@ -1607,10 +1861,13 @@ def snapshot_get(context, snapshot_id):
 
 
 @require_admin_context
-def snapshot_get_all(context):
-    return model_query(context, models.Snapshot).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+def snapshot_get_all(context, filters=None, limit=None, sort_key=None,
+                     sort_dir=None, cursor=None):
+    query = model_query(context, models.Snapshot).\
+        options(joinedload('snapshot_metadata'))
+    query = _generate_keyset_query(query, models.Snapshot, filters, limit,
+                                   sort_key, sort_dir, cursor)
+    return query.all() if query is not None else []
 
 
 @require_context
@@ -1623,12 +1880,15 @@ def snapshot_get_all_for_volume(context, volume_id):
 
 
 @require_context
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, filters=None, limit=None,
+                                sort_key=None, sort_dir=None, cursor=None):
     authorize_project_context(context, project_id)
-    return model_query(context, models.Snapshot).\
+    query = model_query(context, models.Snapshot).\
         filter_by(project_id=project_id).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+        options(joinedload('snapshot_metadata'))
+    query = _generate_keyset_query(query, models.Snapshot, filters, limit,
+                                   sort_key, sort_dir, cursor)
+    return query.all() if query is not None else []
 
 
 @require_context
@@ -1669,7 +1929,7 @@ def snapshot_get_active_by_window(context, begin, end=None, project_id=None):
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Snapshot.id).all()
 
 
 @require_context
@@ -1991,7 +2251,7 @@ def volume_get_active_by_window(context,
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Volume.id).all()
 
 
 ####################
@@ -2429,22 +2689,27 @@ def volume_encryption_metadata_get(context, volume_id, session=None):
 
 
 @require_context
-def _volume_glance_metadata_get_all(context, session=None):
-    rows = model_query(context,
-                       models.VolumeGlanceMetadata,
-                       project_only=True,
-                       session=session).\
-        filter_by(deleted=False).\
-        all()
+def _volume_glance_metadata_get_all(context, session=None, volume_ids=None):
+    query = model_query(context,
+                        models.VolumeGlanceMetadata,
+                        session=session).\
+        filter_by(deleted=False)
+    if is_user_context(context):
+        # The glance metadata has no project_id of its own.
+        query = query.join('volume').\
+            filter(models.Volume.project_id == context.project_id)
+    if volume_ids is not None:
+        query = query.filter(
+            models.VolumeGlanceMetadata.volume_id.in_(volume_ids))
 
-    return rows
+    return query.all()
 
 
 @require_context
-def volume_glance_metadata_get_all(context):
-    """Return the Glance metadata for all volumes."""
+def volume_glance_metadata_get_all(context, volume_ids=None):
+    """Return the Glance metadata for all volumes, or the given ones."""
 
-    return _volume_glance_metadata_get_all(context)
+    return _volume_glance_metadata_get_all(context, volume_ids=volume_ids)
 
 
 @require_context
@@ -2626,8 +2891,12 @@ def backup_get(context, backup_id):
 
 
 @require_admin_context
-def backup_get_all(context):
-    return model_query(context, models.Backup).all()
+def backup_get_all(context, filters=None, limit=None, sort_key=None,
+                   sort_dir=None, cursor=None):
+    query = _generate_keyset_query(model_query(context, models.Backup),
+                                   models.Backup, filters, limit, sort_key,
+                                   sort_dir, cursor)
+    return query.all() if query is not None else []
 
 
 @require_admin_context
@@ -2636,11 +2905,15 @@ def backup_get_all_by_host(context, host):
 
 
 @require_context
-def backup_get_all_by_project(context, project_id):
+def backup_get_all_by_project(context, project_id, filters=None, limit=None,
+                              sort_key=None, sort_dir=None, cursor=None):
     authorize_project_context(context, project_id)
 
-    return model_query(context, models.Backup).\
-        filter_by(project_id=project_id).all()
+    query = model_query(context, models.Backup).\
+        filter_by(project_id=project_id)
+    query = _generate_keyset_query(query, models.Backup, filters, limit,
+                                   sort_key, sort_dir, cursor)
+    return query.all() if query is not None else []
 
 
 @require_context
@@ -2670,6 +2943,54 @@ def backup_update(context, backup_id, values):
     return backup
 
 
+@require_context
+def backup_mark_deleting(context, backup_id):
+    session = get_session()
+    with session.begin():
+        backup = model_query(context, models.Backup, session=session,
+                             project_only=True).\
+            filter_by(id=backup_id).\
+            with_lockmode('update').\
+            first()
+
+        if not backup:
+            raise exception.BackupNotFound(backup_id=backup_id)
+        if backup.status not in ['available', 'error']:
+            msg = _('Backup status must be available or error')
+            raise exception.InvalidBackup(reason=msg)
+        # Incremental backups keep referencing the data of their parent,
+        # unless they failed.
+        children = model_query(context, models.Backup, session=session).\
+            filter_by(parent_id=backup_id).\
+            filter(models.Backup.status != 'error').\
+            count()
+        if children:
+            msg = _('Incremental backups exist for this backup')
+            raise exception.InvalidBackup(reason=msg)
+
+        backup.status = 'deleting'
+        backup.save(session=session)
+    return backup
+
+
+@require_context
+def backup_set_parent(context, backup_id, parent_id):
+    session = get_session()
+    with session.begin():
+        # Locking the parent serializes this with its deletion.
+        parent = model_query(context, models.Backup, session=session).\
+            filter_by(id=parent_id).\
+            with_lockmode('update').\
+            first()
+        if not parent or parent.status != 'available':
+            return False
+
+        model_query(context, models.Backup, session=session).\
+            filter_by(id=backup_id).\
+            update({'parent_id': parent_id})
+    return True
+
+
 @require_admin_context
 def backup_destroy(context, backup_id):
     model_query(context, models.Backup).\
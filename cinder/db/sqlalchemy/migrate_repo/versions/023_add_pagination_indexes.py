@@ -0,0 +1,38 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+
+TABLES = ('volumes', 'snapshots', 'backups')
+
+
+def _index(table):
+    # Covers listing a project's rows in (created_at, id) order, which is
+    # what keyset pagination seeks on.
+    return Index('%s_project_created_at_idx' % table.name,
+                 table.c.project_id, table.c.deleted,
+                 table.c.created_at, table.c.id)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    for name in TABLES:
+        _index(Table(name, meta, autoload=True)).create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    for name in TABLES:
+        _index(Table(name, meta, autoload=True)).drop(migrate_engine)
@@ -424,6 +424,7 @@ class Backup(BASE, CinderBase):
     service = Column(String(255))
     size = Column(Integer)
     object_count = Column(Integer)
+    parent_id = Column(String(36))
 
 
 class Encryption(BASE, CinderBase):
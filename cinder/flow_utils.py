@@ -11,8 +11,17 @@
 #    under the License.
 
 # For more information please visit: https://wiki.openstack.org/wiki/TaskFlow
+import collections
+import time
+
+import taskflow.engines
+from taskflow import states
 from taskflow import task
 
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
 
 def _make_task_name(cls, addons=None):
     """Makes a pretty name for a task class."""
@@ -34,3 +43,60 @@ class CinderTask(task.Task):
         super(CinderTask, self).__init__(_make_task_name(self.__class__,
                                                          addons),
                                          **kwargs)
+
+
+class FlowCache(object):
+    """Flows built once and loaded into a new engine for every run.
+
+    Building a flow creates its pattern and all of its tasks; a cached flow
+    only needs an engine, which holds the state of a single run.  The tasks
+    of a cached flow are shared by concurrent runs, so they must take the
+    values of a request from the engine store and not keep them on self.
+    """
+
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self._flows = collections.OrderedDict()
+
+    def get(self, key, build_flow):
+        """Return the flow cached for key, building it if needed.
+
+        key is usually the tuple of objects the tasks are built with.
+        """
+        try:
+            flow = self._flows.pop(key)
+        except KeyError:
+            flow = build_flow()
+            if len(self._flows) >= self.max_size:
+                self._flows.popitem(last=False)
+        self._flows[key] = flow
+        return flow
+
+
+class TaskTimer(object):
+    """Logs how long each task run by an engine took."""
+
+    def __init__(self, engine):
+        self._started = {}
+        engine.task_notifier.register(states.RUNNING, self._on_running)
+        engine.task_notifier.register(states.SUCCESS, self._on_done)
+        engine.task_notifier.register(states.FAILURE, self._on_done)
+
+    def _on_running(self, state, details):
+        self._started[details['task_name']] = time.time()
+
+    def _on_done(self, state, details):
+        task_name = details['task_name']
+        started = self._started.pop(task_name, None)
+        if started is None:
+            return
+        LOG.debug(_("Task %(task)s %(state)s in %(seconds).3f seconds"),
+                  {'task': task_name, 'state': state.lower(),
+                   'seconds': time.time() - started})
+
+
+def load_flow(flow, store):
+    """Loads (but does not run) flow in a new, timed engine."""
+    engine = taskflow.engines.load(flow, store=store)
+    TaskTimer(engine)
+    return engine
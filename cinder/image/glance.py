@@ -19,13 +19,20 @@
 
 from __future__ import absolute_import
 
+import collections
 import copy
+import hashlib
+import httplib
 import itertools
+import os
 import random
 import shutil
+import socket
+import ssl
 import sys
 import time
 
+from eventlet import greenpool
 import glanceclient.exc
 from oslo.config import cfg
 import six.moves.urllib.parse as urlparse
@@ -34,6 +41,7 @@ from cinder import exception
 from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
+from cinder import units
 
 glance_opts = [
     cfg.ListOpt('allowed_direct_url_schemes',
@@ -41,6 +49,19 @@ glance_opts = [
                 help='A list of url schemes that can be downloaded directly '
                      'via the direct_url.  Currently supported schemes: '
                      '[file].'),
+    cfg.IntOpt('glance_download_workers',
+               default=1,
+               help='Number of ranges of an image downloaded concurrently '
+                    'from glance into a file, 1 to download it as a single '
+                    'stream'),
+    cfg.IntOpt('glance_download_chunk_size_mb',
+               default=64,
+               help='Size in MiB of the ranges of an image downloaded '
+                    'concurrently from glance'),
+    cfg.IntOpt('glance_client_cache_size',
+               default=64,
+               help='Number of glance clients kept for reuse across calls, '
+                    'one per glance server, API version and token'),
 ]
 CONF = cfg.CONF
 CONF.register_opts(glance_opts)
@@ -48,6 +69,13 @@ CONF.import_opt('glance_api_version', 'cinder.common.config')
 
 LOG = logging.getLogger(__name__)
 
+# Size of the reads of an image body, when downloading it by ranges.
+_READ_SIZE = 64 * units.KiB
+
+# Clients of the glance servers, reused across calls, most recently used
+# last.
+_clients = collections.OrderedDict()
+
 
 def _parse_image_ref(image_href):
     """Parse an image href into composite parts.
@@ -85,6 +113,38 @@ def _create_glance_client(context, netloc, use_ssl,
     return glanceclient.Client(str(version), endpoint, **params)
 
 
+def _get_glance_client(context, netloc, use_ssl, version):
+    """Return a client of a glance server, reusing one created earlier.
+
+    Clients are bound to the token of the context they were created for,
+    which is part of the key they are kept under.
+    """
+    key = (netloc, use_ssl, version, getattr(context, 'auth_token', None))
+    client = _clients.pop(key, None)
+    if client is None:
+        client = _create_glance_client(context, netloc, use_ssl, version)
+    _clients[key] = client
+    while len(_clients) > CONF.glance_client_cache_size:
+        _clients.popitem(last=False)
+    return client
+
+
+def _forget_glance_client(netloc, use_ssl):
+    """Drop the clients of a glance server which failed to answer."""
+    for key in _clients.keys():
+        if key[:2] == (netloc, use_ssl):
+            del _clients[key]
+
+
+def _log_throughput(action, image_id, size, start):
+    elapsed = max(time.time() - start, 0.001)
+    LOG.info(_("%(action)s image %(image_id)s: %(size)d bytes in "
+               "%(elapsed).2f s (%(rate).2f MB/s)") %
+             {'action': action, 'image_id': image_id, 'size': size,
+              'elapsed': elapsed,
+              'rate': size / elapsed / units.MiB})
+
+
 def get_api_servers():
     """Return Iterable over shuffled api servers.
 
@@ -128,13 +188,22 @@ class GlanceClientWrapper(object):
                                      self.use_ssl, self.version)
 
     def _create_onetime_client(self, context, version):
-        """Create a client that will be used for one call."""
+        """Get a client of the next server, which will be used for one call.
+
+        Clients are reused by later calls to the same server, until the
+        server fails to answer.
+        """
+        self.netloc, self.use_ssl = self.get_endpoint()
+        return _get_glance_client(context, self.netloc, self.use_ssl,
+                                  version)
+
+    def get_endpoint(self):
+        """Return (netloc, use_ssl) of the server to send a request to."""
+        if self.client:
+            return self.netloc, self.use_ssl
         if self.api_servers is None:
             self.api_servers = get_api_servers()
-        self.netloc, self.use_ssl = self.api_servers.next()
-        return _create_glance_client(context,
-                                     self.netloc,
-                                     self.use_ssl, version)
+        return self.api_servers.next()
 
     def call(self, context, method, *args, **kwargs):
         """Call a glance client method.
@@ -158,6 +227,8 @@ class GlanceClientWrapper(object):
                 return getattr(client.images, method)(*args, **kwargs)
             except retry_excs as e:
                 netloc = self.netloc
+                if not self.client:
+                    _forget_glance_client(self.netloc, self.use_ssl)
                 extra = "retrying"
                 error_msg = _("Error contacting glance server "
                               "'%(netloc)s' for '%(method)s', "
@@ -264,6 +335,23 @@ class GlanceImageService(object):
                     shutil.copyfileobj(f, data)
                 return
 
+        if (data is not None and CONF.glance_download_workers > 1 and
+                os.path.isfile(getattr(data, 'name', ''))):
+            try:
+                image = self._client.call(context, 'get', image_id)
+            except Exception:
+                _reraise_translated_image_exception(image_id)
+            chunk_size = CONF.glance_download_chunk_size_mb * units.MiB
+            if image.size > chunk_size:
+                download = _RangedDownload(self._client, context, image, data)
+                if download.use_ssl and download.ssl_context is None:
+                    LOG.debug(_("Cannot verify https connections to glance "
+                                "the way glance clients do, downloading "
+                                "image %s over a single stream") % image_id)
+                else:
+                    download.run()
+                    return
+
         try:
             image_chunks = self._client.call(context, 'data', image_id)
         except Exception:
@@ -272,8 +360,12 @@ class GlanceImageService(object):
         if not data:
             return image_chunks
         else:
+            start = time.time()
+            size = 0
             for chunk in image_chunks:
                 data.write(chunk)
+                size += len(chunk)
+            _log_throughput('Downloaded', image_id, size, start)
 
     def create(self, context, image_meta, data=None):
         """Store the image data and return the new image object."""
@@ -299,6 +391,7 @@ class GlanceImageService(object):
         image_meta.pop('id', None)
         if data:
             image_meta['data'] = data
+        start = time.time()
         try:
             #NOTE(dosaboy): the v2 api separates update from upload
             if data and CONF.glance_api_version > 1:
@@ -310,6 +403,8 @@ class GlanceImageService(object):
         except Exception:
             _reraise_translated_image_exception(image_id)
         else:
+            if data and hasattr(data, 'tell'):
+                _log_throughput('Uploaded', image_id, data.tell(), start)
             return self._translate_from_glance(image_meta)
 
     def delete(self, context, image_id):
@@ -369,6 +464,154 @@ class GlanceImageService(object):
         return str(user_id) == str(context.user_id)
 
 
+def _get_ssl_context():
+    """Return an SSL context with the settings of the glance clients.
+
+    Returns None when Python cannot verify certificates (before 2.7.9).
+    """
+    if not hasattr(ssl, 'create_default_context'):
+        return None
+    context = ssl.create_default_context()
+    if CONF.glance_api_insecure:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if not CONF.glance_api_ssl_compression:
+        context.options |= getattr(ssl, 'OP_NO_COMPRESSION', 0)
+    return context
+
+
+class _RangedDownload(object):
+    """Download an image into a file by ranges, over parallel connections.
+
+    Each worker keeps its connection open for the ranges it fetches and
+    writes them at their offsets in the file.  A server which ignores the
+    Range header gets the whole image downloaded from its first answer.
+    """
+
+    def __init__(self, client, context, image, data):
+        self.client = client
+        self.context = context
+        self.image = image
+        self.path = data.name
+        self.chunk_size = CONF.glance_download_chunk_size_mb * units.MiB
+        self.netloc, self.use_ssl = client.get_endpoint()
+        self.ssl_context = _get_ssl_context() if self.use_ssl else None
+        version = client.version or CONF.glance_api_version
+        if version == 1:
+            self.url = '/v1/images/%s' % image.id
+        else:
+            self.url = '/v2/images/%s/file' % image.id
+        self.headers = {'Connection': 'keep-alive'}
+        if CONF.auth_strategy == 'keystone' and context.auth_token:
+            self.headers['X-Auth-Token'] = context.auth_token
+        # Ranges not fetched yet, shared by the workers.
+        self.ranges = collections.deque(
+            (offset, min(offset + self.chunk_size, image.size) - 1)
+            for offset in xrange(0, image.size, self.chunk_size))
+
+    def run(self):
+        start = time.time()
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.image.size)
+        conn = self._connect()
+        try:
+            ranged = self._fetch(conn, self.ranges.popleft())
+        except Exception:
+            conn.close()
+            raise
+        if ranged and self.ranges:
+            workers = min(CONF.glance_download_workers, len(self.ranges))
+            pool = greenpool.GreenPool(workers)
+            threads = [pool.spawn(self._worker, conn)]
+            threads.extend(pool.spawn(self._worker, None)
+                           for _i in xrange(workers - 1))
+            for thread in threads:
+                thread.wait()
+        else:
+            conn.close()
+        self._verify()
+        _log_throughput('Downloaded', self.image.id, self.image.size, start)
+
+    def _connect(self):
+        if self.use_ssl:
+            return httplib.HTTPSConnection(
+                self.netloc, timeout=CONF.glance_request_timeout,
+                context=self.ssl_context)
+        return httplib.HTTPConnection(self.netloc,
+                                      timeout=CONF.glance_request_timeout)
+
+    def _worker(self, conn):
+        conn = conn or self._connect()
+        try:
+            while self.ranges:
+                self._fetch(conn, self.ranges.popleft())
+        except Exception:
+            # Stop the other workers, the download failed.
+            self.ranges.clear()
+            raise
+        finally:
+            conn.close()
+
+    def _fetch(self, conn, byte_range):
+        """Write a range of the image to the file, with retries.
+
+        Returns False if the server sent the whole image instead.
+        """
+        num_attempts = 1 + CONF.glance_num_retries
+        for attempt in xrange(1, num_attempts + 1):
+            try:
+                return self._fetch_once(conn, byte_range)
+            except (socket.error, httplib.HTTPException) as e:
+                conn.close()
+                LOG.warn(_("Error downloading bytes %(range)s of image "
+                           "%(image_id)s from '%(netloc)s': %(error)s") %
+                         {'range': '%d-%d' % byte_range,
+                          'image_id': self.image.id, 'netloc': self.netloc,
+                          'error': e})
+                if attempt == num_attempts:
+                    raise exception.GlanceConnectionFailed(reason=e)
+                time.sleep(1)
+
+    def _fetch_once(self, conn, byte_range):
+        headers = dict(self.headers, Range='bytes=%d-%d' % byte_range)
+        conn.request('GET', self.url, headers=headers)
+        resp = conn.getresponse()
+        if resp.status == httplib.OK:
+            offset = 0
+            self.ranges.clear()
+        elif resp.status == httplib.PARTIAL_CONTENT:
+            offset = byte_range[0]
+        else:
+            resp.read()
+            raise exception.GlanceConnectionFailed(
+                reason=_("unexpected status %(status)d for image "
+                         "%(image_id)s") % {'status': resp.status,
+                                            'image_id': self.image.id})
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            while True:
+                chunk = resp.read(_READ_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+        return resp.status == httplib.PARTIAL_CONTENT
+
+    def _verify(self):
+        """Check the downloaded file against the checksum of the image."""
+        if not self.image.checksum:
+            return
+        checksum = hashlib.md5()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_READ_SIZE), ''):
+                checksum.update(chunk)
+        if checksum.hexdigest() != self.image.checksum:
+            raise exception.ImageCopyFailure(
+                reason=_("downloaded data of image %(image_id)s has "
+                         "checksum %(actual)s, expected %(expected)s") %
+                {'image_id': self.image.id, 'actual': checksum.hexdigest(),
+                 'expected': self.image.checksum})
+
+
 def _convert_timestamps_to_datetimes(image_meta):
     """Returns image with timestamp fields converted to datetime objects."""
     for attr in ['created_at', 'updated_at', 'deleted_at']:
@@ -0,0 +1,174 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Cache of images converted for a volume backend.
+
+Creating many volumes from the same image downloads and converts it once,
+the following volumes are copied or cloned from the cached entry.  Where
+and how an entry is stored is up to the driver, see ImageCache.
+"""
+
+import contextlib
+import hashlib
+import os
+import time
+
+from cinder.openstack.common import fileutils
+from cinder.openstack.common import jsonutils
+from cinder.openstack.common import lockutils
+from cinder.openstack.common import log as logging
+from cinder import units
+
+
+LOG = logging.getLogger(__name__)
+
+
+def get_cache_key(image_id, image_meta, volume_format='raw'):
+    """Return the key of an image converted to volume_format.
+
+    The checksum is part of the key, so an image whose data changed is not
+    served from an older entry.
+    """
+    checksum = image_meta.get('checksum') or image_meta.get('updated_at')
+    return hashlib.sha1('%s:%s:%s' % (image_id, checksum,
+                                      volume_format)).hexdigest()
+
+
+class ImageCache(object):
+    """LRU cache of converted images, bounded by total size and count.
+
+    The index of the entries is kept in index_dir, the entries themselves
+    are created and deleted by the given functions:
+
+        create_entry(context, image_service, image_id, key, **kwargs)
+            stores the image and returns the entry, a dict with at least
+            its 'location' and its 'size' in bytes
+        delete_entry(location)
+
+    Only one download of an image runs at a time, others asking for the
+    same entry wait for it.  Entries in use are not evicted.
+    """
+
+    def __init__(self, index_dir, create_entry, delete_entry,
+                 max_size_gb=0, max_count=0):
+        self.index_dir = index_dir
+        self._create_entry = create_entry
+        self._delete_entry = delete_entry
+        self.max_size = max_size_gb * units.GiB
+        self.max_count = max_count
+        self._index_path = os.path.join(index_dir, 'index.json')
+        self._in_use = {}
+        fileutils.ensure_tree(index_dir)
+        self._entries = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return {}
+        try:
+            with open(self._index_path) as f:
+                return jsonutils.loads(f.read())
+        except ValueError:
+            LOG.warn(_("Ignoring the corrupt image cache index %s"),
+                     self._index_path)
+            return {}
+
+    def _save_index(self):
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(jsonutils.dumps(self._entries))
+        os.rename(tmp_path, self._index_path)
+
+    @contextlib.contextmanager
+    def _hold(self, key):
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+
+    def _touch(self, key):
+        entry = self._entries[key]
+        entry['last_used'] = time.time()
+        self._save_index()
+        return entry
+
+    @contextlib.contextmanager
+    def lookup(self, image_id, image_meta, volume_format='raw'):
+        """Yield the cached entry of an image, or None if there is none.
+
+        The entry is not evicted until the block exits.
+        """
+        key = get_cache_key(image_id, image_meta, volume_format)
+        if key not in self._entries:
+            yield None
+            return
+        with self._hold(key):
+            LOG.debug(_("Image cache hit for image %s"), image_id)
+            yield self._touch(key)
+
+    @contextlib.contextmanager
+    def get(self, context, image_service, image_id, image_meta,
+            volume_format='raw', **kwargs):
+        """Yield the cached entry of an image, creating it if needed.
+
+        kwargs are passed to create_entry.  The entry is not evicted until
+        the block exits.
+        """
+        key = get_cache_key(image_id, image_meta, volume_format)
+
+        @lockutils.synchronized(key, 'cinder-image-cache-')
+        def _get_entry():
+            if key in self._entries:
+                LOG.debug(_("Image cache hit for image %s"), image_id)
+                return self._touch(key)
+
+            LOG.info(_("Caching image %s"), image_id)
+            entry = self._create_entry(context, image_service, image_id, key,
+                                       **kwargs)
+            entry.update(image_id=image_id, last_used=time.time())
+            self._entries[key] = entry
+            self._save_index()
+            self._evict()
+            return self._entries[key]
+
+        with self._hold(key):
+            yield _get_entry()
+
+    def _evict(self):
+        by_age = sorted(self._entries.items(),
+                        key=lambda item: item[1]['last_used'])
+        total_size = sum(entry['size'] for entry in self._entries.values())
+        count = len(self._entries)
+        for key, entry in by_age:
+            if ((not self.max_size or total_size <= self.max_size) and
+                    (not self.max_count or count <= self.max_count)):
+                break
+            if key in self._in_use:
+                continue
+            LOG.info(_("Evicting image %s from the image cache"),
+                     entry['image_id'])
+            try:
+                self._delete_entry(entry['location'])
+            except Exception:
+                LOG.exception(_("Failed to delete image cache entry %s"),
+                              entry['location'])
+                continue
+            del self._entries[key]
+            total_size -= entry['size']
+            count -= 1
+        self._save_index()
@@ -25,6 +25,7 @@ we should look at maybe pushing this up to Oslo
 
 
 import contextlib
+import hashlib
 import os
 import tempfile
 
@@ -44,7 +45,18 @@ LOG = logging.getLogger(__name__)
 image_helper_opt = [cfg.StrOpt('image_conversion_dir',
                     default='$state_path/conversion',
                     help='Directory used for temporary storage '
-                         'during image conversion'), ]
+                         'during image conversion'),
+                    cfg.BoolOpt('image_stream_raw',
+                                default=True,
+                                help='Write raw images to raw volumes as '
+                                     'they are downloaded, rather than '
+                                     'staging them in '
+                                     'image_conversion_dir first'),
+                    cfg.IntOpt('image_stream_buffer_size',
+                               default=4 * units.MiB,
+                               help='Bytes of a streamed image buffered '
+                                    'before they are written to the '
+                                    'volume'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(image_helper_opt)
@@ -81,6 +93,78 @@ def fetch(context, image_service, image_id, path, _user_id, _project_id):
             image_service.download(context, image_id, image_file)
 
 
+# Signatures of the image formats qemu-img probes for, as (offset, magic).
+# Data which starts with one of them is not treated as raw, whatever Glance
+# says, since qemu would read it as that format.
+IMAGE_SIGNATURES = ((0, 'QFI\xfb'),                  # qcow, qcow2
+                    (0, 'QED\0'),                    # qed
+                    (0, 'KDMV'),                     # vmdk
+                    (0, '# Disk DescriptorFile'),    # vmdk descriptor
+                    (0, 'COWD'),                     # vmdk (ESX)
+                    (0, 'conectix'),                 # vpc
+                    (0, 'vhdxfile'),                 # vhdx
+                    (0, 'OOOM'),                     # cow
+                    (0, 'Bochs Virtual HD Image'),   # bochs
+                    (0, '#!/bin/sh\n#V2.0 Format'),  # cloop
+                    (0, 'WithoutFreeSpace'),         # parallels
+                    (0, 'LUKS\xba\xbe'),              # luks
+                    (64, '\x7f\x10\xda\xbe'))        # vdi
+PROBE_SIZE = 512
+
+
+class _NotRawImage(Exception):
+    pass
+
+
+class _RawImageWriter(object):
+    """Write raw image data to a volume as it is downloaded.
+
+    Holds back the start of the image until it can check that it is not
+    in another format, and checksums everything written.
+    """
+
+    def __init__(self, dest_file, image_id, max_size=None):
+        self._dest_file = dest_file
+        self._image_id = image_id
+        self._max_size = max_size
+        self._header = []
+        self._header_size = 0
+        self.size = 0
+        self.checksum = hashlib.md5()
+
+    def write(self, data):
+        if self._header is not None:
+            self._header.append(data)
+            self._header_size += len(data)
+            if self._header_size < PROBE_SIZE:
+                return
+            data = self._flush_header()
+        self._write(data)
+
+    def close(self):
+        if self._header is not None:
+            self._write(self._flush_header())
+        self._dest_file.flush()
+        os.fsync(self._dest_file.fileno())
+
+    def _flush_header(self):
+        header = ''.join(self._header)
+        self._header = None
+        for offset, magic in IMAGE_SIGNATURES:
+            if header[offset:offset + len(magic)] == magic:
+                raise _NotRawImage()
+        return header
+
+    def _write(self, data):
+        self.size += len(data)
+        if self._max_size is not None and self.size > self._max_size:
+            raise exception.ImageUnacceptable(
+                image_id=self._image_id,
+                reason=_("Image is larger than the volume"))
+        self.checksum.update(data)
+        self._dest_file.write(data)
+
+
 def fetch_verify_image(context, image_service, image_id, dest,
                        user_id=None, project_id=None, size=None):
     fetch(context, image_service, image_id, dest,
@@ -135,6 +219,12 @@ def fetch_to_volume_format(context, image_service,
     qemu_img = True
     image_meta = image_service.show(context, image_id)
 
+    if (CONF.image_stream_raw and volume_format == 'raw' and image_meta and
+            image_meta['disk_format'] == 'raw'):
+        if stream_raw_to_volume(context, image_service, image_id, image_meta,
+                                dest, size):
+            return
+
     # NOTE(avishay): I'm not crazy about creating temp files which may be
     # large and cause disk full errors which would confuse users.
     # Unfortunately it seems that you can't pipe to 'qemu-img convert' because
@@ -208,11 +298,8 @@ def fetch_to_volume_format(context, image_service,
 
         # NOTE(jdg): I'm using qemu-img convert to write
         # to the volume regardless if it *needs* conversion or not
-        # TODO(avishay): We can speed this up by checking if the image is raw
-        # and if so, writing directly to the device. However, we need to keep
-        # check via 'qemu-img info' that what we copied was in fact a raw
-        # image and not a different format with a backing file, which may be
-        # malicious.
+        # Raw images normally do not get here, stream_raw_to_volume writes
+        # them directly to the device.
         LOG.debug("%s was %s, converting to %s " % (image_id, fmt,
                                                     volume_format))
         convert_image(tmp, dest, volume_format)
@@ -227,6 +314,56 @@ def fetch_to_volume_format(context, image_service,
                                                    file_format})
 
 
+@contextlib.contextmanager
+def _writable(path):
+    if (os.name == 'nt' or os.access(path, os.W_OK) or
+            not os.path.exists(path)):
+        yield
+    else:
+        with utils.temporary_chown(path):
+            yield
+
+
+def stream_raw_to_volume(context, image_service, image_id, image_meta, dest,
+                         size=None):
+    """Write a raw image to a volume without staging it in a file.
+
+    :returns: False, before anything is written, if the image data is in
+              another format, in which case it has to be converted
+    """
+    image_size = image_meta.get('size')
+    if size is not None and image_size and image_size > size * units.GiB:
+        params = {'image_size': image_size / float(units.GiB),
+                  'volume_size': size}
+        reason = _("Size is %(image_size).2fGB and doesn't fit in a "
+                   "volume of size %(volume_size)dGB.") % params
+        raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+
+    max_size = size * units.GiB if size is not None else None
+    with _writable(dest):
+        with open(dest, 'wb', CONF.image_stream_buffer_size) as dest_file:
+            writer = _RawImageWriter(dest_file, image_id, max_size)
+            try:
+                image_service.download(context, image_id, writer)
+                writer.close()
+            except _NotRawImage:
+                LOG.warn(_("Image %s is not raw data, converting it "
+                           "instead") % image_id)
+                return False
+
+    checksum = image_meta.get('checksum')
+    if checksum and writer.checksum.hexdigest() != checksum:
+        raise exception.ImageUnacceptable(
+            image_id=image_id,
+            reason=_("Checksum %(actual)s of the data written does not "
+                     "match the image checksum %(expected)s") %
+            {'actual': writer.checksum.hexdigest(), 'expected': checksum})
+    LOG.debug(_('Streamed %(size)d bytes of image %(image_id)s to '
+                '%(dest)s') % {'size': writer.size, 'image_id': image_id,
+                               'dest': dest})
+    return True
+
+
 def upload_volume(context, image_service, image_meta, volume_path,
                   volume_format='raw'):
     image_id = image_meta['id']
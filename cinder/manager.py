@@ -51,18 +51,31 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
 
 from oslo.config import cfg
 from oslo import messaging
 
 from cinder.db import base
+from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import periodic_task
 from cinder.scheduler import rpcapi as scheduler_rpcapi
 from cinder import version
 
 
+manager_opts = [
+    cfg.IntOpt('capabilities_full_report_interval',
+               default=10,
+               help='Number of capability reports sent to the schedulers '
+                    'after which all capabilities are sent again; the '
+                    'reports in between only carry the capabilities which '
+                    'changed. Set to 1 to always send all of them, as '
+                    'schedulers older than this release expect.'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(manager_opts)
 LOG = logging.getLogger(__name__)
 
 
@@ -115,6 +128,12 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
+        # The capabilities last sent to the schedulers, and the number of
+        # partial reports sent since the last full one.
+        self._published_capabilities = None
+        self._capabilities_seq = 0
+        # Bytes of capabilities not sent thanks to partial reports.
+        self.capabilities_bytes_saved = 0
         super(SchedulerDependentManager, self).__init__(host, db_driver)
 
     def update_service_capabilities(self, capabilities):
@@ -122,12 +141,54 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = capabilities
 
     @periodic_task.periodic_task
-    def _publish_service_capabilities(self, context):
-        """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
-            LOG.debug(_('Notifying Schedulers of capabilities ...'))
+    def _publish_service_capabilities(self, context, full=False):
+        """Pass data back to the scheduler at a periodic interval.
+
+        All capabilities are sent when full is set, every
+        capabilities_full_report_interval reports, and whenever the
+        schedulers cannot take partial reports yet.  The reports in between
+        only carry the capabilities which changed since the previous one,
+        numbered from the last full report so that the schedulers notice a
+        missed one.
+        """
+        if not self.last_capabilities:
+            return
+        LOG.debug(_('Notifying Schedulers of capabilities ...'))
+        capabilities = self.last_capabilities
+        published = self._published_capabilities
+        if (full or published is None or
+                self._capabilities_seq + 1 >=
+                CONF.capabilities_full_report_interval or
+                not self.scheduler_rpcapi.can_send_partial_capabilities()):
+            # Full reports keep the signature older schedulers understand.
+            self.scheduler_rpcapi.update_service_capabilities(
+                context,
+                self.service_name,
+                self.host,
+                capabilities)
+            self._capabilities_seq = 0
+        else:
+            self._capabilities_seq += 1
+            changed = dict((key, value)
+                           for key, value in capabilities.iteritems()
+                           if key not in published or
+                           published[key] != value)
+            removed = [key for key in published if key not in capabilities]
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
-                self.last_capabilities)
+                changed,
+                seq=self._capabilities_seq,
+                full=False,
+                removed=removed)
+            saved = (len(jsonutils.dumps(capabilities)) -
+                     len(jsonutils.dumps({'capabilities': changed,
+                                          'removed_capabilities': removed})))
+            self.capabilities_bytes_saved += max(saved, 0)
+            LOG.debug(_('Sent %(changed)d changed and %(removed)d removed '
+                        'capabilities, %(saved)d bytes saved so far') %
+                      {'changed': len(changed), 'removed': len(removed),
+                       'saved': self.capabilities_bytes_saved})
+        # Drivers may update their stats in place, keep our own copy.
+        self._published_capabilities = copy.deepcopy(capabilities)
@@ -23,47 +23,88 @@ from cinder.openstack.common.scheduler.filters import extra_specs_ops
 LOG = logging.getLogger(__name__)
 
 
-class CapabilitiesFilter(filters.BaseHostFilter):
-    """HostFilter to work with resource (instance & volume) type records."""
+class ExtraSpecsMatcher(object):
+    """The extra specs of a resource type, compiled for matching.
 
-    def _satisfies_extra_specs(self, capabilities, resource_type):
-        """Check that the capabilities provided by the services satisfy
-        the extra specs associated with the resource type.
-        """
-        extra_specs = resource_type.get('extra_specs', [])
-        if not extra_specs:
-            return True
+    The scopes of the keys are split and the requirements parsed once,
+    rather than for every host.
+    """
 
-        for key, req in six.iteritems(extra_specs):
+    def __init__(self, extra_specs):
+        self.requirements = []
+        for key, req in six.iteritems(extra_specs or {}):
             # Either not scope format, or in capabilities scope
             scope = key.split(':')
             if len(scope) > 1 and scope[0] != "capabilities":
                 continue
             elif scope[0] == "capabilities":
                 del scope[0]
+            self.requirements.append((tuple(scope), req,
+                                      extra_specs_ops.get_matcher(req)))
+
+    def matches(self, capabilities, numbers=None):
+        """Check that capabilities satisfy the extra specs.
 
+        :param numbers: the top-level capabilities converted with
+                        extra_specs_ops.to_float, if known
+        """
+        numbers = numbers or {}
+        for scope, req, matcher in self.requirements:
             cap = capabilities
-            for index in range(len(scope)):
+            for name in scope:
                 try:
-                    cap = cap.get(scope[index], None)
+                    cap = cap.get(name, None)
                 except AttributeError:
                     return False
                 if cap is None:
                     return False
-            if not extra_specs_ops.match(cap, req):
+            number = numbers.get(scope[0]) if len(scope) == 1 else None
+            if not matcher(cap, number):
                 LOG.debug(_("extra_spec requirement '%(req)s' does not match "
                           "'%(cap)s'"), {'req': req, 'cap': cap})
                 return False
         return True
 
+
+class CapabilitiesFilter(filters.BaseHostFilter):
+    """HostFilter to work with resource (instance & volume) type records."""
+
+    # (extra specs, matcher) of the resource types seen, by id.  Entries
+    # are replaced when the extra specs of a request differ from the ones
+    # they were compiled from.
+    _matchers = {}
+
+    @classmethod
+    def get_matcher(cls, resource_type):
+        """Return the ExtraSpecsMatcher of a resource type."""
+        extra_specs = resource_type.get('extra_specs') or {}
+        type_id = resource_type.get('id')
+        cached = cls._matchers.get(type_id)
+        if cached is not None and cached[0] == extra_specs:
+            return cached[1]
+        matcher = ExtraSpecsMatcher(extra_specs)
+        if type_id is not None:
+            cls._matchers[type_id] = (dict(extra_specs), matcher)
+        return matcher
+
+    def _satisfies_extra_specs(self, capabilities, resource_type,
+                               numbers=None):
+        """Check that the capabilities provided by the services satisfy
+        the extra specs associated with the resource type.
+        """
+        if not resource_type or not resource_type.get('extra_specs'):
+            return True
+        return self.get_matcher(resource_type).matches(capabilities, numbers)
+
     def host_passes(self, host_state, filter_properties):
         """Return a list of hosts that can create resource_type."""
         # Note(zhiteng) Currently only Cinder and Nova are using
         # this filter, so the resource type is either instance or
         # volume.
         resource_type = filter_properties.get('resource_type')
+        numbers = getattr(host_state, 'capability_numbers', None)
         if not self._satisfies_extra_specs(host_state.capabilities,
-                                           resource_type):
+                                           resource_type, numbers):
             LOG.debug(_("%(host_state)s fails resource_type extra_specs "
                       "requirements"), {'host_state': host_state})
             return False
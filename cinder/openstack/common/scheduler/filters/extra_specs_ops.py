@@ -38,7 +38,38 @@ _op_methods = {'=': lambda x, y: float(x) >= float(y),
                's>=': operator.ge}
 
 
-def match(value, req):
+# Operators comparing the values as floats.
+_float_ops = ('=', '==', '!=', '>=', '<=')
+
+# Matchers compiled from the requirement strings, by requirement.
+_matchers = {}
+_MAX_MATCHERS = 1024
+
+
+def to_float(value):
+    """Return value converted to a float, or None if it is not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_matcher(req):
+    """Return a function matching values against the requirement req.
+
+    The requirement is parsed once, and its operand converted once.  The
+    function takes the value and, optionally, the value already converted
+    with to_float, and returns what match(value, req) would.
+    """
+    matcher = _matchers.get(req)
+    if matcher is None:
+        if len(_matchers) >= _MAX_MATCHERS:
+            _matchers.clear()
+        matcher = _matchers[req] = _compile(req)
+    return matcher
+
+
+def _compile(req):
     words = req.split()
 
     op = method = None
@@ -47,26 +78,52 @@ def match(value, req):
         method = _op_methods.get(op)
 
     if op != '<or>' and not method:
-        return value == req
-
-    if value is None:
-        return False
+        return lambda value, number=None: value == req
 
     if op == '<or>':  # Ex: <or> v1 <or> v2 <or> v3
-        while True:
-            if words.pop(0) == value:
-                return True
-            if not words:
-                break
-            op = words.pop(0)  # remove a keyword <or>
-            if not words:
-                break
-        return False
+        if not words:
+            raise IndexError(req)
+        choices = words[::2]
+        return lambda value, number=None: (value is not None and
+                                           value in choices)
 
-    try:
-        if words and method(value, words[0]):
-            return True
-    except ValueError:
-        pass
+    if not words:
+        return lambda value, number=None: False
+    operand = words[0]
+
+    if op in _float_ops:
+        operand = to_float(operand)
+        if operand is None:
+            return lambda value, number=None: False
+        compare = {'=': operator.ge, '==': operator.eq, '!=': operator.ne,
+                   '>=': operator.ge, '<=': operator.le}[op]
+
+        def _match_float(value, number=None):
+            if value is None:
+                return False
+            if number is None:
+                try:
+                    number = float(value)
+                except ValueError:
+                    return False
+            return compare(number, operand)
+        return _match_float
 
-    return False
+    if op == '<is>':
+        operand = strutils.bool_from_string(operand)
+        return lambda value, number=None: (
+            value is not None and
+            strutils.bool_from_string(value) is operand)
+
+    def _match(value, number=None):
+        if value is None:
+            return False
+        try:
+            return bool(method(value, operand))
+        except ValueError:
+            return False
+    return _match
+
+
+def match(value, req):
+    return get_matcher(req)(value)
@@ -351,9 +351,14 @@ class DbQuotaDriver(object):
         #            which means access to the session.  Since the
         #            session isn't available outside the DBAPI, we
         #            have to do the work there.
+        return self._reserve(context, resources, quotas, deltas, expire,
+                             CONF.until_refresh, CONF.max_age,
+                             project_id=project_id)
+
+    def _reserve(self, context, resources, quotas, deltas, expire,
+                 until_refresh, max_age, project_id=None):
         return db.quota_reserve(context, resources, quotas, deltas, expire,
-                                CONF.until_refresh, CONF.max_age,
-                                project_id=project_id)
+                                until_refresh, max_age, project_id=project_id)
 
     def commit(self, context, reservations, project_id=None):
         """Commit reservations.
@@ -405,9 +410,28 @@ class DbQuotaDriver(object):
         any that have expired.
 
         :param context: The request context, for access checks.
+        :returns: The number of expired reservations.
         """
 
-        db.reservation_expire(context)
+        return db.reservation_expire(context)
+
+
+class OptimisticDbQuotaDriver(DbQuotaDriver):
+    """Driver reserving quota with conditional updates of the usages.
+
+    Rather than locking all the usages of the project for the duration of
+    the quota check, every usage reserved against is updated with a single
+    UPDATE which only applies if it stays within quota.  Concurrent
+    reservations in the same project then only contend for the rows they
+    actually change.  Select it with
+    quota_driver=cinder.quota.OptimisticDbQuotaDriver.
+    """
+
+    def _reserve(self, context, resources, quotas, deltas, expire,
+                 until_refresh, max_age, project_id=None):
+        return db.quota_reserve_optimistic(context, resources, quotas,
+                                           deltas, expire, until_refresh,
+                                           max_age, project_id=project_id)
 
 
 class BaseResource(object):
@@ -809,7 +833,14 @@ class QuotaEngine(object):
         :param context: The request context, for access checks.
         """
 
-        self._driver.expire(context)
+        start = timeutils.utcnow()
+        expired = self._driver.expire(context)
+        if expired:
+            LOG.info(_("Expired %(count)d reservations in %(seconds).2f "
+                       "seconds"),
+                     {'count': expired,
+                      'seconds': timeutils.delta_seconds(start,
+                                                         timeutils.utcnow())})
 
     def add_volume_type_opts(self, context, opts, volume_type_id):
         """Add volume type resource options.
@@ -58,11 +58,16 @@ class Scheduler(object):
             CONF.scheduler_host_manager)
         self.volume_rpcapi = volume_rpcapi.VolumeAPI()
 
-    def update_service_capabilities(self, service_name, host, capabilities):
-        """Process a capability update from a service node."""
-        self.host_manager.update_service_capabilities(service_name,
-                                                      host,
-                                                      capabilities)
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    **kwargs):
+        """Process a capability update from a service node.
+
+        Returns True if the service should be asked for a full update.
+        """
+        return self.host_manager.update_service_capabilities(service_name,
+                                                             host,
+                                                             capabilities,
+                                                             **kwargs)
 
     def host_passes_filters(self, context, volume_id, host, filter_properties):
         """Check if the specified host passes the filters."""
@@ -80,3 +85,23 @@ class Scheduler(object):
     def schedule_create_volume(self, context, request_spec, filter_properties):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_volume"))
+
+    def schedule_create_volumes(self, context, request_specs,
+                                filter_properties_list):
+        """Schedule a batch of volumes.
+
+        Schedulers able to place several volumes in one pass should override
+        this, by default the volumes are scheduled one at a time.
+
+        :returns: A list of (request_spec, exception) tuples for the volumes
+                  which could not be scheduled.
+        """
+        failures = []
+        for request_spec, filter_properties in zip(request_specs,
+                                                   filter_properties_list):
+            try:
+                self.schedule_create_volume(context, request_spec,
+                                            filter_properties)
+            except Exception as ex:
+                failures.append((request_spec, ex))
+        return failures
@@ -67,6 +67,36 @@ class FilterScheduler(driver.Scheduler):
         if not weighed_host:
             raise exception.NoValidHost(reason="")
 
+        self._create_volume_on_host(context, weighed_host, request_spec,
+                                    filter_properties)
+
+    def schedule_create_volumes(self, context, request_specs,
+                                filter_properties_list):
+        """Place a batch of volumes in one pass over the host states.
+
+        The host states are read once for the whole batch, and the capacity
+        of each selected host is consumed before placing the next volume.
+        """
+        elevated = context.elevated()
+        host_states = list(self.host_manager.get_all_host_states(elevated))
+
+        failures = []
+        for request_spec, filter_properties in zip(request_specs,
+                                                   filter_properties_list):
+            try:
+                weighed_host = self._schedule(context, request_spec,
+                                              filter_properties,
+                                              host_states=host_states)
+                if not weighed_host:
+                    raise exception.NoValidHost(reason="")
+                self._create_volume_on_host(context, weighed_host,
+                                            request_spec, filter_properties)
+            except Exception as ex:
+                failures.append((request_spec, ex))
+        return failures
+
+    def _create_volume_on_host(self, context, weighed_host, request_spec,
+                               filter_properties):
         host = weighed_host.obj.host
         volume_id = request_spec['volume_id']
         snapshot_id = request_spec['snapshot_id']
@@ -212,9 +242,12 @@ class FilterScheduler(driver.Scheduler):
             raise exception.NoValidHost(reason=msg)
 
     def _get_weighted_candidates(self, context, request_spec,
-                                 filter_properties=None):
+                                 filter_properties=None, host_states=None):
         """Returns a list of hosts that meet the required specs,
         ordered by their fitness.
+
+        The hosts are looked up in the host manager, unless host_states
+        is given.
         """
         elevated = context.elevated()
 
@@ -248,7 +281,10 @@ class FilterScheduler(driver.Scheduler):
 
         # Note: remember, we are using an iterator here. So only
         # traverse this list once.
-        hosts = self.host_manager.get_all_host_states(elevated)
+        if host_states is None:
+            hosts = self.host_manager.get_all_host_states(elevated)
+        else:
+            hosts = host_states
 
         # Filter local hosts based on requirements ...
         hosts = self.host_manager.get_filtered_hosts(hosts,
@@ -263,9 +299,11 @@ class FilterScheduler(driver.Scheduler):
                                                             filter_properties)
         return weighed_hosts
 
-    def _schedule(self, context, request_spec, filter_properties=None):
+    def _schedule(self, context, request_spec, filter_properties=None,
+                  host_states=None):
         weighed_hosts = self._get_weighted_candidates(context, request_spec,
-                                                      filter_properties)
+                                                      filter_properties,
+                                                      host_states)
         if not weighed_hosts:
             return None
         return self._choose_top_host(weighed_hosts, request_spec)
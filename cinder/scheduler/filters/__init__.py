@@ -0,0 +1,65 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Scheduler host filters
+"""
+
+from cinder.openstack.common.scheduler import filters
+from cinder.scheduler import host_columns
+
+
+class BaseBatchHostFilter(filters.BaseHostFilter):
+    """Base class for host filters with a columnar implementation.
+
+    BatchHostFilterHandler calls filter_columns() once for all the hosts;
+    host_passes() is still used by the per-host HostFilterHandler.
+    """
+
+    def filter_columns(self, columns, filter_properties):
+        """Return a list with True for each host passing the filter.
+
+        :param columns: HostStateColumns of the hosts to filter
+        """
+        raise NotImplementedError()
+
+
+class BatchHostFilterHandler(filters.HostFilterHandler):
+    """Filter handler running batch filters over columns of host states.
+
+    Filters which are not BaseBatchHostFilters are run one host at a time.
+    """
+
+    def get_filtered_objects(self, filter_classes, objs,
+                             filter_properties):
+        objs = list(objs)
+        columns = None
+        for filter_cls in filter_classes:
+            if not objs:
+                break
+            filter_obj = filter_cls()
+            if isinstance(filter_obj, BaseBatchHostFilter):
+                if columns is None:
+                    columns = host_columns.HostStateColumns(objs)
+                mask = filter_obj.filter_columns(columns, filter_properties)
+                columns = columns.select(mask)
+                objs = columns.host_states
+            else:
+                filtered = list(filter_obj.filter_all(objs,
+                                                      filter_properties))
+                if len(filtered) != len(objs):
+                    columns = None
+                objs = filtered
+        return objs
@@ -16,16 +16,17 @@
 #    under the License.
 
 
+import itertools
 import math
 
 from cinder.openstack.common import log as logging
-from cinder.openstack.common.scheduler import filters
+from cinder.scheduler import filters
 
 
 LOG = logging.getLogger(__name__)
 
 
-class CapacityFilter(filters.BaseHostFilter):
+class CapacityFilter(filters.BaseBatchHostFilter):
     """CapacityFilter filters based on volume host's capacity utilization."""
 
     def host_passes(self, host_state, filter_properties):
@@ -61,3 +62,37 @@ class CapacityFilter(filters.BaseHostFilter):
                            'available': free})
 
         return free >= volume_size
+
+    def filter_columns(self, columns, filter_properties):
+        """Return a list with True for each host with sufficient capacity."""
+        vol_exists_on = filter_properties.get('vol_exists_on')
+        volume_size = filter_properties.get('size')
+
+        mask = []
+        unset = insufficient = 0
+        for host, free_space, reserved in itertools.izip(
+                columns.host, columns.free_capacity_gb,
+                columns.reserved_percentage):
+            if host == vol_exists_on:
+                passes = True
+            elif free_space is None:
+                passes = False
+                unset += 1
+            elif free_space == 'infinite' or free_space == 'unknown':
+                passes = True
+            else:
+                reserved = float(reserved) / 100
+                passes = math.floor(free_space * (1 - reserved)) >= volume_size
+                if not passes:
+                    insufficient += 1
+            mask.append(passes)
+
+        if unset:
+            LOG.error(_("Free capacity not set on %d hosts: "
+                        "volume node info collection broken.") % unset)
+        if insufficient:
+            LOG.warning(_("Insufficient free space for volume creation "
+                          "of %(requested)s GB on %(count)d hosts")
+                        % {'requested': volume_size,
+                           'count': insufficient})
+        return mask
@@ -0,0 +1,57 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Columnar view of host states, used by batch filters and weighers.
+"""
+
+import itertools
+import operator
+
+
+class HostStateColumns(object):
+    """The capacity attributes of a list of host states, one list each.
+
+    Element i of every column belongs to host_states[i].  Batch filters
+    and weighers work on whole columns instead of one host at a time.
+    Columns are only gathered from the host states when first used.
+    """
+
+    columns = ('host', 'free_capacity_gb', 'total_capacity_gb',
+               'reserved_percentage', 'allocated_capacity_gb')
+
+    def __init__(self, host_states, **columns):
+        self.host_states = list(host_states)
+        self.__dict__.update(columns)
+
+    def __getattr__(self, name):
+        # Only called for columns which have not been gathered yet.
+        if name not in self.columns:
+            raise AttributeError(name)
+        values = map(operator.attrgetter(name), self.host_states)
+        setattr(self, name, values)
+        return values
+
+    def __len__(self):
+        return len(self.host_states)
+
+    def select(self, mask):
+        """Return the columns of the host states whose mask entry is True."""
+        mask = list(mask)
+        columns = dict((name, list(itertools.compress(values, mask)))
+                       for (name, values) in self.__dict__.iteritems()
+                       if name in self.columns)
+        host_states = itertools.compress(self.host_states, mask)
+        return HostStateColumns(host_states, **columns)
@@ -51,7 +51,7 @@ LOG = logging.getLogger(__name__)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
 
-    RPC_API_VERSION = '1.5'
+    RPC_API_VERSION = '1.7'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -77,13 +77,27 @@ class SchedulerManager(manager.Manager):
         self.request_service_capabilities(ctxt)
 
     def update_service_capabilities(self, context, service_name=None,
-                                    host=None, capabilities=None, **kwargs):
-        """Process a capability update from a service node."""
+                                    host=None, capabilities=None,
+                                    capabilities_seq=None,
+                                    full_capabilities=True,
+                                    removed_capabilities=None, **kwargs):
+        """Process a capability update from a service node.
+
+        A partial update which does not follow the last one received from
+        the service makes us ask it for all its capabilities again.
+        """
         if capabilities is None:
             capabilities = {}
-        self.driver.update_service_capabilities(service_name,
-                                                host,
-                                                capabilities)
+        if capabilities_seq is None:
+            self.driver.update_service_capabilities(service_name,
+                                                    host,
+                                                    capabilities)
+            return
+        resync = self.driver.update_service_capabilities(
+            service_name, host, capabilities, seq=capabilities_seq,
+            full=full_capabilities, removed=removed_capabilities)
+        if resync:
+            self.request_service_capabilities(context, host=host)
 
     def create_volume(self, context, topic, volume_id, snapshot_id=None,
                       image_id=None, request_spec=None,
@@ -103,8 +117,20 @@ class SchedulerManager(manager.Manager):
                 _("Failed to create scheduler manager volume flow"))
         flow_engine.run()
 
-    def request_service_capabilities(self, context):
-        volume_rpcapi.VolumeAPI().publish_service_capabilities(context)
+    def create_volumes(self, context, topic, request_specs,
+                       filter_properties_list):
+        """Schedule a batch of volumes in one pass."""
+        failures = self.driver.schedule_create_volumes(context,
+                                                       request_specs,
+                                                       filter_properties_list)
+        for request_spec, ex in failures:
+            volume_state = {'volume_state': {'status': 'error'}}
+            self._set_volume_state_and_notify('create_volume', volume_state,
+                                              context, ex, request_spec)
+
+    def request_service_capabilities(self, context, host=None):
+        volume_rpcapi.VolumeAPI().publish_service_capabilities(context,
+                                                               host=host)
 
     def migrate_volume_to_host(self, context, topic, volume_id, host,
                                force_host_copy, request_spec,
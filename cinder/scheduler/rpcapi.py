@@ -38,6 +38,9 @@ class SchedulerAPI(object):
         1.3 - Add migrate_volume_to_host() method
         1.4 - Add retype method
         1.5 - Add manage_existing method
+        1.6 - Add create_volumes method
+        1.7 - Add capabilities_seq, full_capabilities and
+              removed_capabilities to update_service_capabilities()
     '''
 
     RPC_API_VERSION = '1.0'
@@ -46,7 +49,7 @@ class SchedulerAPI(object):
         super(SchedulerAPI, self).__init__()
         target = messaging.Target(topic=CONF.scheduler_topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.5')
+        self.client = rpc.get_client(target, version_cap='1.7')
 
     def create_volume(self, ctxt, topic, volume_id, snapshot_id=None,
                       image_id=None, request_spec=None,
@@ -62,6 +65,15 @@ class SchedulerAPI(object):
                           request_spec=request_spec_p,
                           filter_properties=filter_properties)
 
+    def create_volumes(self, ctxt, topic, request_specs,
+                       filter_properties_list):
+        cctxt = self.client.prepare(version='1.6')
+        request_specs_p = jsonutils.to_primitive(request_specs)
+        return cctxt.cast(ctxt, 'create_volumes',
+                          topic=topic,
+                          request_specs=request_specs_p,
+                          filter_properties_list=filter_properties_list)
+
     def migrate_volume_to_host(self, ctxt, topic, volume_id, host,
                                force_host_copy=False, request_spec=None,
                                filter_properties=None):
@@ -97,11 +109,23 @@ class SchedulerAPI(object):
                           request_spec=request_spec_p,
                           filter_properties=filter_properties)
 
+    def can_send_partial_capabilities(self):
+        return self.client.can_send_version('1.7')
+
     def update_service_capabilities(self, ctxt,
                                     service_name, host,
-                                    capabilities):
+                                    capabilities, seq=None, full=True,
+                                    removed=None):
         # FIXME(flaper87): What to do with fanout?
-        cctxt = self.client.prepare(fanout=True)
+        if seq is None:
+            cctxt = self.client.prepare(fanout=True)
+            cctxt.cast(ctxt, 'update_service_capabilities',
+                       service_name=service_name, host=host,
+                       capabilities=capabilities)
+            return
+        cctxt = self.client.prepare(fanout=True, version='1.7')
         cctxt.cast(ctxt, 'update_service_capabilities',
                    service_name=service_name, host=host,
-                   capabilities=capabilities)
+                   capabilities=capabilities, capabilities_seq=seq,
+                   full_capabilities=full,
+                   removed_capabilities=removed or [])
@@ -0,0 +1,76 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Scheduler host weights
+"""
+
+import itertools
+
+from cinder.openstack.common.scheduler import weights
+from cinder.scheduler import host_columns
+
+
+class BaseBatchHostWeigher(weights.BaseHostWeigher):
+    """Base class for host weighers with a columnar implementation.
+
+    BatchHostWeightHandler calls weigh_columns() once for all the hosts;
+    _weigh_object() is still used by the per-host HostWeightHandler.
+    """
+
+    def _weigh_columns(self, columns, weight_properties):
+        """Return a list with the weight of each host.
+
+        :param columns: HostStateColumns of the hosts to weigh
+        """
+        raise NotImplementedError()
+
+    def weigh_columns(self, host_weights, columns, weight_properties):
+        """Return host_weights with the weight of each host added."""
+        constant = self._weight_multiplier()
+        column_weights = self._weigh_columns(columns, weight_properties)
+        return [total + constant * weight for (total, weight)
+                in itertools.izip(host_weights, column_weights)]
+
+
+class BatchHostWeightHandler(weights.HostWeightHandler):
+    """Weight handler running batch weighers over columns of host states.
+
+    Weighers which are not BaseBatchHostWeighers weigh one host at a time.
+    """
+
+    def get_weighed_objects(self, weigher_classes, obj_list,
+                            weighing_properties):
+        """Return a sorted (highest score first) list of WeighedObjects."""
+
+        if not obj_list:
+            return []
+
+        obj_list = list(obj_list)
+        columns = host_columns.HostStateColumns(obj_list)
+        host_weights = [0.0] * len(obj_list)
+        for weigher_cls in weigher_classes:
+            weigher = weigher_cls()
+            if isinstance(weigher, BaseBatchHostWeigher):
+                host_weights = weigher.weigh_columns(host_weights, columns,
+                                                     weighing_properties)
+            else:
+                weighed_objs = map(self.object_class, obj_list, host_weights)
+                weigher.weigh_objects(weighed_objs, weighing_properties)
+                host_weights = [weighed_obj.weight
+                                for weighed_obj in weighed_objs]
+
+        weighed_objs = map(self.object_class, obj_list, host_weights)
+        return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
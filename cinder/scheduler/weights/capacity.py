@@ -33,11 +33,12 @@ and the weighing has the opposite effect of the default.
 """
 
 
+import itertools
 import math
 
 from oslo.config import cfg
 
-from cinder.openstack.common.scheduler import weights
+from cinder.scheduler import weights
 
 
 capacity_weight_opts = [
@@ -55,7 +56,7 @@ CONF = cfg.CONF
 CONF.register_opts(capacity_weight_opts)
 
 
-class CapacityWeigher(weights.BaseHostWeigher):
+class CapacityWeigher(weights.BaseBatchHostWeigher):
     def _weight_multiplier(self):
         """Override the weight multiplier."""
         return CONF.capacity_weight_multiplier
@@ -72,8 +73,16 @@ class CapacityWeigher(weights.BaseHostWeigher):
             free = math.floor(host_state.free_capacity_gb * (1 - reserved))
         return free
 
+    def _weigh_columns(self, columns, weight_properties):
+        infinite = float('inf')
+        return [infinite if free_space in ('infinite', 'unknown')
+                else math.floor(free_space * (1 - float(reserved) / 100))
+                for (free_space, reserved)
+                in itertools.izip(columns.free_capacity_gb,
+                                  columns.reserved_percentage)]
 
-class AllocatedCapacityWeigher(weights.BaseHostWeigher):
+
+class AllocatedCapacityWeigher(weights.BaseBatchHostWeigher):
     def _weight_multiplier(self):
         """Override the weight multiplier."""
         return CONF.allocated_capacity_weight_multiplier
@@ -83,3 +92,6 @@ class AllocatedCapacityWeigher(weights.BaseHostWeigher):
         # allocated_capacity first) to be the default.
         allocated_space = host_state.allocated_capacity_gb
         return allocated_space
+
+    def _weigh_columns(self, columns, weight_properties):
+        return columns.allocated_capacity_gb
@@ -46,6 +46,12 @@ service_opts = [
     cfg.IntOpt('periodic_interval',
                default=60,
                help='seconds between running periodic tasks'),
+    cfg.BoolOpt('service_heartbeat_coalesce',
+                default=False,
+                help='Report the state of all the services of a process, '
+                     'such as the backends of a cinder-volume running '
+                     'them in one process, with a single database '
+                     'statement'),
     cfg.IntOpt('periodic_fuzzy_delay',
                default=60,
                help='range of seconds to randomly delay when starting the'
@@ -119,7 +125,9 @@ class Service(service.Service):
 
         self.manager.init_host()
 
-        if self.report_interval:
+        if self.report_interval and CONF.service_heartbeat_coalesce:
+            get_heartbeat_coalescer().add(self)
+        elif self.report_interval:
             pulse = loopingcall.LoopingCall(self.report_state)
             pulse.start(interval=self.report_interval,
                         initial_delay=self.report_interval)
@@ -219,6 +227,8 @@ class Service(service.Service):
             self.rpcserver.stop()
         except Exception:
             pass
+        if _heartbeat_coalescer is not None:
+            _heartbeat_coalescer.remove(self)
         for x in self.timers:
             try:
                 x.stop()
@@ -242,34 +252,94 @@ class Service(service.Service):
     def report_state(self):
         """Update the state of this service in the datastore."""
         ctxt = context.get_admin_context()
-        zone = CONF.storage_availability_zone
-        state_catalog = {}
+        values = {'availability_zone': CONF.storage_availability_zone}
         try:
-            try:
-                service_ref = db.service_get(ctxt, self.service_id)
-            except exception.NotFound:
+            if not db.service_heartbeat(ctxt, [self.service_id], values):
                 LOG.debug(_('The service database object disappeared, '
                             'Recreating it.'))
                 self._create_service_ref(ctxt)
-                service_ref = db.service_get(ctxt, self.service_id)
+                db.service_heartbeat(ctxt, [self.service_id], values)
+            self._report_state_succeeded()
+
+        # TODO(vish): this should probably only catch connection errors
+        except Exception:  # pylint: disable=W0702
+            self._report_state_failed()
 
-            state_catalog['report_count'] = service_ref['report_count'] + 1
-            if zone != service_ref['availability_zone']:
-                state_catalog['availability_zone'] = zone
+    def _report_state_succeeded(self):
+        # TODO(termie): make this pattern be more elegant.
+        if getattr(self, 'model_disconnected', False):
+            self.model_disconnected = False
+            LOG.error(_('Recovered model server connection!'))
 
-            db.service_update(ctxt,
-                              self.service_id, state_catalog)
+    def _report_state_failed(self):
+        if not getattr(self, 'model_disconnected', False):
+            self.model_disconnected = True
+            LOG.exception(_('model server went away'))
 
-            # TODO(termie): make this pattern be more elegant.
-            if getattr(self, 'model_disconnected', False):
-                self.model_disconnected = False
-                LOG.error(_('Recovered model server connection!'))
 
-        # TODO(vish): this should probably only catch connection errors
+class HeartbeatCoalescer(object):
+    """Reports the state of the services of a process together.
+
+    The report counts of all the services are bumped by one database
+    statement every report interval, instead of one per service.
+    """
+
+    def __init__(self):
+        self.services = []
+        self._timer = None
+
+    def add(self, service):
+        self.services.append(service)
+        if self._timer is None:
+            self._timer = loopingcall.LoopingCall(self.report_state)
+            self._timer.start(interval=service.report_interval,
+                              initial_delay=service.report_interval)
+
+    def remove(self, service):
+        if service in self.services:
+            self.services.remove(service)
+        if not self.services and self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def report_state(self):
+        services = list(self.services)
+        if not services:
+            return
+        ctxt = context.get_admin_context()
+        values = {'availability_zone': CONF.storage_availability_zone}
+        try:
+            updated = db.service_heartbeat(
+                ctxt, [service.service_id for service in services], values)
         except Exception:  # pylint: disable=W0702
-            if not getattr(self, 'model_disconnected', False):
-                self.model_disconnected = True
-                LOG.exception(_('model server went away'))
+            for service in services:
+                service._report_state_failed()
+            return
+
+        for service in services:
+            if updated < len(services):
+                # Some database objects disappeared, let their services
+                # recreate them.
+                try:
+                    db.service_get(ctxt, service.service_id)
+                except exception.NotFound:
+                    service.report_state()
+                    continue
+                except Exception:  # pylint: disable=W0702
+                    service._report_state_failed()
+                    continue
+            service._report_state_succeeded()
+
+
+_heartbeat_coalescer = None
+
+
+def get_heartbeat_coalescer():
+    """Return the heartbeat coalescer of this process."""
+    global _heartbeat_coalescer
+    if _heartbeat_coalescer is None:
+        _heartbeat_coalescer = HeartbeatCoalescer()
+    return _heartbeat_coalescer
 
 
 class WSGIService(object):
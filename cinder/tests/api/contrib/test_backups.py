@@ -626,6 +626,64 @@ class BackupsAPITestCase(test.TestCase):
 
         db.backup_destroy(context.get_admin_context(), backup_id)
 
+    def test_delete_backup_with_incremental_backups(self):
+        backup_id = self._create_backup(status='available')
+        child_id = self._create_backup(status='available')
+        db.backup_update(context.get_admin_context(), child_id,
+                         {'parent_id': backup_id})
+        req = webob.Request.blank('/v2/fake/backups/%s' %
+                                  backup_id)
+        req.method = 'DELETE'
+        req.headers['Content-Type'] = 'application/json'
+        res = req.get_response(fakes.wsgi_app())
+        res_dict = json.loads(res.body)
+
+        self.assertEqual(res.status_int, 400)
+        self.assertEqual(res_dict['badRequest']['message'],
+                         'Invalid backup: Incremental backups exist for '
+                         'this backup')
+        self.assertEqual(self._get_backup_attrib(backup_id, 'status'),
+                         'available')
+
+        db.backup_destroy(context.get_admin_context(), child_id)
+        db.backup_destroy(context.get_admin_context(), backup_id)
+
+    def test_delete_backup_with_incremental_backup_in_progress(self):
+        backup_id = self._create_backup(status='available')
+        child_id = self._create_backup(status='creating')
+        db.backup_update(context.get_admin_context(), child_id,
+                         {'parent_id': backup_id})
+        req = webob.Request.blank('/v2/fake/backups/%s' %
+                                  backup_id)
+        req.method = 'DELETE'
+        req.headers['Content-Type'] = 'application/json'
+        res = req.get_response(fakes.wsgi_app())
+
+        self.assertEqual(res.status_int, 400)
+        self.assertEqual(self._get_backup_attrib(backup_id, 'status'),
+                         'available')
+
+        db.backup_destroy(context.get_admin_context(), child_id)
+        db.backup_destroy(context.get_admin_context(), backup_id)
+
+    def test_delete_backup_with_failed_incremental_backup(self):
+        backup_id = self._create_backup(status='available')
+        child_id = self._create_backup(status='error')
+        db.backup_update(context.get_admin_context(), child_id,
+                         {'parent_id': backup_id})
+        req = webob.Request.blank('/v2/fake/backups/%s' %
+                                  backup_id)
+        req.method = 'DELETE'
+        req.headers['Content-Type'] = 'application/json'
+        res = req.get_response(fakes.wsgi_app())
+
+        self.assertEqual(res.status_int, 202)
+        self.assertEqual(self._get_backup_attrib(backup_id, 'status'),
+                         'deleting')
+
+        db.backup_destroy(context.get_admin_context(), child_id)
+        db.backup_destroy(context.get_admin_context(), backup_id)
+
     def test_restore_backup_volume_id_specified_json(self):
         backup_id = self._create_backup(status='available')
         # need to create the volume referenced below first
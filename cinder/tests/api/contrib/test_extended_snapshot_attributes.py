@@ -96,6 +96,20 @@ class ExtendedSnapshotAttributesTest(test.TestCase):
                                           project_id='fake',
                                           progress='0%')
 
+    def test_detail_uses_listed_snapshots(self):
+        calls = []
+
+        def _get_all(self, context, search_opts=None):
+            calls.append(search_opts)
+            return fake_snapshot_get_all(self, context, search_opts)
+
+        self.stubs.Set(volume.api.API, 'get_all_snapshots', _get_all)
+        res = self._make_request('/v2/fake/snapshots/detail')
+
+        self.assertEqual(res.status_int, 200)
+        # Only the snapshots controller lists the snapshots.
+        self.assertEqual(1, len(calls))
+
 
 class ExtendedSnapshotAttributesXmlTest(ExtendedSnapshotAttributesTest):
     content_type = 'application/xml'
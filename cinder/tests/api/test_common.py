@@ -17,10 +17,14 @@
 Test suites for 'common' code used throughout the OpenStack HTTP API.
 """
 
+import datetime
+
 import webob
 import webob.exc
 
 from cinder.api import common
+from cinder import context
+from cinder.openstack.common import timeutils
 from cinder import test
 
 
@@ -203,6 +207,55 @@ class PaginationParamsTest(test.TestCase):
                          {'marker': marker, 'limit': 20})
 
 
+class KeysetParamsTest(test.TestCase):
+    """Unit tests for the keyset pagination helpers of `cinder.api.common`."""
+
+    def test_cursor_round_trip(self):
+        created_at = datetime.datetime(2014, 1, 2, 3, 4, 5, 6)
+        cursor = common.encode_cursor(['name', created_at, 'id'])
+        req = webob.Request.blank('/?cursor=%s&limit=10' % cursor)
+        self.assertTrue(common.use_keyset_pagination(req))
+        self.assertEqual(
+            (['name', timeutils.strtime(created_at), 'id'], 10),
+            common.get_keyset_params(req))
+
+    def test_invalid_cursor(self):
+        for cursor in ('junk', common.encode_cursor({'a': 1})):
+            req = webob.Request.blank('/?cursor=%s' % cursor)
+            self.assertRaises(webob.exc.HTTPBadRequest,
+                              common.get_keyset_params, req)
+
+    def test_limit_capped(self):
+        for query in ('/', '/?limit=0', '/?limit=5000'):
+            req = webob.Request.blank(query)
+            self.assertEqual((None, 1000), common.get_keyset_params(req))
+
+    def test_use_keyset_pagination(self):
+        req = webob.Request.blank('/?marker=abc')
+        self.assertFalse(common.use_keyset_pagination(req))
+        self.flags(osapi_keyset_pagination=True)
+        self.assertTrue(common.use_keyset_pagination(req))
+
+    def test_collection_links_keyset_only_when_honored(self):
+        self.flags(osapi_keyset_pagination=True)
+        req = webob.Request.blank('/v2/fake/items?limit=1')
+        req.environ['cinder.context'] = context.RequestContext('fake',
+                                                               'fake')
+        items = [{'id': 'id1', 'name': 'item1',
+                  'created_at': datetime.datetime(2014, 1, 2)}]
+        builder = common.ViewBuilder()
+        builder._collection_name = 'items'
+
+        href = builder._get_collection_links(req, items)[0]['href']
+        self.assertIn('marker=id1', href)
+        self.assertNotIn('cursor', href)
+
+        href = builder._get_collection_links(req, items,
+                                             keyset=True)[0]['href']
+        self.assertIn('cursor=', href)
+        self.assertNotIn('marker', href)
+
+
 class MiscFunctionsTest(test.TestCase):
 
     def test_remove_major_version_from_href(self):
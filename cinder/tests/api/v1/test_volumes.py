@@ -616,7 +616,7 @@ class VolumeApiTest(test.TestCase):
         def volume_detail_limit_offset(is_admin):
             def stub_volume_get_all_by_project(context, project_id, marker,
                                                limit, sort_key, sort_dir,
-                                               filters=None):
+                                               filters=None, columns=None):
                 return [
                     stubs.stub_volume(1, display_name='vol1'),
                     stubs.stub_volume(2, display_name='vol2'),
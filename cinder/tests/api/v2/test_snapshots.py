@@ -331,6 +331,28 @@ class SnapshotApiTest(test.TestCase):
         resp = self.controller.index(req)
         self.assertEqual(len(resp['snapshots']), 0)
 
+    def test_snapshot_list_keyset(self):
+        self.flags(osapi_keyset_pagination=True)
+
+        def stub_snapshot_get_all_by_project(context, project_id,
+                                             filters=None, limit=None,
+                                             sort_key=None, sort_dir=None,
+                                             cursor=None):
+            self.assertEqual({'status': 'available'}, filters)
+            self.assertEqual(1, limit)
+            self.assertEqual(('created_at', 'desc', None),
+                             (sort_key, sort_dir, cursor))
+            return [stubs.stub_snapshot(1, status='available',
+                                        created_at='2014-01-01')]
+        self.stubs.Set(db, 'snapshot_get_all_by_project',
+                       stub_snapshot_get_all_by_project)
+
+        req = fakes.HTTPRequest.blank('/v2/snapshots?status=available'
+                                      '&limit=1')
+        resp = self.controller.index(req)
+        self.assertEqual(1, len(resp['snapshots']))
+        self.assertIn('cursor=', resp['snapshots_links'][0]['href'])
+
     def test_admin_list_snapshots_limited_to_project(self):
         req = fakes.HTTPRequest.blank('/v2/fake/snapshots',
                                       use_admin_context=True)
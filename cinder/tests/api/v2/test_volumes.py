@@ -20,6 +20,7 @@ from lxml import etree
 from oslo.config import cfg
 import webob
 
+from cinder.api import common
 from cinder.api import extensions
 from cinder.api.v2 import volumes
 from cinder import context
@@ -523,6 +524,51 @@ class VolumeApiTest(test.TestCase):
         # Finally test that we cached the returned volumes
         self.assertEqual(1, len(req.cached_resource()))
 
+    def test_volume_list_summary_columns(self):
+        def stub_volume_get_all_by_project(context, project_id, marker, limit,
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
+            self.assertEqual(volumes.SUMMARY_COLUMNS, columns)
+            return [{'id': '1', 'display_name': 'vol1',
+                     'created_at': datetime.datetime(1, 1, 1, 1, 1, 1)}]
+        self.stubs.Set(db, 'volume_get_all_by_project',
+                       stub_volume_get_all_by_project)
+
+        req = fakes.HTTPRequest.blank('/v2/volumes')
+        res_dict = self.controller.index(req)
+        self.assertEqual([{'id': '1', 'name': 'vol1'}],
+                         [{'id': vol['id'], 'name': vol['name']}
+                          for vol in res_dict['volumes']])
+
+    def test_volume_list_detail_batches_admin_metadata(self):
+        calls = []
+
+        def stub_get_all(api, context, marker=None, limit=None,
+                         sort_key='created_at', sort_dir='desc', filters=None,
+                         columns=None):
+            calls.append((context.is_admin, filters))
+            self.assertIsNone(columns)
+            if context.is_admin:
+                return [stubs.stub_volume(i) for i in filters['id']]
+            return [stubs.stub_volume(str(i), volume_admin_metadata=[])
+                    for i in xrange(1, 4)]
+
+        def stub_get(*args, **kwargs):
+            self.fail('volumes must not be fetched one by one')
+
+        self.stubs.Set(volume_api.API, 'get_all', stub_get_all)
+        self.stubs.Set(volume_api.API, 'get', stub_get)
+
+        req = fakes.HTTPRequest.blank('/v2/volumes/detail')
+        res_dict = self.controller.detail(req)
+        self.assertEqual([(False, {}), (True, {'id': ['1', '2', '3']})],
+                         calls)
+        for vol in res_dict['volumes']:
+            self.assertEqual({'attached_mode': 'rw', 'readonly': 'False'},
+                             vol['metadata'])
+        self.assertNotIn('volume_admin_metadata',
+                         req.cached_resource_by_id('1'))
+
     def test_volume_list_detail_with_admin_metadata(self):
         volume = stubs.stub_volume("1")
         del volume['name']
@@ -583,7 +629,8 @@ class VolumeApiTest(test.TestCase):
 
     def test_volume_index_with_marker(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
-                                           sort_key, sort_dir, filters=None):
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -632,9 +679,36 @@ class VolumeApiTest(test.TestCase):
         self.assertEqual(len(volumes), 1)
         self.assertEqual(volumes[0]['id'], '1')
 
+    def test_volume_index_keyset(self):
+        created_at = datetime.datetime(2014, 1, 1, 1, 1, 1)
+
+        def stub_volume_get_all_by_project(context, project_id, marker, limit,
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
+            self.assertEqual(['displayname', '2014-01-01T01:01:01.000000',
+                              '1'], marker)
+            self.assertEqual(1, limit)
+            return [stubs.stub_volume('2', created_at=created_at)]
+        self.stubs.Set(db, 'volume_get_all_by_project',
+                       stub_volume_get_all_by_project)
+        self.stubs.Set(volume_api.API, 'get', stubs.stub_volume_get)
+
+        cursor = common.encode_cursor(['displayname', created_at, '1'])
+        req = fakes.HTTPRequest.blank('/v2/volumes?sort_key=display_name'
+                                      '&limit=1&cursor=%s' % cursor)
+        res_dict = self.controller.index(req)
+        volumes = res_dict['volumes']
+        self.assertEqual(1, len(volumes))
+        self.assertEqual('2', volumes[0]['id'])
+        next_link = res_dict['volumes_links'][0]['href']
+        next_cursor = common.encode_cursor(['displayname', created_at, '2'])
+        self.assertIn('cursor=%s' % next_cursor, next_link)
+        self.assertNotIn('marker', next_link)
+
     def test_volume_index_limit_offset(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
-                                           sort_key, sort_dir, filters=None):
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -661,7 +735,8 @@ class VolumeApiTest(test.TestCase):
 
     def test_volume_detail_with_marker(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
-                                           sort_key, sort_dir, filters=None):
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -712,7 +787,8 @@ class VolumeApiTest(test.TestCase):
 
     def test_volume_detail_limit_offset(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
-                                           sort_key, sort_dir, filters=None):
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -746,7 +822,7 @@ class VolumeApiTest(test.TestCase):
 
     def test_volume_with_limit_zero(self):
         def stub_volume_get_all(context, marker, limit,
-                                sort_key, sort_dir):
+                                sort_key, sort_dir, columns=None):
             return []
         self.stubs.Set(db, 'volume_get_all', stub_volume_get_all)
         req = fakes.HTTPRequest.blank('/v2/volumes?limit=0')
@@ -760,7 +836,7 @@ class VolumeApiTest(test.TestCase):
         # Number of volumes equals the max, include next link
         def stub_volume_get_all(context, marker, limit,
                                 sort_key, sort_dir,
-                                filters=None):
+                                filters=None, columns=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(CONF.osapi_max_limit)]
             if limit == None or limit >= len(vols):
@@ -778,7 +854,7 @@ class VolumeApiTest(test.TestCase):
         # Number of volumes less then max, do not include
         def stub_volume_get_all2(context, marker, limit,
                                  sort_key, sort_dir,
-                                 filters=None):
+                                 filters=None, columns=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(100)]
             if limit == None or limit >= len(vols):
@@ -795,7 +871,7 @@ class VolumeApiTest(test.TestCase):
         # Number of volumes more then the max, include next link
         def stub_volume_get_all3(context, marker, limit,
                                  sort_key, sort_dir,
-                                 filters=None):
+                                 filters=None, columns=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(CONF.osapi_max_limit + 100)]
             if limit == None or limit >= len(vols):
@@ -834,13 +910,15 @@ class VolumeApiTest(test.TestCase):
         """
         # Non-admin, project function should be called with no_migration_status
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
-                                           sort_key, sort_dir, filters=None):
+                                           sort_key, sort_dir, filters=None,
+                                           columns=None):
             self.assertEqual(filters['no_migration_targets'], True)
             self.assertFalse('all_tenants' in filters)
             return [stubs.stub_volume(1, display_name='vol1')]
 
         def stub_volume_get_all(context, marker, limit,
-                                sort_key, sort_dir, filters=None):
+                                sort_key, sort_dir, filters=None,
+                                columns=None):
             return []
         self.stubs.Set(db, 'volume_get_all_by_project',
                        stub_volume_get_all_by_project)
@@ -856,12 +934,14 @@ class VolumeApiTest(test.TestCase):
         # Admin, all_tenants is not set, project function should be called
         # without no_migration_status
         def stub_volume_get_all_by_project2(context, project_id, marker, limit,
-                                            sort_key, sort_dir, filters=None):
+                                            sort_key, sort_dir, filters=None,
+                                            columns=None):
             self.assertFalse('no_migration_targets' in filters)
             return [stubs.stub_volume(1, display_name='vol2')]
 
         def stub_volume_get_all2(context, marker, limit,
-                                 sort_key, sort_dir, filters=None):
+                                 sort_key, sort_dir, filters=None,
+                                 columns=None):
             return []
         self.stubs.Set(db, 'volume_get_all_by_project',
                        stub_volume_get_all_by_project2)
@@ -875,11 +955,13 @@ class VolumeApiTest(test.TestCase):
         # Admin, all_tenants is set, get_all function should be called
         # without no_migration_status
         def stub_volume_get_all_by_project3(context, project_id, marker, limit,
-                                            sort_key, sort_dir, filters=None):
+                                            sort_key, sort_dir, filters=None,
+                                            columns=None):
             return []
 
         def stub_volume_get_all3(context, marker, limit,
-                                 sort_key, sort_dir, filters=None):
+                                 sort_key, sort_dir, filters=None,
+                                 columns=None):
             self.assertFalse('no_migration_targets' in filters)
             self.assertFalse('all_tenants' in filters)
             return [stubs.stub_volume(1, display_name='vol3')]
@@ -131,6 +131,53 @@ class BrickLvmTestCase(test.TestCase):
     def test_get_volume(self):
         self.assertEqual(self.vg.get_volume('fake-1')['name'], 'fake-1')
 
+    def test_get_volume_cached(self):
+        lvs_calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            if 'lvs' in cmd:
+                lvs_calls.append(cmd)
+            elif cmd[0] in ('lvcreate', 'lvchange', 'udevadm', 'lvremove',
+                            'lvrename'):
+                return ('', '')
+            return self.fake_execute(*cmd, **kwargs)
+
+        self.vg._lv_cache_ttl = 60
+        self.vg.set_execute(fake_execute)
+        self.stubs.Set(processutils, 'execute', fake_execute)
+
+        self.assertEqual('fake-1', self.vg.get_volume('fake-1')['name'])
+        self.assertEqual('fake-2', self.vg.get_volume('fake-2')['name'])
+        self.assertEqual(1, len(lvs_calls))
+
+        # LVs this object creates, renames and deletes are tracked
+        self.vg.create_volume('fake-3', '2g')
+        self.assertEqual('2.00', self.vg.get_volume('fake-3')['size'])
+        self.vg.delete('fake-2')
+        self.vg.rename_volume('fake-3', 'fake-4')
+        self.assertEqual('2.00', self.vg.get_volume('fake-4')['size'])
+        self.assertEqual(1, len(lvs_calls))
+
+        # Unknown LVs are looked up again, as is everything once stale
+        self.assertEqual('fake-2', self.vg.get_volume('fake-2')['name'])
+        self.assertEqual(2, len(lvs_calls))
+        self.vg._lv_cache_time -= 60
+        self.vg.get_volume('fake-1')
+        self.assertEqual(3, len(lvs_calls))
+
+    def test_get_volume_uncached(self):
+        lvs_calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            if 'lvs' in cmd:
+                lvs_calls.append(cmd)
+            return self.fake_execute(*cmd, **kwargs)
+
+        self.stubs.Set(processutils, 'execute', fake_execute)
+        self.vg.get_volume('fake-1')
+        self.vg.get_volume('fake-1')
+        self.assertEqual(2, len(lvs_calls))
+
     def test_get_all_physical_volumes(self):
         # Filtered VG version
         pvs = self.vg.get_all_physical_volumes('sudo', 'fake-vg')
@@ -210,6 +257,12 @@ class BrickLvmTestCase(test.TestCase):
                          self.vg._get_thin_pool_free_space("fake-vg",
                                                            "fake-vg-pool"))
 
+    def test_update_volume_group_info_thin(self):
+        self.vg.vg_thin_pool = 'fake-vg-pool'
+        self.vg.update_volume_group_info()
+        self.assertEqual(9.0, self.vg.vg_thin_pool_size)
+        self.assertEqual(7.92, self.vg.vg_thin_pool_free_space)
+
     def test_volume_create_after_thin_creation(self):
         """Test self.vg.vg_thin_pool is set to pool_name
 
@@ -14,8 +14,15 @@
 #    under the License.
 
 
+import BaseHTTPServer
+import collections
 import datetime
+import hashlib
+import shutil
+import SocketServer
+import tempfile
 
+import eventlet
 import glanceclient.exc
 import glanceclient.v2.client
 from glanceclient.v2.client import Client as glanceclient_v2
@@ -586,6 +593,156 @@ class TestGlanceClientVersion(test.TestCase):
                          'glanceclient.v2.client')
 
 
+class _FakeGlanceServer(SocketServer.ThreadingMixIn,
+                        BaseHTTPServer.HTTPServer):
+    """Serves the data of one image, honouring Range headers if asked to."""
+
+    def __init__(self, image_data, ranges_supported=True):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           _FakeGlanceHandler)
+        self.image_data = image_data
+        self.ranges_supported = ranges_supported
+        # (client port, Range header) of each request.
+        self.requests = []
+
+
+class _FakeGlanceHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        data = self.server.image_data
+        byte_range = self.headers.get('Range')
+        self.server.requests.append((self.client_address[1], byte_range))
+        if byte_range and self.server.ranges_supported:
+            first, last = map(int, byte_range.split('=')[1].split('-'))
+            body = data[first:last + 1]
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             'bytes %d-%d/%d' % (first, last, len(data)))
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGlanceRangedDownload(test.TestCase):
+    """Tests downloading images by ranges from a local HTTP server."""
+
+    def setUp(self):
+        super(TestGlanceRangedDownload, self).setUp()
+        self.context = context.RequestContext('fake', 'fake', auth_token=True)
+        self.flags(glance_download_workers=4,
+                   glance_download_chunk_size_mb=1)
+        self.image_data = ''.join(chr(i % 251) for i in xrange(3584 * 1024))
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _start_server(self, **kwargs):
+        server = _FakeGlanceServer(self.image_data, **kwargs)
+        eventlet.spawn(server.serve_forever)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _download(self, server, checksum=None):
+        checksum = checksum or hashlib.md5(self.image_data).hexdigest()
+        client = glance_stubs.StubGlanceClient(
+            [{'id': 'image1', 'size': len(self.image_data),
+              'checksum': checksum}])
+        self.stubs.Set(glance, '_create_glance_client',
+                       lambda context, netloc, use_ssl, version: client)
+        client_wrapper = glance.GlanceClientWrapper(
+            self.context, '127.0.0.1:%d' % server.server_port, False)
+        service = glance.GlanceImageService(client=client_wrapper)
+        path = '%s/image1' % self.tmp_dir
+        with open(path, 'wb') as f:
+            service.download(self.context, 'image1', f)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_download_ranges(self):
+        server = self._start_server()
+        self.assertEqual(self.image_data, self._download(server))
+        ranges = sorted(byte_range for _port, byte_range in server.requests)
+        self.assertEqual(['bytes=0-1048575', 'bytes=1048576-2097151',
+                          'bytes=2097152-3145727', 'bytes=3145728-3670015'],
+                         ranges)
+        # The connection of the first range is kept for a worker.
+        self.assertEqual(3, len(set(port for port, _r in server.requests)))
+
+    def test_download_ranges_not_supported(self):
+        server = self._start_server(ranges_supported=False)
+        self.assertEqual(self.image_data, self._download(server))
+        self.assertEqual(1, len(server.requests))
+
+    def test_download_ranges_bad_checksum(self):
+        server = self._start_server()
+        self.assertRaises(exception.ImageCopyFailure,
+                          self._download, server, checksum='bad')
+
+    def test_download_ranges_ssl_unverifiable(self):
+        server = self._start_server()
+        self.stubs.Set(glance, '_get_ssl_context', lambda: None)
+        client = glance_stubs.StubGlanceClient(
+            [{'id': 'image1', 'size': len(self.image_data),
+              'checksum': 'sum'}])
+        self.stubs.Set(glance, '_create_glance_client',
+                       lambda context, netloc, use_ssl, version: client)
+        client_wrapper = glance.GlanceClientWrapper(
+            self.context, '127.0.0.1:%d' % server.server_port, True)
+        service = glance.GlanceImageService(client=client_wrapper)
+        with open('%s/image1' % self.tmp_dir, 'wb') as f:
+            service.download(self.context, 'image1', f)
+        # The image came over the single stream of the glance client.
+        self.assertEqual([], server.requests)
+
+    def test_ssl_context_insecure(self):
+        if not hasattr(glance.ssl, 'create_default_context'):
+            self.skipTest('Python cannot verify certificates')
+        self.assertEqual(glance.ssl.CERT_REQUIRED,
+                         glance._get_ssl_context().verify_mode)
+        self.flags(glance_api_insecure=True)
+        self.assertEqual(glance.ssl.CERT_NONE,
+                         glance._get_ssl_context().verify_mode)
+
+
+class TestGlanceClientReuse(test.TestCase):
+
+    def setUp(self):
+        super(TestGlanceClientReuse, self).setUp()
+        self.context = context.RequestContext('fake', 'fake', auth_token=True)
+        self.flags(glance_api_servers=['fake_host:9292'])
+        self.stubs.Set(glance, '_clients', collections.OrderedDict())
+        self.stubs.Set(glance.time, 'sleep', lambda s: None)
+        self.info = {'num_calls': 0}
+        self.created = []
+
+        def _fake_create_glance_client(context, netloc, use_ssl, version):
+            self.created.append(netloc)
+            return _create_failing_glance_client(self.info)
+
+        self.stubs.Set(glance, '_create_glance_client',
+                       _fake_create_glance_client)
+
+    def test_client_reused(self):
+        self.info['num_calls'] = 1
+        client_wrapper = glance.GlanceClientWrapper()
+        client_wrapper.call(self.context, 'get', 'image1')
+        glance.GlanceClientWrapper().call(self.context, 'get', 'image1')
+        self.assertEqual(['fake_host:9292'], self.created)
+
+    def test_client_replaced_on_error(self):
+        self.flags(glance_num_retries=1)
+        glance.GlanceClientWrapper().call(self.context, 'get', 'image1')
+        self.assertEqual(2, self.info['num_calls'])
+        self.assertEqual(['fake_host:9292', 'fake_host:9292'], self.created)
+
+
 def _create_failing_glance_client(info):
     class MyGlanceStubClient(glance_stubs.StubGlanceClient):
         """A client that fails the first time, then succeeds."""
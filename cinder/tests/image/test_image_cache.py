@@ -0,0 +1,110 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Unit tests for the image cache."""
+
+import shutil
+import tempfile
+
+import eventlet
+
+from cinder import context
+from cinder.image import image_cache
+from cinder import test
+from cinder import units
+
+
+class ImageCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ImageCacheTestCase, self).setUp()
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir)
+        self.context = context.get_admin_context()
+        self.created = []
+        self.deleted = []
+
+    def _create_entry(self, context, image_service, image_id, key, size=1):
+        # Let other greenthreads run, as a download would.
+        eventlet.sleep(0)
+        self.created.append(image_id)
+        return {'location': 'loc-%s' % image_id,
+                'size': size * units.GiB}
+
+    def _get_cache(self, **kwargs):
+        return image_cache.ImageCache(self.index_dir, self._create_entry,
+                                      self.deleted.append, **kwargs)
+
+    def _get(self, cache, image_id, checksum='sum'):
+        with cache.get(self.context, None, image_id,
+                       {'checksum': checksum}) as entry:
+            return entry
+
+    def test_get_caches_entry(self):
+        cache = self._get_cache()
+        self.assertEqual('loc-image1', self._get(cache, 'image1')['location'])
+        self.assertEqual('loc-image1', self._get(cache, 'image1')['location'])
+        self.assertEqual(['image1'], self.created)
+
+    def test_get_new_checksum(self):
+        cache = self._get_cache()
+        self._get(cache, 'image1')
+        self._get(cache, 'image1', checksum='other')
+        self.assertEqual(['image1', 'image1'], self.created)
+
+    def test_get_concurrent_downloads_once(self):
+        cache = self._get_cache()
+        pool = eventlet.GreenPool()
+        for _i in range(5):
+            pool.spawn_n(self._get, cache, 'image1')
+        pool.waitall()
+        self.assertEqual(['image1'], self.created)
+
+    def test_lookup(self):
+        cache = self._get_cache()
+        with cache.lookup('image1', {'checksum': 'sum'}) as entry:
+            self.assertIsNone(entry)
+        self._get(cache, 'image1')
+        with cache.lookup('image1', {'checksum': 'sum'}) as entry:
+            self.assertEqual('loc-image1', entry['location'])
+
+    def test_index_persists(self):
+        self._get(self._get_cache(), 'image1')
+        with self._get_cache().lookup('image1', {'checksum': 'sum'}) as entry:
+            self.assertEqual('loc-image1', entry['location'])
+
+    def test_evict_by_count(self):
+        cache = self._get_cache(max_count=2)
+        self._get(cache, 'image1')
+        self._get(cache, 'image2')
+        # Using image1 makes image2 the least recently used.
+        self._get(cache, 'image1')
+        self._get(cache, 'image3')
+        self.assertEqual(['loc-image2'], self.deleted)
+
+    def test_evict_by_size(self):
+        cache = self._get_cache(max_size_gb=2)
+        self._get(cache, 'image1')
+        self._get(cache, 'image2')
+        self.assertEqual([], self.deleted)
+        self._get(cache, 'image3')
+        self.assertEqual(['loc-image1'], self.deleted)
+
+    def test_evict_skips_entries_in_use(self):
+        cache = self._get_cache(max_count=1)
+        with cache.get(self.context, None, 'image1', {'checksum': 'sum'}):
+            self._get(cache, 'image2')
+            self.assertEqual([], self.deleted)
+        self._get(cache, 'image3')
+        self.assertEqual(['loc-image1', 'loc-image2'], sorted(self.deleted))
@@ -22,6 +22,7 @@ from oslo.config import cfg
 
 from cinder import context
 from cinder.openstack.common.scheduler.weights import HostWeightHandler
+from cinder.scheduler import weights
 from cinder.scheduler.weights.capacity import CapacityWeigher
 from cinder import test
 from cinder.tests.scheduler import fakes
@@ -91,3 +92,17 @@ class CapacityWeigherTestCase(test.TestCase):
         weighed_host = self._get_weighed_host(hostinfo_list)
         self.assertEqual(weighed_host.weight, 921.0 * 2)
         self.assertEqual(weighed_host.obj.host, 'host1')
+
+    def test_batch_weigh_matches_per_host(self):
+        self.flags(capacity_weight_multiplier=-2.0)
+        hostinfo_list = list(self._get_all_hosts())
+        hostinfo_list[2].free_capacity_gb = 'infinite'
+        expected = self.weight_handler.get_weighed_objects(
+            [CapacityWeigher], hostinfo_list, {})
+
+        weight_handler = weights.BatchHostWeightHandler(
+            'cinder.scheduler.weights')
+        result = weight_handler.get_weighed_objects([CapacityWeigher],
+                                                    hostinfo_list, {})
+        self.assertEqual([(w.obj.host, w.weight) for w in expected],
+                         [(w.obj.host, w.weight) for w in result])
@@ -87,6 +87,42 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.scheduler.driver.volume_update_db')
+    def test_schedule_create_volumes(self, _mock_volume_update_db,
+                                     _mock_service_get_all_by_topic):
+        # The host states are read once, and the capacity consumed by each
+        # volume is taken into account when placing the next ones.
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        sched.volume_rpcapi = mock.Mock()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        _mock_volume_update_db.side_effect = (
+            lambda ctxt, volume_id, host: {'id': volume_id, 'host': host})
+
+        # host1 has 921G free, host3 256G, host2 270G and host4 190G
+        request_specs = [{'volume_id': 'fake-id%d' % i,
+                          'snapshot_id': None,
+                          'image_id': None,
+                          'volume_type': {'name': 'LVM_iSCSI'},
+                          'volume_properties': {'project_id': 1,
+                                                'size': 400}}
+                         for i in xrange(3)]
+        filter_properties_list = [{}, {}, {}]
+        failures = sched.schedule_create_volumes(fake_context, request_specs,
+                                                 filter_properties_list)
+
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        hosts = [call[0][2] for call in
+                 _mock_volume_update_db.call_args_list]
+        self.assertEqual(['host1', 'host1'], hosts)
+        self.assertEqual(2, sched.volume_rpcapi.create_volume.call_count)
+        self.assertEqual(1, len(failures))
+        self.assertEqual(request_specs[2], failures[0][0])
+        self.assertIsInstance(failures[0][1], exception.NoValidHost)
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
 
@@ -20,6 +20,8 @@ import mock
 from cinder import context
 from cinder.openstack.common import jsonutils
 from cinder.openstack.common.scheduler import filters
+from cinder.scheduler import filters as batch_filters
+from cinder.scheduler import host_columns
 from cinder import test
 from cinder.tests.scheduler import fakes
 
@@ -90,3 +92,86 @@ class HostFiltersTestCase(test.TestCase):
                                     'updated_at': None,
                                     'service': service})
         self.assertTrue(filt_cls.host_passes(host, filter_properties))
+
+    def _get_capacity_hosts(self):
+        capacities = [(200, 0), (120, 20), ('infinite', 0), ('unknown', 0),
+                      (None, 0), (50, 0)]
+        return [fakes.FakeHostState('host%d' % i,
+                                    {'free_capacity_gb': free,
+                                     'reserved_percentage': reserved})
+                for i, (free, reserved) in enumerate(capacities)]
+
+    def test_capacity_filter_columns(self):
+        filt_cls = self.class_map['CapacityFilter']()
+        filter_properties = {'size': 100, 'vol_exists_on': 'host5'}
+        hosts = self._get_capacity_hosts()
+        columns = host_columns.HostStateColumns(hosts)
+        expected = [filt_cls.host_passes(host, filter_properties)
+                    for host in hosts]
+        self.assertEqual([True, False, True, True, False, True], expected)
+        self.assertEqual(expected,
+                         filt_cls.filter_columns(columns, filter_properties))
+
+    def test_batch_filter_handler(self):
+        filter_handler = batch_filters.BatchHostFilterHandler(
+            'cinder.scheduler.filters')
+        filter_classes = [self.class_map['CapacityFilter'],
+                          self.class_map['JsonFilter']]
+        filter_properties = {'size': 100,
+                             'scheduler_hints': {
+                                 'query': jsonutils.dumps(
+                                     ['not', ['=', '$host', 'host2']])}}
+        hosts = self._get_capacity_hosts()
+        result = filter_handler.get_filtered_objects(filter_classes, hosts,
+                                                     filter_properties)
+        self.assertEqual(['host0', 'host3'], [host.host for host in result])
+
+    def _get_capabilities_host(self, capabilities):
+        host = fakes.FakeHostState('host1', {})
+        host.update_capabilities(capabilities)
+        return host
+
+    def test_capabilities_filter(self):
+        filt_cls = self.class_map['CapabilitiesFilter']()
+        host = self._get_capabilities_host(
+            {'opt1': 1, 'opt2': '2', 'opt3': 'yes', 'opt4': 'abc',
+             'nested': {'opt5': 'x'}})
+        for extra_specs, passes in (
+                ({}, True),
+                ({'opt1': '1'}, False),
+                ({'opt1': '= 1', 'opt2': '>= 2'}, True),
+                ({'capabilities:opt2': '<= 1'}, False),
+                ({'opt3': '<is> True', 'opt4': '<in> b'}, True),
+                ({'opt4': '<or> x <or> abc'}, True),
+                ({'opt4': '= 1'}, False),
+                ({'capabilities:nested:opt5': 's== x'}, True),
+                ({'other:opt1': '= 5'}, True),
+                ({'opt6': '= 1'}, False)):
+            filter_properties = {'resource_type': {'id': 'type1',
+                                                   'extra_specs':
+                                                   extra_specs}}
+            self.assertEqual(passes,
+                             filt_cls.host_passes(host, filter_properties),
+                             extra_specs)
+
+    def test_capabilities_filter_matcher_cached(self):
+        filt_cls = self.class_map['CapabilitiesFilter']
+        self.stubs.Set(filt_cls, '_matchers', {})
+        resource_type = {'id': 'type1', 'extra_specs': {'opt1': '= 1'}}
+        matcher = filt_cls.get_matcher(resource_type)
+        self.assertIs(matcher, filt_cls.get_matcher(dict(resource_type)))
+
+        # Changed extra specs are compiled again.
+        resource_type['extra_specs'] = {'opt1': '= 2'}
+        host = self._get_capabilities_host({'opt1': 1})
+        self.assertFalse(filt_cls().host_passes(
+            host, {'resource_type': resource_type}))
+        self.assertIsNot(matcher, filt_cls.get_matcher(resource_type))
+
+    def test_capabilities_filter_uses_capability_numbers(self):
+        filt_cls = self.class_map['CapabilitiesFilter']()
+        host = self._get_capabilities_host({'opt1': '10'})
+        self.assertEqual({'opt1': 10.0}, host.capability_numbers)
+        host.capability_numbers['opt1'] = 1.0
+        self.assertFalse(filt_cls.host_passes(
+            host, {'resource_type': {'extra_specs': {'opt1': '>= 5'}}}))
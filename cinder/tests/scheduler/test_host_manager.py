@@ -23,7 +23,9 @@ from oslo.config import cfg
 from cinder import exception
 from cinder.openstack.common.scheduler import filters
 from cinder.openstack.common import timeutils
+from cinder.scheduler import filters as batch_filters
 from cinder.scheduler import host_manager
+from cinder.scheduler import weights as batch_weights
 from cinder import test
 
 
@@ -66,6 +68,17 @@ class HostManagerTestCase(test.TestCase):
         self.assertEqual(len(filter_classes), 1)
         self.assertEqual(filter_classes[0].__name__, 'FakeFilterClass2')
 
+    def test_batch_mode_handlers(self):
+        # Per-host handlers by default, batch handlers when asked for.
+        self.assertEqual(type(self.host_manager.filter_handler),
+                         filters.HostFilterHandler)
+        self.flags(scheduler_use_batch_mode=True)
+        manager = host_manager.HostManager()
+        self.assertEqual(type(manager.filter_handler),
+                         batch_filters.BatchHostFilterHandler)
+        self.assertEqual(type(manager.weight_handler),
+                         batch_weights.BatchHostWeightHandler)
+
     @mock.patch('cinder.scheduler.host_manager.HostManager.'
                 '_choose_host_filters')
     def test_get_filtered_hosts(self, _mock_choose_host_filters):
@@ -117,10 +130,48 @@ class HostManagerTestCase(test.TestCase):
                     'host3': host3_volume_capabs}
         self.assertDictMatch(service_states, expected)
 
+    def test_update_service_capabilities_partial(self):
+        update = self.host_manager.update_service_capabilities
+        self.assertFalse(update('volume', 'host1',
+                                dict(free_capacity_gb=10, pools=1), seq=1))
+        self.assertFalse(update('volume', 'host1',
+                                dict(free_capacity_gb=20), seq=2,
+                                full=False, removed=['pools']))
+        states = self.host_manager.service_states['host1']
+        self.assertEqual(20, states['free_capacity_gb'])
+        self.assertNotIn('pools', states)
+
+        # A missed update asks for a full one, only once.
+        self.assertTrue(update('volume', 'host1', dict(free_capacity_gb=40),
+                               seq=4, full=False))
+        self.assertFalse(update('volume', 'host1', dict(free_capacity_gb=50),
+                                seq=5, full=False))
+        self.assertEqual(20, states['free_capacity_gb'])
+        self.assertFalse(update('volume', 'host1', dict(free_capacity_gb=60),
+                                seq=6))
+        self.assertFalse(update('volume', 'host1', dict(free_capacity_gb=70),
+                                seq=7, full=False))
+        self.assertEqual(
+            70, self.host_manager.service_states['host1']['free_capacity_gb'])
+        self.assertEqual({'full': 2, 'partial': 2, 'missed': 2},
+                         self.host_manager.capabilities_stats)
+
+        # Full updates without a sequence number restart the numbering.
+        self.assertFalse(update('volume', 'host1', dict(free_capacity_gb=80)))
+        self.assertFalse(update('volume', 'host1', dict(free_capacity_gb=90),
+                                seq=1, full=False))
+        self.assertEqual(
+            90, self.host_manager.service_states['host1']['free_capacity_gb'])
+
+        # Partial updates from unknown hosts cannot be applied.
+        self.assertTrue(update('volume', 'host2', dict(free_capacity_gb=10),
+                               seq=2, full=False))
+
     @mock.patch('cinder.db.service_get_all_by_topic')
     @mock.patch('cinder.utils.service_is_up')
     def test_get_all_host_states(self, _mock_service_is_up,
                                  _mock_service_get_all_by_topic):
+        self.flags(scheduler_service_refresh_interval=0)
         context = 'fake_context'
         topic = CONF.volume_topic
 
@@ -190,6 +241,95 @@ class HostManagerTestCase(test.TestCase):
             self.assertEqual(host_state_map[host].service,
                              volume_node)
 
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_cached_services(self, _mock_service_is_up,
+                                                 _mock_service_get_all):
+        self.flags(scheduler_service_refresh_interval=60)
+        context = 'fake_context'
+        _mock_service_is_up.return_value = True
+        _mock_service_get_all.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow())]
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(1, _mock_service_get_all.call_count)
+
+        # Capability updates are applied to the cached host state
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', dict(free_capacity_gb=10,
+                                    total_capacity_gb=20,
+                                    reserved_percentage=0))
+        host_states = list(self.host_manager.get_all_host_states(context))
+        self.assertEqual(1, _mock_service_get_all.call_count)
+        self.assertEqual(10, host_states[0].free_capacity_gb)
+
+        # An update from an unknown host forces a refresh
+        self.host_manager.update_service_capabilities(
+            'volume', 'host2', dict(free_capacity_gb=10))
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, _mock_service_get_all.call_count)
+
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_filtered_hosts_narrowed_by_indexes(self, _mock_service_is_up,
+                                                    _mock_service_get_all):
+        context = 'fake_context'
+        _mock_service_is_up.return_value = True
+        _mock_service_get_all.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=3, host='host3', topic='volume', disabled=False,
+                 availability_zone='zone2', updated_at=timeutils.utcnow())]
+        for i, backend in enumerate(['lvm1', 'lvm2', 'lvm1']):
+            self.host_manager.update_service_capabilities(
+                'volume', 'host%s' % (i + 1),
+                dict(volume_backend_name=backend, free_capacity_gb=100,
+                     total_capacity_gb=100, reserved_percentage=0))
+
+        properties = {'request_spec': {'resource_properties':
+                                       {'availability_zone': 'zone1'}}}
+        hosts = self.host_manager.get_all_host_states(context)
+        with mock.patch.object(self.host_manager.filter_handler,
+                               'get_filtered_objects') as _mock_filter:
+            self.host_manager.get_filtered_hosts(
+                hosts, properties,
+                filter_class_names=['AvailabilityZoneFilter'])
+        hosts = _mock_filter.call_args[0][1]
+        self.assertEqual(['host1', 'host2'],
+                         sorted(host.host for host in hosts))
+
+        candidates = self.host_manager._get_candidate_hosts(
+            [mock.Mock(__name__='CapabilitiesFilter')],
+            {'resource_type': {'extra_specs':
+                               {'volume_backend_name': 'lvm1'}}})
+        self.assertEqual(set(['host1', 'host3']), candidates)
+
+        candidates = self.host_manager._get_candidate_hosts(
+            [mock.Mock(__name__='CapabilitiesFilter')],
+            {'resource_type': {'extra_specs':
+                               {'capabilities:foo': 'bar'}}})
+        self.assertEqual(set(), candidates)
+
+        # Keys without a capability name do not narrow the hosts.
+        candidates = self.host_manager._get_candidate_hosts(
+            [mock.Mock(__name__='CapabilitiesFilter')],
+            {'resource_type': {'extra_specs':
+                               {'capabilities': 'bar',
+                                'volume_backend_name': 'lvm1'}}})
+        self.assertEqual(set(['host1', 'host3']), candidates)
+        candidates = self.host_manager._get_candidate_hosts(
+            [mock.Mock(__name__='CapabilitiesFilter')],
+            {'resource_type': {'extra_specs': {'capabilities:': 'bar'}}})
+        self.assertEqual(set(), candidates)
+
+        candidates = self.host_manager._get_candidate_hosts(
+            [mock.Mock(__name__='CapacityFilter')], properties)
+        self.assertIsNone(candidates)
+
 
 class HostStateTestCase(test.TestCase):
     """Test case for HostState class."""
@@ -84,6 +84,26 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_partial(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities='fake_capabilities',
+                                 seq=2,
+                                 full=False,
+                                 removed=['fake_capability'],
+                                 fanout=True,
+                                 version='1.7')
+
+    def test_can_send_partial_capabilities(self):
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        with mock.patch.object(rpcapi.client,
+                               'can_send_version') as can_send_version:
+            can_send_version.return_value = False
+            self.assertFalse(rpcapi.can_send_partial_capabilities())
+            can_send_version.assert_called_once_with('1.7')
+
     def test_create_volume(self):
         self._test_scheduler_api('create_volume',
                                  rpc_method='cast',
@@ -95,6 +115,14 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  filter_properties='filter_properties',
                                  version='1.2')
 
+    def test_create_volumes(self):
+        self._test_scheduler_api('create_volumes',
+                                 rpc_method='cast',
+                                 topic='topic',
+                                 request_specs=['fake_request_spec'],
+                                 filter_properties_list=['filter_properties'],
+                                 version='1.6')
+
     def test_migrate_volume_to_host(self):
         self._test_scheduler_api('migrate_volume_to_host',
                                  rpc_method='cast',
@@ -82,6 +82,28 @@ class SchedulerManagerTestCase(test.TestCase):
                                                  capabilities=capabilities)
         _mock_update_cap.assert_called_once_with(service, host, capabilities)
 
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.'
+                'publish_service_capabilities')
+    @mock.patch('cinder.scheduler.driver.Scheduler.'
+                'update_service_capabilities')
+    def test_update_service_capabilities_missed(self, _mock_update_cap,
+                                                _mock_publish):
+        # A missed partial update asks the host for all its capabilities
+        _mock_update_cap.return_value = True
+        capabilities = {'fake_capability': 'fake_value'}
+
+        self.manager.update_service_capabilities(self.context,
+                                                 service_name='volume',
+                                                 host='fake_host',
+                                                 capabilities=capabilities,
+                                                 capabilities_seq=3,
+                                                 full_capabilities=False,
+                                                 removed_capabilities=[])
+        _mock_update_cap.assert_called_once_with('volume', 'fake_host',
+                                                 capabilities, seq=3,
+                                                 full=False, removed=[])
+        _mock_publish.assert_called_once_with(self.context, host='fake_host')
+
     @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
     @mock.patch('cinder.db.volume_update')
     def test_create_volume_exception_puts_volume_in_error_state(
@@ -102,6 +124,26 @@ class SchedulerManagerTestCase(test.TestCase):
         _mock_sched_create.assert_called_once_with(self.context, request_spec,
                                                    {})
 
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
+    @mock.patch('cinder.db.volume_update')
+    def test_create_volumes_exception_puts_volume_in_error_state(
+            self, _mock_volume_update, _mock_sched_create):
+        # Only the volumes which could not be scheduled are put in 'error'
+        # state, the exceptions are eaten.
+        _mock_sched_create.side_effect = [None,
+                                          exception.NoValidHost(reason=""),
+                                          exception.CinderException()]
+        topic = 'fake_topic'
+        request_specs = [{'volume_id': i} for i in xrange(3)]
+        filter_properties_list = [{}, {}, {}]
+
+        self.manager.create_volumes(self.context, topic, request_specs,
+                                    filter_properties_list)
+        self.assertEqual([mock.call(self.context, 1, {'status': 'error'}),
+                          mock.call(self.context, 2, {'status': 'error'})],
+                         _mock_volume_update.call_args_list)
+        self.assertEqual(3, _mock_sched_create.call_count)
+
     @mock.patch('cinder.scheduler.driver.Scheduler.host_passes_filters')
     @mock.patch('cinder.db.volume_update')
     def test_migrate_volume_exception_returns_volume_state(
@@ -14,10 +14,13 @@
 #    under the License.
 """ Tests for Ceph backup service."""
 
+import errno
 import hashlib
 import mock
 import os
 import six
+import stat
+import struct
 import tempfile
 import uuid
 
@@ -363,6 +366,61 @@ class BackupCephTestCase(test.TestCase):
             # Ensure the files are equal
             self.assertEqual(checksum.digest(), self.checksum.digest())
 
+    @common_mocks
+    def test_transfer_data_skips_zero_chunks(self):
+        self.service.chunk_size = self.chunk_size
+        data = ['\0' * self.chunk_size, 'a' * self.chunk_size,
+                '\0' * self.chunk_size, 'b' * 10]
+        length = (self.chunk_size * 3) + 10
+        src = six.BytesIO(''.join(data))
+        dest = six.BytesIO()
+
+        with mock.patch.object(dest, 'write', wraps=dest.write) as \
+                mock_write:
+            self.service._transfer_data(src, 'src_foo', dest, 'dest_foo',
+                                        length, dest_is_zeroed=True)
+
+            # Only the chunks containing data are written.
+            self.assertEqual(mock_write.call_args_list,
+                             [mock.call(data[1]), mock.call(data[3])])
+        self.assertEqual(dest.getvalue(), ''.join(data))
+
+    @common_mocks
+    def test_transfer_data_discards_zero_chunks(self):
+        self.service.chunk_size = self.chunk_size
+        src = six.BytesIO(('a' * self.chunk_size) + ('\0' * self.chunk_size))
+        dest = six.BytesIO('b' * self.chunk_size * 3)
+
+        with mock.patch.object(self.service, '_discard_bytes',
+                               wraps=self.service._discard_bytes) as \
+                mock_discard_bytes:
+            self.service._transfer_data(src, 'src_foo', dest, 'dest_foo',
+                                        self.chunk_size * 3)
+
+            # The zero chunk and the bytes missing from the source.
+            self.assertEqual(mock_discard_bytes.call_args_list,
+                             [mock.call(dest, self.chunk_size,
+                                        self.chunk_size),
+                              mock.call(dest, self.chunk_size * 2,
+                                        self.chunk_size)])
+        self.assertEqual(dest.getvalue(),
+                         ('a' * self.chunk_size) +
+                         ('\0' * self.chunk_size * 2))
+
+    @common_mocks
+    def test_transfer_data_read_error(self):
+        self.service.chunk_size = self.chunk_size
+        src = six.BytesIO('a' * self.chunk_size)
+        dest = six.BytesIO()
+
+        with mock.patch.object(src, 'read') as mock_read:
+            mock_read.side_effect = ['a' * self.chunk_size,
+                                     IOError('read error')]
+            self.assertRaises(IOError, self.service._transfer_data, src,
+                              'src_foo', dest, 'dest_foo',
+                              self.chunk_size * 3)
+        self.assertEqual(dest.getvalue(), 'a' * self.chunk_size)
+
     @common_mocks
     def test_backup_volume_from_file(self):
         checksum = hashlib.sha256()
@@ -533,8 +591,10 @@ class BackupCephTestCase(test.TestCase):
             self.service._discard_bytes(wrapped_rbd, 0,
                                         self.service.chunk_size * 2)
 
-            self.assertEqual(self.mock_rbd.Image.write.call_count, 2)
-            self.assertEqual(self.mock_rbd.Image.flush.call_count, 2)
+            # Zeroes are written from a shared block rather than allocated.
+            blocks = self.service.chunk_size * 2 / len(ceph.ZERO_BLOCK)
+            self.assertEqual(self.mock_rbd.Image.write.call_count, blocks)
+            self.assertEqual(self.mock_rbd.Image.flush.call_count, 1)
             self.assertFalse(self.mock_rbd.Image.discard.called)
 
         self.mock_rbd.Image.write.reset_mock()
@@ -549,9 +609,33 @@ class BackupCephTestCase(test.TestCase):
             self.service._discard_bytes(wrapped_rbd, 0,
                                         (self.service.chunk_size * 2) + 1)
 
-            self.assertEqual(self.mock_rbd.Image.write.call_count, 3)
-            self.assertEqual(self.mock_rbd.Image.flush.call_count, 3)
+            self.assertEqual(self.mock_rbd.Image.write.call_count, blocks + 1)
+            self.assertEqual(self.mock_rbd.Image.flush.call_count, 1)
             self.assertFalse(self.mock_rbd.Image.discard.called)
+            self.assertEqual(wrapped_rbd.tell(),
+                             (self.service.chunk_size * 2) + 1)
+
+    @common_mocks
+    @mock.patch('fcntl.ioctl', spec=True)
+    @mock.patch('os.fstat', spec=True)
+    def test_discard_bytes_block_device(self, mock_fstat, mock_ioctl):
+        mock_fstat.return_value.st_mode = stat.S_IFBLK
+        with tempfile.NamedTemporaryFile() as test_file:
+            self.service._discard_bytes(test_file, 1024, 4096)
+
+            mock_ioctl.assert_called_once_with(test_file.fileno(),
+                                               ceph.BLKZEROOUT,
+                                               struct.pack('QQ', 1024, 4096))
+            self.assertEqual(test_file.tell(), 1024 + 4096)
+
+            # Fall back to writing zeroes if the ioctl is not supported.
+            mock_ioctl.side_effect = IOError(errno.ENOTTY, 'not supported')
+            test_file.seek(0)
+            self.service._discard_bytes(test_file, 1024, 4096)
+
+            self.assertEqual(test_file.tell(), 1024 + 4096)
+            test_file.seek(1024)
+            self.assertEqual(test_file.read(), '\0' * 4096)
 
     @common_mocks
     def test_delete_backup_snapshot(self):
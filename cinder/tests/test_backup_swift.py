@@ -19,10 +19,14 @@ Tests for Backup swift code.
 
 import bz2
 import hashlib
+import json
 import os
+import random
 import tempfile
 import zlib
 
+import eventlet
+import mock
 from swiftclient import client as swift
 
 from cinder.backup.drivers.swift import SwiftBackupDriver
@@ -32,6 +36,7 @@ from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder.tests.backup.fake_swift_client import FakeSwiftClient
+from cinder.tests.backup.fake_swift_client import FakeSwiftConnection
 
 
 LOG = logging.getLogger(__name__)
@@ -131,6 +136,165 @@ class BackupSwiftTestCase(test.TestCase):
                           service.backup,
                           backup, self.volume_file)
 
+    def _backup_with_slow_puts(self, uploads):
+        """Backup the volume with puts taking a random time to finish."""
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            uploads.append(('start', name))
+            eventlet.sleep(random.random() * 0.01)
+            uploads.append(('end', name))
+            return 'fake-md5-sum'
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        self._create_backup_db_entry()
+        self.flags(backup_swift_object_size=8192)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        with mock.patch.object(service, '_write_metadata') as write_metadata:
+            service.backup(backup, self.volume_file)
+        return write_metadata.call_args[0][3]
+
+    def test_backup_concurrent_uploads_keep_object_order(self):
+        self.flags(backup_swift_upload_concurrency=4)
+        uploads = []
+        object_list = self._backup_with_slow_puts(uploads)
+
+        self.assertEqual(16, len(object_list))
+        offsets = [obj.values()[0]['offset'] for obj in object_list]
+        self.assertEqual(range(8192, 131073, 8192), offsets)
+        names = [obj.keys()[0] for obj in object_list]
+        self.assertEqual(sorted(names), names)
+        # Several uploads were in flight at the same time.
+        self.assertNotEqual(['start', 'end'] * 16,
+                            [event for event, _name in uploads])
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertEqual(17, backup['object_count'])
+
+    def test_backup_max_queued_bytes(self):
+        self.flags(backup_swift_upload_concurrency=8,
+                   backup_swift_max_queued_bytes=2 * 8192)
+        uploads = []
+        self._backup_with_slow_puts(uploads)
+
+        in_flight = 0
+        for event, _name in uploads:
+            in_flight += 1 if event == 'start' else -1
+            self.assertTrue(in_flight <= 2)
+
+    def _stub_swift_store(self):
+        """Keep the objects put in swift to get them back."""
+        store = {}
+
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            store[(container, name)] = reader.read()
+            return 'fake-md5-sum'
+
+        def fake_get_object(conn, container, name):
+            return None, store[(container, name)]
+
+        def fake_get_container(conn, container, prefix=None, **kwargs):
+            return None, [{'name': name} for (cont, name) in sorted(store)
+                          if cont == container and name.startswith(prefix)]
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+        self.stubs.Set(FakeSwiftConnection, 'get_container',
+                       fake_get_container)
+        return store
+
+    def _backup_to_store(self, backup_id):
+        db.backup_create(self.ctxt, {'id': backup_id,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888',
+                                     'service': 'cinder.backup.drivers.swift',
+                                     'status': 'creating'})
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        service.backup(db.backup_get(self.ctxt, backup_id), self.volume_file)
+        db.backup_update(self.ctxt, backup_id, {'status': 'available'})
+        return db.backup_get(self.ctxt, backup_id)
+
+    def test_backup_incremental(self):
+        self.flags(backup_swift_incremental=True,
+                   backup_swift_object_size=8192)
+        store = self._stub_swift_store()
+        full = self._backup_to_store(123)
+        self.assertIsNone(full['parent_id'])
+        self.assertEqual(17, len(store))
+
+        self.volume_file.seek(3 * 8192 + 10)
+        self.volume_file.write('changed')
+        self.volume_file.seek(0)
+        expected = self.volume_file.read()
+        incremental = self._backup_to_store(124)
+        self.assertEqual(123, int(incremental['parent_id']))
+        # Only the changed object and the metadata were uploaded.
+        new_objects = [name for (_cont, name) in store
+                       if name.startswith(incremental['service_metadata'])]
+        self.assertEqual(2, len(new_objects))
+
+        service = SwiftBackupDriver(self.ctxt)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            service.restore(incremental, '1234-5678-1234-8888', volume_file)
+            volume_file.seek(0)
+            self.assertEqual(expected, volume_file.read())
+
+    def test_backup_incremental_object_size_changed(self):
+        self.flags(backup_swift_incremental=True,
+                   backup_swift_object_size=8192)
+        store = self._stub_swift_store()
+        self._backup_to_store(123)
+        self.flags(backup_swift_object_size=16384)
+        backup = self._backup_to_store(124)
+        self.assertIsNone(backup['parent_id'])
+        new_objects = [name for (_cont, name) in store
+                       if name.startswith(backup['service_metadata'])]
+        self.assertEqual(9, len(new_objects))
+
+    def test_backup_incremental_parent_recorded_before_reading(self):
+        self.flags(backup_swift_incremental=True,
+                   backup_swift_object_size=8192)
+        self._stub_swift_store()
+        self._backup_to_store(123)
+        db.backup_create(self.ctxt, {'id': 124,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888',
+                                     'service': 'cinder.backup.drivers.swift',
+                                     'status': 'creating'})
+        service = SwiftBackupDriver(self.ctxt)
+        service._prepare_backup(db.backup_get(self.ctxt, 124))
+        # The parent is protected while the backup is still creating.
+        self.assertEqual(123, int(db.backup_get(self.ctxt, 124)['parent_id']))
+
+    def test_backup_incremental_parent_deleted(self):
+        self.flags(backup_swift_incremental=True,
+                   backup_swift_object_size=8192)
+        self._stub_swift_store()
+        self._backup_to_store(123)
+        db.backup_create(self.ctxt, {'id': 124,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888',
+                                     'service': 'cinder.backup.drivers.swift',
+                                     'status': 'creating'})
+        service = SwiftBackupDriver(self.ctxt)
+        get_parent_backup = service._get_parent_backup
+
+        def _get_parent_backup(backup):
+            # The parent is deleted once it has been chosen.
+            parent = get_parent_backup(backup)
+            db.backup_mark_deleting(self.ctxt, 123)
+            return parent
+
+        self.stubs.Set(service, '_get_parent_backup', _get_parent_backup)
+        object_meta, _container = service._prepare_backup(
+            db.backup_get(self.ctxt, 124))
+        self.assertIsNone(object_meta['parent'])
+        self.assertEqual([], object_meta['parent_objects'])
+        self.assertIsNone(db.backup_get(self.ctxt, 124)['parent_id'])
+
     def test_restore(self):
         self._create_backup_db_entry()
         service = SwiftBackupDriver(self.ctxt)
@@ -139,6 +303,41 @@ class BackupSwiftTestCase(test.TestCase):
             backup = db.backup_get(self.ctxt, 123)
             service.restore(backup, '1234-5678-1234-8888', volume_file)
 
+    def _restore_with_slow_gets(self, md5=None):
+        """Restore three objects which take a random time to download."""
+        def fake_get_object(conn, container, name):
+            eventlet.sleep(random.random() * 0.01)
+            if 'metadata' in name:
+                return None, json.dumps(metadata)
+            return None, zlib.compress(name * 1024)
+
+        metadata = {'version': '1.0.0',
+                    'objects': [{'backup_%03d' % i: {'compression': 'zlib',
+                                                     'md5': md5}}
+                                for i in (1, 2, 3)]}
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+        self._create_backup_db_entry()
+        service = SwiftBackupDriver(self.ctxt)
+        backup = db.backup_get(self.ctxt, 123)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+            volume_file.seek(0)
+            return volume_file.read()
+
+    def test_restore_prefetch_writes_in_order(self):
+        self.flags(backup_swift_restore_prefetch=3,
+                   backup_swift_restore_sync_bytes=20 * 1024)
+        with mock.patch('os.fsync') as fsync:
+            data = self._restore_with_slow_gets(md5='fake-md5-sum')
+        self.assertEqual(''.join(('backup_%03d' % i) * 1024
+                                 for i in (1, 2, 3)), data)
+        # Synced once past 20KiB, then once more at the end.
+        self.assertEqual(2, fsync.call_count)
+
+    def test_restore_checks_md5(self):
+        self.assertRaises(exception.InvalidBackup,
+                          self._restore_with_slow_gets, md5='bad-md5-sum')
+
     def test_restore_wraps_socket_error(self):
         container_name = 'socket_error_on_get'
         self._create_backup_db_entry(container=container_name)
@@ -0,0 +1,137 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the in-process volume copy engine."""
+
+import errno
+import fcntl
+import os
+import shutil
+import struct
+import tempfile
+
+from cinder import test
+from cinder import units
+from cinder.volume import copy_engine
+
+
+class CopyEngineTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CopyEngineTestCase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.src = os.path.join(self.tempdir, 'src')
+        self.dest = os.path.join(self.tempdir, 'dest')
+        # 1 MiB of data, 2 MiB of zeroes and a short tail of data.
+        self.data = (os.urandom(units.MiB) + '\0' * 2 * units.MiB +
+                     os.urandom(1000))
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def _read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_copy_data(self):
+        with open(self.dest, 'wb') as f:
+            f.write('x' * 5 * units.MiB)
+
+        stats = copy_engine.copy_data(self.src, self.dest, 4 * units.MiB)
+
+        self.assertEqual(self.data, self._read_dest())
+        self.assertEqual(len(self.data), stats['bytes'])
+        self.assertEqual(0, stats['skipped'])
+
+    def test_copy_data_length(self):
+        copy_engine.copy_data(self.src, self.dest, units.MiB + 10,
+                              blocksize=64 * units.KiB)
+        self.assertEqual(self.data[:units.MiB + 10], self._read_dest())
+
+    def test_copy_data_sparse(self):
+        stats = copy_engine.copy_data(self.src, self.dest, len(self.data),
+                                      sparse=True, sync=True)
+
+        self.assertEqual(self.data, self._read_dest())
+        self.assertEqual(2 * units.MiB, stats['skipped'])
+        self.assertTrue(os.stat(self.dest).st_blocks * 512 <
+                        len(self.data))
+
+    def test_copy_data_trailing_zeroes(self):
+        data = os.urandom(units.MiB) + '\0' * units.MiB
+        with open(self.src, 'wb') as f:
+            f.write(data)
+        copy_engine.copy_data(self.src, self.dest, len(data), sparse=True)
+        self.assertEqual(data, self._read_dest())
+
+    def test_copy_data_without_direct(self):
+        stats = copy_engine.copy_data(self.src, self.dest, len(self.data),
+                                      direct=False)
+        self.assertEqual(self.data, self._read_dest())
+        self.assertFalse(stats['direct'])
+
+    def test_copy_data_progress(self):
+        reports = []
+        copy_engine.copy_data(self.src, self.dest, len(self.data),
+                              progress=lambda *args: reports.append(args),
+                              progress_interval=0)
+        self.assertEqual((units.MiB, len(self.data)), reports[0])
+        self.assertEqual((len(self.data), len(self.data)), reports[-1])
+
+    def test_copy_data_offset(self):
+        with open(self.dest, 'wb') as f:
+            f.write('x' * len(self.data))
+
+        copy_engine.copy_data(self.src, self.dest, units.MiB,
+                              offset=units.MiB)
+
+        self.assertEqual('x' * units.MiB + self.data[units.MiB:2 * units.MiB] +
+                         'x' * (len(self.data) - 2 * units.MiB),
+                         self._read_dest())
+
+    def _stub_ioctl(self, supported, discard_zeroes=1):
+        calls = []
+
+        def fake_ioctl(fd, request, arg):
+            calls.append(request)
+            if request not in supported:
+                raise IOError(errno.ENOTTY, 'Inappropriate ioctl')
+            if request == copy_engine.BLKDISCARDZEROES:
+                return struct.pack('I', discard_zeroes)
+            return arg
+
+        self.stubs.Set(fcntl, 'ioctl', fake_ioctl)
+        return calls
+
+    def test_zero_range_discard(self):
+        calls = self._stub_ioctl([copy_engine.BLKDISCARDZEROES,
+                                  copy_engine.BLKDISCARD,
+                                  copy_engine.BLKZEROOUT])
+        self.assertTrue(copy_engine._zero_range(0, 0, units.MiB, True))
+        self.assertEqual([copy_engine.BLKDISCARDZEROES,
+                          copy_engine.BLKDISCARD], calls)
+
+    def test_zero_range_discard_not_zeroing(self):
+        calls = self._stub_ioctl([copy_engine.BLKDISCARDZEROES,
+                                  copy_engine.BLKDISCARD,
+                                  copy_engine.BLKZEROOUT],
+                                 discard_zeroes=0)
+        self.assertTrue(copy_engine._zero_range(0, 0, units.MiB, True))
+        self.assertEqual([copy_engine.BLKDISCARDZEROES,
+                          copy_engine.BLKZEROOUT], calls)
+
+    def test_zero_range_unsupported(self):
+        self._stub_ioctl([])
+        self.assertFalse(copy_engine._zero_range(0, 0, units.MiB, False))
@@ -246,6 +246,8 @@ class CoraidDriverTestCase(test.TestCase):
         configuration.use_multipath_for_image_xfer = False
         configuration.num_volume_device_scan_tries = 3
         configuration.volume_dd_blocksize = '1M'
+        # Leave the optional settings, like the image cache, unset.
+        configuration.safe_get = lambda name: None
         self.fake_rpc = FakeRpc()
 
         self.stubs.Set(coraid.CoraidRESTClient, 'rpc', self.fake_rpc)
@@ -16,9 +16,14 @@
 
 import time
 
+import mock
+from taskflow import states
+
 from cinder import context
+from cinder import flow_utils
 from cinder import test
 from cinder.volume.flows.api import create_volume
+from cinder.volume.flows.manager import create_volume as manager_create
 
 
 class fake_scheduler_rpc_api(object):
@@ -105,6 +110,84 @@ class CreateVolumeFlowTestCase(test.TestCase):
 
         task._cast_create_volume(self.ctxt, spec, props)
 
+    def test_cast_create_volume_batch(self):
+        spec = {'volume_id': 1,
+                'source_volid': None,
+                'snapshot_id': None,
+                'image_id': None}
+        scheduler_rpcapi = mock.Mock()
+        batch = create_volume.SchedulerCastBatch(scheduler_rpcapi)
+
+        task = create_volume.VolumeCastTask(scheduler_rpcapi,
+                                            fake_volume_api(spec, self),
+                                            fake_db())
+        task._cast_create_volume(self.ctxt, spec, {}, batch)
+
+        self.assertEqual([spec], batch.request_specs)
+        self.assertFalse(scheduler_rpcapi.create_volume.called)
+
+    @mock.patch.object(flow_utils, 'load_flow')
+    def test_get_flow_reuses_flow(self, load_flow):
+        deps = (mock.Mock(), mock.Mock(), fake_db(), mock.Mock())
+        batch = create_volume.SchedulerCastBatch(deps[0])
+
+        create_volume.get_flow(*deps, az_check_functor=None,
+                               create_what={'name': 'vol1'})
+        create_volume.get_flow(*deps, az_check_functor=None,
+                               create_what={'name': 'vol2'}, batch=batch)
+
+        first, second = load_flow.call_args_list
+        self.assertIs(first[0][0], second[0][0])
+        self.assertEqual({'name': 'vol1', 'az_check_functor': None,
+                          'batch': None}, first[0][1])
+        self.assertEqual({'name': 'vol2', 'az_check_functor': None,
+                          'batch': batch}, second[0][1])
+
+    @mock.patch.object(flow_utils, 'load_flow')
+    def test_get_manager_flow_reuses_flow(self, load_flow):
+        deps = dict(db=fake_db(), driver=mock.Mock(),
+                    scheduler_rpcapi=mock.Mock(), host='host1')
+
+        for i in range(3):
+            manager_create.get_flow(self.ctxt, volume_id=i,
+                                    allow_reschedule=bool(i),
+                                    reschedule_context=self.ctxt,
+                                    request_spec={'volume_id': i},
+                                    filter_properties={}, **deps)
+
+        flows = [call[0][0] for call in load_flow.call_args_list]
+        self.assertIsNot(flows[0], flows[1])
+        self.assertIs(flows[1], flows[2])
+        self.assertEqual(self.ctxt,
+                         load_flow.call_args[0][1]['reschedule_context'])
+
+    def test_flow_cache_evicts_least_recently_used(self):
+        cache = flow_utils.FlowCache(max_size=2)
+        cache.get('a', lambda: 'flow-a')
+        cache.get('b', lambda: 'flow-b')
+        # Using a makes b the least recently used.
+        self.assertEqual('flow-a', cache.get('a', lambda: 'new-a'))
+        cache.get('c', lambda: 'flow-c')
+        self.assertEqual('flow-a', cache.get('a', lambda: 'new-a'))
+        self.assertEqual('new-b', cache.get('b', lambda: 'new-b'))
+
+    @mock.patch.object(flow_utils.LOG, 'debug')
+    def test_task_timer(self, log_debug):
+        engine = mock.Mock()
+        flow_utils.TaskTimer(engine)
+        callbacks = dict((call[0][0], call[0][1]) for call
+                         in engine.task_notifier.register.call_args_list)
+
+        details = {'task_name': 'task1', 'task_uuid': 'uuid1',
+                   'result': None}
+        callbacks[states.RUNNING](states.RUNNING, details=details)
+        callbacks[states.SUCCESS](states.SUCCESS, details=details)
+
+        self.assertEqual(1, log_debug.call_count)
+        timing = log_debug.call_args[0][1]
+        self.assertEqual('task1', timing['task'])
+        self.assertEqual(1.0, timing['seconds'])
+
     def tearDown(self):
         self.stubs.UnsetAll()
         super(CreateVolumeFlowTestCase, self).tearDown()
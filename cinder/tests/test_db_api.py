@@ -16,11 +16,14 @@
 
 import datetime
 
+import mock
 from oslo.config import cfg
 
 from cinder import context
 from cinder import db
+from cinder.db.sqlalchemy import api as sqlalchemy_api
 from cinder import exception
+from cinder.openstack.common import timeutils
 from cinder.openstack.common import uuidutils
 from cinder.quota import ReservableResource
 from cinder import test
@@ -149,6 +152,22 @@ class DBAPIServiceTestCase(BaseTest):
         self.assertRaises(exception.ServiceNotFound,
                           db.service_update, self.ctxt, 100500, {})
 
+    def test_service_heartbeat(self):
+        service1 = self._create_service({'report_count': 5})
+        service2 = self._create_service({'host': 'some_other_fake_host'})
+        self.assertEqual(2, db.service_heartbeat(
+            self.ctxt, [service1['id'], service2['id'], 100500],
+            {'availability_zone': 'zone1'}))
+        service1 = db.service_get(self.ctxt, service1['id'])
+        self.assertEqual(6, service1['report_count'])
+        self.assertEqual('zone1', service1['availability_zone'])
+        self.assertIsNotNone(service1['updated_at'])
+        self.assertEqual(
+            4, db.service_get(self.ctxt, service2['id'])['report_count'])
+
+    def test_service_heartbeat_not_found(self):
+        self.assertEqual(0, db.service_heartbeat(self.ctxt, [100500]))
+
     def test_service_get(self):
         service1 = self._create_service({})
         service2 = self._create_service({'host': 'some_other_fake_host'})
@@ -372,6 +391,46 @@ class DBAPIVolumeTestCase(BaseTest):
         self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
                                         self.ctxt, 2, 2, 'id', None))
 
+    def test_volume_get_all_marker_values_passed(self):
+        volumes = [db.volume_create(self.ctxt, {'id': i})
+                   for i in xrange(1, 5)]
+        marker = [volumes[1]['id'], volumes[1]['created_at'],
+                  volumes[1]['id']]
+
+        self.mox.StubOutWithMock(sqlalchemy_api, '_volume_get')
+        self.mox.ReplayAll()
+        self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
+                                        self.ctxt, marker, 2, 'id', 'asc'))
+        # created_at may be given as a string, as decoded from a cursor
+        marker[1] = timeutils.strtime(marker[1])
+        self._assertEqualListsOfObjects(volumes[2:3], db.volume_get_all(
+                                        self.ctxt, marker, 1, 'id', 'asc'))
+
+    def test_volume_get_all_columns(self):
+        volumes = [db.volume_create(self.ctxt, {'host': 'h%d' % i,
+                                                'display_name': 'v%d' % i,
+                                                'project_id': 'project1'})
+                   for i in xrange(3)]
+        result = db.volume_get_all(self.ctxt, None, None, 'host', 'asc',
+                                   filters={'host': ['h1', 'h2']},
+                                   columns=('id', 'display_name'))
+        self.assertEqual([{'id': vol['id'],
+                           'display_name': vol['display_name'],
+                           'host': vol['host'],
+                           'created_at': vol['created_at']}
+                          for vol in volumes[1:]], result)
+        result = db.volume_get_all_by_project(self.ctxt, 'project1', None,
+                                              None, 'host', 'asc',
+                                              columns=('display_name',))
+        self.assertEqual(['v0', 'v1', 'v2'],
+                         [vol['display_name'] for vol in result])
+
+    def test_volume_get_all_columns_invalid_sort_key(self):
+        exc = self.assertRaises(exception.InvalidInput, db.volume_get_all,
+                                self.ctxt, None, None, 'foo', 'asc',
+                                columns=('id',))
+        self.assertIn('Invalid sort key: foo', unicode(exc))
+
     def test_volume_get_all_by_host(self):
         volumes = []
         for i in xrange(3):
@@ -739,6 +798,31 @@ class DBAPISnapshotTestCase(BaseTest):
                                         db.snapshot_get_all(self.ctxt),
                                         ignored_keys=['metadata', 'volume'])
 
+    def test_snapshot_get_all_by_project_paginated(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        snapshots = [db.snapshot_create(self.ctxt,
+                                        {'id': i, 'volume_id': 1,
+                                         'project_id': 'project1',
+                                         'status': ('available',
+                                                    'error')[i % 2]})
+                     for i in xrange(1, 7)]
+        available = [snapshots[i - 1] for i in (6, 4, 2)]
+
+        page = db.snapshot_get_all_by_project(self.ctxt, 'project1',
+                                              filters={'status': 'available'},
+                                              limit=2, sort_key='id')
+        self._assertEqualListsOfObjects(available[:2], page,
+                                        ignored_keys=['metadata', 'volume'])
+        cursor = [page[-1]['id'], page[-1]['created_at'], page[-1]['id']]
+        page = db.snapshot_get_all_by_project(self.ctxt, 'project1',
+                                              filters={'status': 'available'},
+                                              limit=2, sort_key='id',
+                                              cursor=cursor)
+        self._assertEqualListsOfObjects(available[2:], page,
+                                        ignored_keys=['metadata', 'volume'])
+        self.assertEqual([], db.snapshot_get_all_by_project(
+            self.ctxt, 'project1', filters={'volume': 1}, limit=2))
+
     def test_snapshot_metadata_get(self):
         metadata = {'a': 'b', 'c': 'd'}
         db.volume_create(self.ctxt, {'id': 1})
@@ -1022,6 +1106,137 @@ class DBAPIReservationTestCase(BaseTest):
         self.assertEqual(expected, db.reservation_get_all_by_project(
             self.ctxt, 'project1'))
 
+    def _reserve_many(self, count, expire):
+        resources = {'volumes': ReservableResource('volumes',
+                                                   '_sync_volumes')}
+        reservations = []
+        for i in range(count):
+            reservations += db.quota_reserve(self.ctxt, resources,
+                                             {'volumes': 100},
+                                             {'volumes': 1}, expire, 0, 0,
+                                             project_id='project1')
+        return reservations
+
+    def test_reservation_expire_batches(self):
+        self.flags(quota_reservation_batch_size=2)
+        self._reserve_many(5, datetime.datetime.utcnow())
+        live = self._reserve_many(
+            1, datetime.datetime.utcnow() + datetime.timedelta(days=1))
+
+        self.assertEqual(5, db.reservation_expire(self.ctxt))
+
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 1, 'in_use': 0}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        self.assertEqual({'project_id': 'project1',
+                          'volumes': {live[0]: 1}},
+                         db.reservation_get_all_by_project(self.ctxt,
+                                                           'project1'))
+        self.assertEqual(0, db.reservation_expire(self.ctxt))
+
+    def test_reservation_expire_locks_usages_first(self):
+        self._reserve_many(2, datetime.datetime.utcnow())
+        # Usages are locked before the reservations, as by commit and
+        # rollback.
+        with mock.patch.object(sqlalchemy_api, '_get_quota_usages',
+                               wraps=sqlalchemy_api._get_quota_usages) as \
+                mock_get_quota_usages:
+            self.assertEqual(2, db.reservation_expire(self.ctxt))
+        self.assertEqual(1, mock_get_quota_usages.call_count)
+        self.assertEqual('project1', mock_get_quota_usages.call_args[0][2])
+
+    def test_reservation_commit_single_transaction(self):
+        self.flags(quota_reservation_batch_size=2)
+        reservations = self._reserve_many(
+            5, datetime.datetime.utcnow() + datetime.timedelta(days=1))
+
+        # Unlike expiry, commit and rollback are not split in batches.
+        with mock.patch.object(sqlalchemy_api, '_reservations_release',
+                               wraps=sqlalchemy_api._reservations_release) \
+                as mock_release:
+            db.reservation_commit(self.ctxt, reservations[:3], 'project1')
+            db.reservation_rollback(self.ctxt, reservations[3:], 'project1')
+        self.assertEqual([3, 2], [len(call[0][2]) for call in
+                                  mock_release.call_args_list])
+
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 3}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        self.assertEqual({'project_id': 'project1'},
+                         db.reservation_get_all_by_project(self.ctxt,
+                                                           'project1'))
+
+    def _optimistic_reserve(self, deltas, quotas):
+        resources = dict((r, ReservableResource(r, '_sync_%s' % r))
+                         for r in deltas)
+        expire = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+        return db.quota_reserve_optimistic(self.ctxt, resources, quotas,
+                                           deltas, expire, 0, 0,
+                                           project_id='project1')
+
+    def test_quota_reserve_optimistic_creates_usages(self):
+        quotas = {'volumes': 5, 'gigabytes': 10}
+        reservations = self._optimistic_reserve(
+            {'volumes': 1, 'gigabytes': 2}, quotas)
+        self.assertEqual(2, len(reservations))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 1, 'in_use': 0},
+                    'gigabytes': {'reserved': 2, 'in_use': 0}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+    def test_quota_reserve_optimistic(self):
+        quotas = {'volumes': 5, 'gigabytes': 10}
+        deltas = {'volumes': 1, 'gigabytes': 2}
+        db.reservation_commit(self.ctxt,
+                              self._optimistic_reserve(deltas, quotas),
+                              'project1')
+        with mock.patch.object(sqlalchemy_api, 'quota_reserve') as locked:
+            reservations = self._optimistic_reserve(
+                {'volumes': 3, 'gigabytes': -1}, quotas)
+            self.assertFalse(locked.called)
+        self.assertEqual(2, len(reservations))
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 3, 'in_use': 1},
+                    'gigabytes': {'reserved': 0, 'in_use': 2}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 4},
+                    'gigabytes': {'reserved': 0, 'in_use': 1}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+    def test_quota_reserve_optimistic_over_quota(self):
+        quotas = {'volumes': 5, 'gigabytes': 10}
+        db.reservation_commit(self.ctxt,
+                              self._optimistic_reserve(
+                                  {'volumes': 4, 'gigabytes': 2}, quotas),
+                              'project1')
+        self.assertRaises(exception.OverQuota,
+                          self._optimistic_reserve,
+                          {'volumes': 2, 'gigabytes': 2}, quotas)
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 0, 'in_use': 4},
+                    'gigabytes': {'reserved': 0, 'in_use': 2}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+        self.assertEqual({'project_id': 'project1'},
+                         db.reservation_get_all_by_project(self.ctxt,
+                                                           'project1'))
+
+    def test_quota_reserve_optimistic_unlimited(self):
+        quotas = {'volumes': -1}
+        self._optimistic_reserve({'volumes': 1}, quotas)
+        self._optimistic_reserve({'volumes': 100}, quotas)
+        expected = {'project_id': 'project1',
+                    'volumes': {'reserved': 101, 'in_use': 0}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
 
 class DBAPIQuotaClassTestCase(BaseTest):
 
@@ -1226,7 +1441,8 @@ class DBAPIBackupTestCase(BaseTest):
             'service_metadata': 'metadata',
             'service': 'service',
             'size': 1000,
-            'object_count': 100}
+            'object_count': 100,
+            'parent_id': 'parent'}
         if one:
             return base_values
 
@@ -1263,6 +1479,23 @@ class DBAPIBackupTestCase(BaseTest):
                                               self.created[1]['project_id'])
         self._assertEqualObjects(self.created[1], byproj[0])
 
+    def test_backup_get_all_paginated(self):
+        by_size = sorted(self.created, key=lambda b: b['size'])
+        page = db.backup_get_all(self.ctxt, limit=2, sort_key='size',
+                                 sort_dir='asc')
+        self._assertEqualListsOfObjects(by_size[:2], page)
+        cursor = [page[-1]['size'], page[-1]['created_at'], page[-1]['id']]
+        page = db.backup_get_all(self.ctxt, limit=2, sort_key='size',
+                                 sort_dir='asc', cursor=cursor)
+        self._assertEqualListsOfObjects(by_size[2:], page)
+
+    def test_backup_get_all_filtered(self):
+        self._assertEqualListsOfObjects(
+            [self.created[0]],
+            db.backup_get_all(self.ctxt, filters={'host': 'host1'}))
+        self.assertEqual([], db.backup_get_all(self.ctxt,
+                                               filters={'nonexistent': 1}))
+
     def test_backup_update_nonexistent(self):
         self.assertRaises(exception.BackupNotFound,
                           db.backup_update,
@@ -1276,6 +1509,38 @@ class DBAPIBackupTestCase(BaseTest):
         self._assertEqualObjects(updated_values, updated_backup,
                                  self._ignored_keys)
 
+    def test_backup_mark_deleting(self):
+        parent, child, other = self.created
+        db.backup_update(self.ctxt, parent['id'], {'status': 'available'})
+        db.backup_update(self.ctxt, child['id'],
+                         {'status': 'creating', 'parent_id': parent['id']})
+        self.assertRaises(exception.InvalidBackup,
+                          db.backup_mark_deleting, self.ctxt, parent['id'])
+        self.assertRaises(exception.InvalidBackup,
+                          db.backup_mark_deleting, self.ctxt, child['id'])
+        self.assertRaises(exception.BackupNotFound,
+                          db.backup_mark_deleting, self.ctxt, 'nonexistent')
+
+        # Failed incremental backups do not keep their parent.
+        db.backup_update(self.ctxt, child['id'], {'status': 'error'})
+        db.backup_mark_deleting(self.ctxt, parent['id'])
+        self.assertEqual('deleting',
+                         db.backup_get(self.ctxt, parent['id'])['status'])
+
+    def test_backup_set_parent(self):
+        parent, child, other = self.created
+        db.backup_update(self.ctxt, parent['id'], {'status': 'available'})
+        self.assertTrue(db.backup_set_parent(self.ctxt, child['id'],
+                                             parent['id']))
+        self.assertEqual(parent['id'],
+                         db.backup_get(self.ctxt, child['id'])['parent_id'])
+
+        db.backup_update(self.ctxt, parent['id'], {'status': 'deleting'})
+        self.assertFalse(db.backup_set_parent(self.ctxt, other['id'],
+                                              parent['id']))
+        self.assertEqual('parent3',
+                         db.backup_get(self.ctxt, other['id'])['parent_id'])
+
     def test_backup_destroy(self):
         for backup in self.created:
             db.backup_destroy(self.ctxt, backup['id'])
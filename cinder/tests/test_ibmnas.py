@@ -28,6 +28,7 @@ from cinder import context
 from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder import test
+from cinder import units
 from cinder.volume import configuration as conf
 from cinder.volume.drivers.ibm import ibmnas
 
@@ -382,3 +383,42 @@ class IBMNASDriverTestCase(test.TestCase):
                          drv._set_rw_permissions_for_all().
                          drv._resize_volume_file().
                          drv.create_volume_from_snapshot(snapshot))
+
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_delete_snapfiles')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_resize_volume_file')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_set_rw_permissions_for_all')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_create_ibmnas_copy')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_get_export_path')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, 'local_path')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_do_create_volume')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_find_share')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_ensure_shares_mounted')
+    @mock.patch.object(ibmnas.IBMNAS_NFSDriver, '_get_capacity_info')
+    def test_share_allocation_ledger(self, mock_get_capacity_info,
+                                     mock_ensure_shares_mounted,
+                                     mock_find_share, *args):
+        """Create, clone and delete keep the share allocation balanced."""
+
+        drv = self._driver
+        mock_get_capacity_info.return_value = (10 * units.GiB,
+                                               8 * units.GiB, 0)
+        mock_find_share.return_value = self.TEST_NFS_EXPORT
+
+        def _allocated():
+            return drv._get_share_capacity_info(self.TEST_NFS_EXPORT)[2]
+
+        volume = {'id': '123', 'name': 'volume-123',
+                  'size': self.TEST_SIZE_IN_GB, 'provider_location': None}
+        clone = {'id': '456', 'name': 'volume-456',
+                 'size': self.TEST_EXTEND_SIZE_IN_GB,
+                 'provider_location': None}
+
+        self.assertEqual(0, _allocated())
+        drv.create_volume(volume)
+        drv.create_cloned_volume(clone, volume)
+        self.assertEqual(3 * units.GiB, _allocated())
+
+        drv.delete_volume(clone)
+        drv.delete_volume(volume)
+        self.assertEqual(0, _allocated())
+        self.assertEqual(1, mock_get_capacity_info.call_count)
@@ -16,7 +16,9 @@
 """Unit tests for image utils."""
 
 import contextlib
+import hashlib
 import mox
+import os
 import tempfile
 
 from cinder import context
@@ -45,6 +47,22 @@ class FakeImageService:
         pass
 
 
+class FakeRawImageService(FakeImageService):
+    def __init__(self, data, checksum=None):
+        self._data = data
+        self._checksum = checksum or hashlib.md5(data).hexdigest()
+
+    def download(self, context, image_id, data):
+        for i in range(0, len(self._data), 100):
+            data.write(self._data[i:i + 100])
+
+    def show(self, context, image_id):
+        return {'size': len(self._data),
+                'disk_format': 'raw',
+                'container_format': 'bare',
+                'checksum': self._checksum}
+
+
 class TestUtils(test.TestCase):
     TEST_IMAGE_ID = 321
     TEST_DEV_PATH = "/dev/ether/fake_dev"
@@ -451,6 +469,61 @@ class TestUtils(test.TestCase):
         m.VerifyAll()
 
 
+class TestStreamRawToVolume(test.TestCase):
+    TEST_IMAGE_ID = 321
+
+    def setUp(self):
+        super(TestStreamRawToVolume, self).setUp()
+        fd, self.dest = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, self.dest)
+        self.data = os.urandom(1000)
+        # qemu-img is not needed for raw images.
+        self.mox.StubOutWithMock(utils, 'execute')
+        self.mox.ReplayAll()
+
+    def _read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_fetch_to_raw_streams_raw_image(self):
+        image_utils.fetch_to_raw(context, FakeRawImageService(self.data),
+                                 self.TEST_IMAGE_ID, self.dest,
+                                 mox.IgnoreArg(), size=1)
+        self.assertEqual(self.data, self._read_dest())
+
+    def test_stream_raw_to_volume_small_image(self):
+        image_service = FakeRawImageService('x')
+        self.assertTrue(image_utils.stream_raw_to_volume(
+            context, image_service, self.TEST_IMAGE_ID,
+            image_service.show(context, self.TEST_IMAGE_ID), self.dest))
+        self.assertEqual('x', self._read_dest())
+
+    def test_stream_raw_to_volume_checksum_mismatch(self):
+        image_service = FakeRawImageService(self.data, checksum='bad')
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils.stream_raw_to_volume,
+                          context, image_service, self.TEST_IMAGE_ID,
+                          image_service.show(context, self.TEST_IMAGE_ID),
+                          self.dest)
+
+    def test_stream_raw_to_volume_not_raw(self):
+        image_service = FakeRawImageService('QFI\xfb' + self.data)
+        self.assertFalse(image_utils.stream_raw_to_volume(
+            context, image_service, self.TEST_IMAGE_ID,
+            image_service.show(context, self.TEST_IMAGE_ID), self.dest))
+        self.assertEqual('', self._read_dest())
+
+    def test_stream_raw_to_volume_too_large(self):
+        image_service = FakeRawImageService(self.data)
+        image_meta = dict(image_service.show(context, self.TEST_IMAGE_ID),
+                          size=2 * units.GiB)
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils.stream_raw_to_volume,
+                          context, image_service, self.TEST_IMAGE_ID,
+                          image_meta, self.dest, size=1)
+
+
 class TestExtractTo(test.TestCase):
     def test_extract_to_calls_tar(self):
         mox = self.mox
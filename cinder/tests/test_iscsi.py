@@ -18,6 +18,7 @@ import shutil
 import string
 import tempfile
 
+from cinder.brick import exception
 from cinder.brick.iscsi import iscsi
 from cinder import test
 from cinder.volume import driver
@@ -125,6 +126,81 @@ class TgtAdmTestCase(test.TestCase, TargetAdminTestCase):
             pass
         super(TgtAdmTestCase, self).tearDown()
 
+    def test_create_iscsi_targets(self):
+        show = "\n".join([
+            'Target 1: iqn.2011-09.org.foo.bar:volume-a',
+            '    LUN information:',
+            '        LUN: 0',
+            '        LUN: 1',
+            'Target 2: iqn.2011-09.org.foo.bar:volume-b',
+            '    LUN information:',
+            '        LUN: 0'])
+
+        def fake_execute(*cmd, **kwargs):
+            self.cmds.append(string.join(cmd))
+            return show, None
+
+        target_helper = self.driver.get_target_helper(self.db)
+        target_helper.set_execute(fake_execute)
+        targets = [('iqn.2011-09.org.foo.bar:volume-a', '/dev/a', None, None),
+                   ('iqn.2011-09.org.foo.bar:volume-b', '/dev/b', None, None),
+                   ('iqn.2011-09.org.foo.bar:volume-c', '/dev/c', None, None)]
+        failed = target_helper.create_iscsi_targets(targets)
+
+        self.assertEqual(targets[1:], failed)
+        self.assertEqual(['tgt-admin --update ALL', 'tgt-admin --show'],
+                         self.cmds)
+        for name in ('volume-a', 'volume-b', 'volume-c'):
+            self.assertTrue(os.path.exists(os.path.join(self.persist_tempdir,
+                                                        name)))
+
+    def test_create_iscsi_targets_removes_old_persist_files(self):
+        def fake_execute(*cmd, **kwargs):
+            self.cmds.append(string.join(cmd))
+            return "", None
+
+        def fake_unlink(path):
+            self.cmds.append('unlink %s' % path)
+
+        old_persist_file = os.path.join(self.persist_tempdir, 'old-a')
+        open(old_persist_file, 'w').close()
+        self.stubs.Set(os, 'unlink', fake_unlink)
+        target_helper = self.driver.get_target_helper(self.db)
+        target_helper.set_execute(fake_execute)
+        target_helper.create_iscsi_targets(
+            [('iqn.2011-09.org.foo.bar:volume-a', '/dev/a', None, 'old-a')])
+
+        # The update must not see the target of the old name.
+        self.assertEqual(['unlink %s' % old_persist_file,
+                          'tgt-admin --update ALL', 'tgt-admin --show'],
+                         self.cmds)
+
+    def test_ensure_exports_retries_failed_targets(self):
+        target_helper = self.driver.get_target_helper(self.db)
+        volumes = [{'id': 'a', 'name': 'volume-a', 'provider_location': None,
+                    'status': 'in-use'},
+                   {'id': 'b', 'name': 'volume-b', 'provider_location': None,
+                    'status': 'in-use'}]
+        exports = [(volume, 'iqn.2011-09.org.foo.bar:' + volume['name'],
+                    '/dev/' + volume['name']) for volume in volumes]
+        self.stubs.Set(target_helper, '_get_target_for_ensure_export',
+                       lambda context, volume_id: 1)
+        self.stubs.Set(target_helper, 'create_iscsi_targets',
+                       lambda targets: targets[1:])
+        created = []
+
+        def fake_create_iscsi_target(name, tid, lun, path, chap_auth,
+                                     **kwargs):
+            created.append(name)
+            raise exception.ISCSITargetCreateFailed(volume_id='b')
+
+        self.stubs.Set(target_helper, 'create_iscsi_target',
+                       fake_create_iscsi_target)
+        failed = target_helper.ensure_exports(None, exports, workers=4)
+
+        self.assertEqual(['iqn.2011-09.org.foo.bar:volume-b'], created)
+        self.assertEqual(['b'], failed.keys())
+
 
 class IetAdmTestCase(test.TestCase, TargetAdminTestCase):
 
@@ -1074,3 +1074,52 @@ class TestMigrations(test.TestCase):
                                         metadata,
                                         autoload=True)
             self.assertNotIn('disabled_reason', services.c)
+
+    def test_migration_023(self):
+        """Test that adding the pagination indexes works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 22)
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 23)
+            inspector = sqlalchemy.inspect(engine)
+            for table in ('volumes', 'snapshots', 'backups'):
+                indexes = [index['name']
+                           for index in inspector.get_indexes(table)]
+                self.assertIn('%s_project_created_at_idx' % table, indexes)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 22)
+            inspector = sqlalchemy.inspect(engine)
+            for table in ('volumes', 'snapshots', 'backups'):
+                indexes = [index['name']
+                           for index in inspector.get_indexes(table)]
+                self.assertNotIn('%s_project_created_at_idx' % table,
+                                 indexes)
+
+    def test_migration_024(self):
+        """Test that adding parent_id column to backups works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 23)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 24)
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertIsInstance(backups.c.parent_id.type,
+                                  sqlalchemy.types.VARCHAR)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 23)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertNotIn('parent_id', backups.c)
@@ -713,6 +713,7 @@ class TestNexentaNfsDriver(test.TestCase):
         self.drv.delete_volume({
             'id': '1',
             'name': 'volume-1',
+            'size': 1,
             'provider_location': self.TEST_EXPORT1
         })
         self.mox.ResetAll()
@@ -728,6 +729,7 @@ class TestNexentaNfsDriver(test.TestCase):
         self.drv.delete_volume({
             'id': '1',
             'name': 'volume-1',
+            'size': 1,
             'provider_location': self.TEST_EXPORT1
         })
         self.mox.ResetAll()
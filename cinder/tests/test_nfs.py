@@ -18,6 +18,7 @@
 import errno
 import os
 
+import eventlet
 import mock
 import mox as mox_lib
 from mox import IgnoreArg
@@ -135,6 +136,7 @@ class NfsDriverTestCase(test.TestCase):
         self.configuration.nfs_oversub_ratio = 1.0
         self.configuration.nfs_mount_point_base = self.TEST_MNT_POINT_BASE
         self.configuration.nfs_mount_options = None
+        self.configuration.nfs_capacity_reconcile_interval = 600
         self.configuration.volume_dd_blocksize = '1M'
         self._driver = nfs.NfsDriver(configuration=self.configuration)
         self._driver.shares = {}
@@ -410,27 +412,108 @@ class NfsDriverTestCase(test.TestCase):
 
         drv._mounted_shares = [self.TEST_NFS_EXPORT1, self.TEST_NFS_EXPORT2]
 
+        # Each share is scanned once, later lookups use the ledger.
         mox.StubOutWithMock(drv, '_get_capacity_info')
-        drv._get_capacity_info(self.TEST_NFS_EXPORT1).\
-            AndReturn((5 * units.GiB, 2 * units.GiB,
-                       2 * units.GiB))
         drv._get_capacity_info(self.TEST_NFS_EXPORT1).\
             AndReturn((5 * units.GiB, 2 * units.GiB,
                        2 * units.GiB))
         drv._get_capacity_info(self.TEST_NFS_EXPORT2).\
             AndReturn((10 * units.GiB, 3 * units.GiB,
                        1 * units.GiB))
-        drv._get_capacity_info(self.TEST_NFS_EXPORT2).\
-            AndReturn((10 * units.GiB, 3 * units.GiB,
-                       1 * units.GiB))
 
         mox.ReplayAll()
 
         self.assertEqual(self.TEST_NFS_EXPORT2,
                          drv._find_share(self.TEST_SIZE_IN_GB))
 
+        # Volumes allocated on a share count towards its allocation.
+        drv._update_share_allocation(self.TEST_NFS_EXPORT2, 2)
+        self.assertEqual(self.TEST_NFS_EXPORT1,
+                         drv._find_share(self.TEST_SIZE_IN_GB))
+
         mox.VerifyAll()
 
+    def test_share_capacity_ledger(self):
+        """Allocations are tracked without rescanning the share."""
+        drv = self._driver
+
+        with mock.patch.object(drv, '_get_capacity_info') as \
+                mock_get_capacity_info:
+            mock_get_capacity_info.return_value = (10 * units.GiB,
+                                                   8 * units.GiB,
+                                                   1 * units.GiB)
+
+            drv._update_share_allocation(self.TEST_NFS_EXPORT1, 1)
+            self.assertEqual((10 * units.GiB, 8 * units.GiB, 1 * units.GiB),
+                             drv._get_share_capacity_info(
+                                 self.TEST_NFS_EXPORT1))
+
+            drv._update_share_allocation(self.TEST_NFS_EXPORT1, 3)
+            drv._update_share_allocation(self.TEST_NFS_EXPORT1, 2,
+                                         sparse=False)
+            drv._update_share_allocation(self.TEST_NFS_EXPORT1, -1)
+            self.assertEqual((10 * units.GiB, 6 * units.GiB, 5 * units.GiB),
+                             drv._get_share_capacity_info(
+                                 self.TEST_NFS_EXPORT1))
+            self.assertEqual(1, mock_get_capacity_info.call_count)
+
+    def test_share_capacity_first_scan(self):
+        """Concurrent first lookups of a share scan it once."""
+        drv = self._driver
+
+        def _get_capacity_info(nfs_share):
+            eventlet.sleep(0)
+            return 10 * units.GiB, 8 * units.GiB, 1 * units.GiB
+
+        with mock.patch.object(drv, '_get_capacity_info') as \
+                mock_get_capacity_info:
+            mock_get_capacity_info.side_effect = _get_capacity_info
+            threads = [eventlet.spawn(drv._get_share_capacity_info,
+                                      self.TEST_NFS_EXPORT1)
+                       for _i in range(2)]
+            for thread in threads:
+                self.assertEqual(
+                    (10 * units.GiB, 8 * units.GiB, 1 * units.GiB),
+                    thread.wait())
+            self.assertEqual(1, mock_get_capacity_info.call_count)
+
+    @mock.patch('eventlet.spawn_n')
+    @mock.patch('time.time')
+    def test_share_capacity_reconcile(self, mock_time, mock_spawn_n):
+        """The ledger is rescanned in the background once it is stale."""
+        drv = self._driver
+        mock_time.return_value = 1000
+
+        with mock.patch.object(drv, '_get_capacity_info') as \
+                mock_get_capacity_info:
+            mock_get_capacity_info.return_value = (10 * units.GiB,
+                                                   8 * units.GiB,
+                                                   1 * units.GiB)
+            drv._get_share_capacity_info(self.TEST_NFS_EXPORT1)
+
+            mock_time.return_value += 601
+            drv._get_share_capacity_info(self.TEST_NFS_EXPORT1)
+            drv._get_share_capacity_info(self.TEST_NFS_EXPORT1)
+            mock_spawn_n.assert_called_once_with(
+                drv._reconcile_share_capacity, self.TEST_NFS_EXPORT1)
+
+            # Allocations made during the scan are added to its result.
+            drv._update_share_allocation(self.TEST_NFS_EXPORT1, 1)
+            mock_get_capacity_info.return_value = (10 * units.GiB,
+                                                   7 * units.GiB,
+                                                   3 * units.GiB)
+            drv._reconcile_share_capacity(self.TEST_NFS_EXPORT1)
+            self.assertEqual((10 * units.GiB, 7 * units.GiB, 4 * units.GiB),
+                             drv._get_share_capacity_info(
+                                 self.TEST_NFS_EXPORT1))
+
+            # A failed rescan keeps the previous values.
+            mock_get_capacity_info.side_effect = Exception()
+            drv._reconcile_share_capacity(self.TEST_NFS_EXPORT1)
+            self.assertEqual((10 * units.GiB, 7 * units.GiB, 4 * units.GiB),
+                             drv._get_share_capacity_info(
+                                 self.TEST_NFS_EXPORT1))
+
     def test_find_share_should_throw_error_if_there_is_no_enough_place(self):
         """_find_share should throw error if there is no share to host vol."""
         mox = self._mox
@@ -1071,6 +1071,29 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual(self.calls, [('quota_destroy_all_by_project',
                                       ('test_project')), ])
 
+    def test_optimistic_driver_reserve(self):
+        self.driver = quota.OptimisticDbQuotaDriver()
+        self._stub_get_project_quotas()
+        self._stub_quota_reserve()
+
+        def fake_quota_reserve_optimistic(context, resources, quotas, deltas,
+                                          expire, until_refresh, max_age,
+                                          project_id=None):
+            self.calls.append(('quota_reserve_optimistic', expire,
+                               until_refresh, max_age))
+            return ['resv-1']
+        self.stubs.Set(db, 'quota_reserve_optimistic',
+                       fake_quota_reserve_optimistic)
+        result = self.driver.reserve(FakeContext('test_project', 'test_class'),
+                                     quota.QUOTAS.resources,
+                                     dict(volumes=2))
+
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=86400)
+        self.assertEqual(self.calls, ['get_project_quotas',
+                                      ('quota_reserve_optimistic',
+                                       expire, 0, 0), ])
+        self.assertEqual(result, ['resv-1'])
+
 
 class FakeSession(object):
     def begin(self):
@@ -143,6 +143,8 @@ class RBDTestCase(test.TestCase):
         self.cfg.rbd_ceph_conf = None
         self.cfg.rbd_secret_uuid = None
         self.cfg.rbd_user = None
+        self.cfg.rbd_connection_pool_size = 4
+        self.cfg.rbd_connection_pool_idle_timeout = 300
         self.cfg.volume_dd_blocksize = '1M'
 
         mock_exec = mock.Mock()
@@ -723,6 +725,126 @@ class RBDTestCase(test.TestCase):
         self.mock_rados.Rados.open_ioctx.assert_called_once()
         self.mock_rados.Rados.shutdown.assert_called_once()
 
+    @common_mocks
+    def test_connect_to_rados_pooled(self):
+        self.mock_rados.Rados.connect = mock.Mock()
+        self.mock_rados.Rados.shutdown = mock.Mock()
+        self.mock_rados.Rados.open_ioctx = mock.Mock()
+        self.mock_rados.Rados.state = 'connected'
+
+        client, ioctx = self.driver._connect_to_rados()
+        self.driver._disconnect_from_rados(client, ioctx)
+        client2, ioctx2 = self.driver._connect_to_rados()
+        self.driver._disconnect_from_rados(client2, ioctx2)
+
+        self.assertIs(client, client2)
+        self.assertEqual(1, self.mock_rados.Rados.connect.call_count)
+        self.assertEqual(1, self.mock_rados.Rados.open_ioctx.call_count)
+        self.assertFalse(self.mock_rados.Rados.shutdown.called)
+
+    @common_mocks
+    def test_connect_to_rados_unpooled(self):
+        self.cfg.rbd_connection_pool_size = 0
+        self.mock_rados.Rados.connect = mock.Mock()
+        self.mock_rados.Rados.shutdown = mock.Mock()
+        self.mock_rados.Rados.open_ioctx = mock.Mock()
+        self.mock_rados.Rados.state = 'connected'
+
+        for _i in range(2):
+            client, ioctx = self.driver._connect_to_rados()
+            self.driver._disconnect_from_rados(client, ioctx)
+
+        self.assertEqual(2, self.mock_rados.Rados.connect.call_count)
+        self.assertEqual(2, self.mock_rados.Rados.shutdown.call_count)
+
+
+class FakeRados(object):
+    """Minimal stand-in for rados.Rados used by the connection pool tests."""
+
+    def __init__(self):
+        self.state = 'connected'
+        self.ioctxs = []
+
+    def open_ioctx(self, pool):
+        if pool == 'missing':
+            raise MockException()
+        ioctx = mock.Mock(pool=pool)
+        self.ioctxs.append(ioctx)
+        return ioctx
+
+    def shutdown(self):
+        self.state = 'shutdown'
+
+
+class RADOSConnectionPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RADOSConnectionPoolTestCase, self).setUp()
+        self.clients = []
+        self.pool = driver.RADOSConnectionPool(self._connect, 2, 300)
+
+    def _connect(self):
+        self.clients.append(FakeRados())
+        return self.clients[-1]
+
+    def test_reuse(self):
+        client, ioctx = self.pool.get('rbd')
+        self.pool.put(client)
+        client2, ioctx2 = self.pool.get('rbd')
+        self.pool.put(client2)
+        client3, ioctx3 = self.pool.get('other')
+        self.assertEqual(1, len(self.clients))
+        self.assertIs(client, client2)
+        self.assertIs(ioctx, ioctx2)
+        self.assertEqual('other', ioctx3.pool)
+        self.assertEqual(2, len(client.ioctxs))
+
+    def test_shared_when_full(self):
+        client1, _ioctx = self.pool.get('rbd')
+        client2, _ioctx = self.pool.get('rbd')
+        client3, _ioctx = self.pool.get('rbd')
+        self.assertEqual(2, len(self.clients))
+        self.assertIsNot(client1, client2)
+        self.assertIn(client3, (client1, client2))
+
+    @mock.patch('time.time')
+    def test_idle_timeout(self, mock_time):
+        mock_time.return_value = 1000
+        client, ioctx = self.pool.get('rbd')
+        self.pool.put(client)
+
+        mock_time.return_value += 301
+        client2, _ioctx = self.pool.get('rbd')
+        self.assertIsNot(client, client2)
+        self.assertEqual('shutdown', client.state)
+        self.assertTrue(ioctx.close.called)
+
+    def test_unusable_connection_replaced(self):
+        client, _ioctx = self.pool.get('rbd')
+        self.pool.put(client)
+        client.state = 'shutdown'
+        client2, _ioctx = self.pool.get('rbd')
+        self.assertIsNot(client, client2)
+
+    def test_open_ioctx_error(self):
+        self.pool = driver.RADOSConnectionPool(self._connect, 1, 300)
+        client, _ioctx = self.pool.get('rbd')
+        self.assertRaises(MockException, self.pool.get, 'missing')
+
+        # The connection is closed once its other user gives it back.
+        self.assertEqual('connected', client.state)
+        self.pool.put(client)
+        self.assertEqual('shutdown', client.state)
+
+        client2, _ioctx = self.pool.get('rbd')
+        self.assertIsNot(client, client2)
+
+    def test_close(self):
+        client, _ioctx = self.pool.get('rbd')
+        self.pool.put(client)
+        self.pool.close()
+        self.assertEqual('shutdown', client.state)
+
 
 class RBDImageIOWrapperTestCase(test.TestCase):
     def setUp(self):
@@ -84,6 +84,75 @@ class ServiceManagerTestCase(test.TestCase):
         self.assertEqual(serv.test_method(), 'service')
 
 
+class SchedulerDependentManagerTestCase(test.TestCase):
+    """Test capability reports sent to the schedulers."""
+
+    def setUp(self):
+        super(SchedulerDependentManagerTestCase, self).setUp()
+        self.flags(capabilities_full_report_interval=3)
+        self.context = context.get_admin_context()
+        self.manager = manager.SchedulerDependentManager(
+            host='fake_host', service_name='volume')
+        rpcapi = mock.Mock()
+        rpcapi.can_send_partial_capabilities.return_value = True
+        self.manager.scheduler_rpcapi = rpcapi
+        self.update = self.manager.scheduler_rpcapi.update_service_capabilities
+
+    def _publish(self, capabilities, full=False):
+        self.manager.update_service_capabilities(capabilities)
+        self.manager._publish_service_capabilities(self.context, full=full)
+        return self.update.call_args
+
+    def test_publish_partial(self):
+        capabilities = {'free_capacity_gb': 10, 'total_capacity_gb': 100,
+                        'volume_backend_name': 'fake_backend',
+                        'vendor_name': 'Open Source',
+                        'driver_version': '1.0', 'pools': [1, 2]}
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   capabilities),
+                         self._publish(capabilities))
+
+        # Drivers may change their stats in place.
+        capabilities['free_capacity_gb'] = 20
+        del capabilities['pools']
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   {'free_capacity_gb': 20}, seq=1,
+                                   full=False, removed=['pools']),
+                         self._publish(capabilities))
+        self.assertTrue(self.manager.capabilities_bytes_saved > 0)
+
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   {}, seq=2, full=False, removed=[]),
+                         self._publish(capabilities))
+        # Every capabilities_full_report_interval reports are full.
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   capabilities),
+                         self._publish(capabilities))
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   {}, seq=1, full=False, removed=[]),
+                         self._publish(capabilities))
+        self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                   capabilities),
+                         self._publish(capabilities, full=True))
+
+    def test_publish_old_schedulers(self):
+        can_send = self.manager.scheduler_rpcapi.can_send_partial_capabilities
+        can_send.return_value = False
+        capabilities = {'free_capacity_gb': 10}
+        for _i in range(2):
+            self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                       capabilities),
+                             self._publish(capabilities))
+
+    def test_publish_always_full(self):
+        self.flags(capabilities_full_report_interval=1)
+        capabilities = {'free_capacity_gb': 10}
+        for _i in range(2):
+            self.assertEqual(mock.call(self.context, 'volume', 'fake_host',
+                                       capabilities),
+                             self._publish(capabilities))
+
+
 class ServiceFlagsTestCase(test.TestCase):
     def test_service_enabled_on_create_based_on_flag(self):
         self.flags(enable_new_services=True)
@@ -147,8 +216,8 @@ class ServiceTestCase(test.TestCase):
                                        binary).AndRaise(exception.NotFound())
         service.db.service_create(mox.IgnoreArg(),
                                   service_create).AndReturn(service_ref)
-        service.db.service_get(mox.IgnoreArg(),
-                               mox.IgnoreArg()).AndRaise(Exception())
+        service.db.service_heartbeat(mox.IgnoreArg(), [1],
+                                     mox.IgnoreArg()).AndRaise(Exception())
 
         self.mox.ReplayAll()
         serv = service.Service(host,
@@ -180,10 +249,9 @@ class ServiceTestCase(test.TestCase):
                                        binary).AndRaise(exception.NotFound())
         service.db.service_create(mox.IgnoreArg(),
                                   service_create).AndReturn(service_ref)
-        service.db.service_get(mox.IgnoreArg(),
-                               service_ref['id']).AndReturn(service_ref)
-        service.db.service_update(mox.IgnoreArg(), service_ref['id'],
-                                  mox.ContainsKeyValue('report_count', 1))
+        service.db.service_heartbeat(mox.IgnoreArg(), [service_ref['id']],
+                                     {'availability_zone': 'nova'}).\
+            AndReturn(1)
 
         self.mox.ReplayAll()
         serv = service.Service(host,
@@ -196,6 +264,51 @@ class ServiceTestCase(test.TestCase):
 
         self.assertFalse(serv.model_disconnected)
 
+    def test_report_state_recreates_service(self):
+        service_ref = {'host': 'foo', 'binary': 'bar', 'topic': 'test',
+                       'report_count': 0, 'availability_zone': 'nova',
+                       'id': 1}
+        new_service_ref = dict(service_ref, id=2)
+
+        service.db.service_get_by_args(mox.IgnoreArg(), 'foo',
+                                       'bar').AndReturn(service_ref)
+        service.db.service_heartbeat(mox.IgnoreArg(), [1],
+                                     mox.IgnoreArg()).AndReturn(0)
+        service.db.service_create(mox.IgnoreArg(),
+                                  mox.IgnoreArg()).AndReturn(new_service_ref)
+        service.db.service_heartbeat(mox.IgnoreArg(), [2],
+                                     mox.IgnoreArg()).AndReturn(1)
+
+        self.mox.ReplayAll()
+        serv = service.Service('foo', 'bar', 'test',
+                               'cinder.tests.test_service.FakeManager')
+        serv.start()
+        serv.report_state()
+        self.assertEqual(2, serv.service_id)
+
+    def test_heartbeat_coalescer(self):
+        services = [mock.Mock(service_id=i, model_disconnected=True)
+                    for i in (1, 2)]
+        service.db.service_heartbeat(mox.IgnoreArg(), [1, 2],
+                                     {'availability_zone': 'nova'}).\
+            AndReturn(2)
+        service.db.service_heartbeat(mox.IgnoreArg(), [1, 2],
+                                     mox.IgnoreArg()).AndReturn(1)
+        service.db.service_get(mox.IgnoreArg(), 1)
+        service.db.service_get(mox.IgnoreArg(),
+                               2).AndRaise(exception.NotFound())
+        self.mox.ReplayAll()
+
+        coalescer = service.HeartbeatCoalescer()
+        coalescer.services = services
+        coalescer.report_state()
+        for serv in services:
+            serv._report_state_succeeded.assert_called_once_with()
+
+        coalescer.report_state()
+        self.assertEqual(2, services[0]._report_state_succeeded.call_count)
+        services[1].report_state.assert_called_once_with()
+
     def test_service_with_long_report_interval(self):
         CONF.set_override('service_down_time', 10)
         CONF.set_override('report_interval', 10)
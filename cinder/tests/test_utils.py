@@ -127,6 +127,57 @@ grep foo
             os.unlink(tmpfilename2)
 
 
+class ExecuteRootwrapDaemonTestCase(test.TestCase):
+    def setUp(self):
+        super(ExecuteRootwrapDaemonTestCase, self).setUp()
+        self.flags(use_rootwrap_daemon=True)
+        self.client = mock.Mock()
+        self.client.execute.return_value = (0, 'out', 'err')
+        self.stubs.Set(utils, '_get_rootwrap_client',
+                       lambda rootwrap_config: self.client)
+
+    def test_run_as_root(self):
+        self.assertEqual(('out', 'err'),
+                         utils.execute('lvs', '--noheadings', 1,
+                                       process_input='in', run_as_root=True))
+        self.client.execute.assert_called_once_with(
+            ['lvs', '--noheadings', '1'], 'in')
+
+    def test_not_run_as_root(self):
+        utils.execute('/usr/bin/env', 'true')
+        self.assertFalse(self.client.execute.called)
+
+    def test_other_root_helper(self):
+        self.mox.StubOutWithMock(putils, 'execute')
+        putils.execute('lvs', run_as_root=True, root_helper='sudo')
+        self.mox.ReplayAll()
+        utils.execute('lvs', run_as_root=True, root_helper='sudo')
+        self.assertFalse(self.client.execute.called)
+
+    def test_check_exit_code(self):
+        self.client.execute.return_value = (3, 'out', 'err')
+        self.assertRaises(putils.ProcessExecutionError,
+                          utils.execute, 'lvs', run_as_root=True)
+        self.assertEqual(('out', 'err'),
+                         utils.execute('lvs', run_as_root=True,
+                                       check_exit_code=[0, 3]))
+        self.assertEqual(('out', 'err'),
+                         utils.execute('lvs', run_as_root=True,
+                                       check_exit_code=False))
+
+    def test_retry_on_failure(self):
+        self.client.execute.side_effect = [(1, '', 'err'), (0, 'out', '')]
+        self.assertEqual(('out', ''),
+                         utils.execute('lvs', run_as_root=True, attempts=2,
+                                       delay_on_retry=False))
+        self.assertEqual(2, self.client.execute.call_count)
+
+    def test_unknown_kwargs_raises_error(self):
+        self.assertRaises(putils.UnknownArgumentError,
+                          utils.execute, 'lvs', run_as_root=True,
+                          this_is_not_a_valid_kwarg=True)
+
+
 class GetFromPathTestCase(test.TestCase):
     def test_tolerates_nones(self):
         f = utils.get_from_path
@@ -901,27 +952,27 @@ class BrickUtils(test.TestCase):
         root_helper = utils.get_root_helper()
 
         self.mox.StubOutClassWithMocks(connector, 'ISCSIConnector')
-        connector.ISCSIConnector(execute=putils.execute,
+        connector.ISCSIConnector(execute=utils.execute,
                                  driver=None,
                                  root_helper=root_helper,
                                  use_multipath=False,
                                  device_scan_attempts=3)
 
         self.mox.StubOutClassWithMocks(connector, 'FibreChannelConnector')
-        connector.FibreChannelConnector(execute=putils.execute,
+        connector.FibreChannelConnector(execute=utils.execute,
                                         driver=None,
                                         root_helper=root_helper,
                                         use_multipath=False,
                                         device_scan_attempts=3)
 
         self.mox.StubOutClassWithMocks(connector, 'AoEConnector')
-        connector.AoEConnector(execute=putils.execute,
+        connector.AoEConnector(execute=utils.execute,
                                driver=None,
                                root_helper=root_helper,
                                device_scan_attempts=3)
 
         self.mox.StubOutClassWithMocks(connector, 'LocalConnector')
-        connector.LocalConnector(execute=putils.execute,
+        connector.LocalConnector(execute=utils.execute,
                                  driver=None,
                                  root_helper=root_helper,
                                  device_scan_attempts=3)
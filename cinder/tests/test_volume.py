@@ -38,11 +38,13 @@ from cinder.brick.local_dev import lvm as brick_lvm
 from cinder import context
 from cinder import db
 from cinder import exception
+from cinder.image import image_cache
 from cinder.image import image_utils
 from cinder import keymgr
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import importutils
 from cinder.openstack.common import jsonutils
+from cinder.openstack.common import processutils
 import cinder.policy
 from cinder import quota
 from cinder import test
@@ -154,6 +156,47 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.assertEqual(volume['status'], "error")
         self.volume.delete_volume(self.context, volume_id)
 
+    def test_init_host_reexports_in_use_volumes(self):
+        """Test that init_host re-exports in-use volumes in one call."""
+        volumes = [tests_utils.create_volume(self.context, status='in-use',
+                                             size=1, host=CONF.host)
+                   for _i in range(3)]
+        exported = []
+
+        def fake_ensure_exports(ctxt, volumes):
+            exported.extend(volume['id'] for volume in volumes)
+            return {volumes[0]['id']: exception.VolumeBackendAPIException(
+                data='fake')}
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.volume.init_host()
+
+        self.assertEqual(sorted(volume['id'] for volume in volumes),
+                         sorted(exported))
+        statuses = [db.volume_get(self.context, volume['id'])['status']
+                    for volume in volumes]
+        self.assertEqual(['error', 'in-use', 'in-use'], sorted(statuses))
+        self.assertEqual(3, self.volume.stats['allocated_capacity_gb'])
+
+    def test_driver_ensure_exports(self):
+        """Test that the default ensure_exports collects the failures."""
+        drv = driver.VolumeDriver(configuration=conf.Configuration(None))
+        self.flags(ensure_export_workers=2)
+        exported = []
+
+        def fake_ensure_export(ctxt, volume):
+            exported.append(volume['id'])
+            if volume['id'] == 'b':
+                raise exception.VolumeBackendAPIException(data='fake')
+
+        self.stubs.Set(drv, 'ensure_export', fake_ensure_export)
+        failed = drv.ensure_exports(self.context,
+                                    [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}])
+
+        self.assertEqual(['a', 'b', 'c'], sorted(exported))
+        self.assertEqual(['b'], failed.keys())
+
     @mock.patch.object(QUOTAS, 'reserve')
     @mock.patch.object(QUOTAS, 'commit')
     @mock.patch.object(QUOTAS, 'rollback')
@@ -345,6 +388,42 @@ class VolumeTestCase(BaseVolumeTestCase):
                                    'description')
         self.assertEqual(volume['availability_zone'], 'default-az')
 
+    def test_create_volumes_single_scheduler_cast(self):
+        """Test a batch of volumes is sent to the scheduler at once."""
+        self.stubs.Set(QUOTAS, "reserve",
+                       lambda *args, **kwargs: ["RESERVATION"])
+        self.stubs.Set(QUOTAS, "commit", lambda *args, **kwargs: None)
+
+        volume_api = cinder.volume.api.API()
+        with mock.patch.object(volume_api.scheduler_rpcapi,
+                               'create_volumes') as mock_create_volumes:
+            volumes = volume_api.create_volumes(self.context, 3, 1, 'name',
+                                                'description')
+
+        self.assertEqual(3, len(volumes))
+        self.assertEqual(1, mock_create_volumes.call_count)
+        request_specs = mock_create_volumes.call_args[0][2]
+        self.assertEqual([volume['id'] for volume in volumes],
+                         [spec['volume_id'] for spec in request_specs])
+
+    def test_create_volumes_casts_created_volumes_on_failure(self):
+        """Test volumes created before a failure are still scheduled."""
+        self.stubs.Set(QUOTAS, "commit", lambda *args, **kwargs: None)
+        self.stubs.Set(QUOTAS, "rollback", lambda *args, **kwargs: None)
+        reserve = mock.Mock(side_effect=[["RESERVATION"],
+                                         exception.QuotaError()])
+        self.stubs.Set(QUOTAS, "reserve", reserve)
+
+        volume_api = cinder.volume.api.API()
+        with mock.patch.object(volume_api.scheduler_rpcapi,
+                               'create_volumes') as mock_create_volumes:
+            self.assertRaises(exception.QuotaError,
+                              volume_api.create_volumes, self.context, 2, 1,
+                              'name', 'description')
+
+        request_specs = mock_create_volumes.call_args[0][2]
+        self.assertEqual(1, len(request_specs))
+
     def test_create_volume_with_volume_type(self):
         """Test volume creation with default volume type."""
         def fake_reserve(context, expire=None, project_id=None, **deltas):
@@ -3017,6 +3096,165 @@ class LVMVolumeDriverTestCase(DriverTestCase):
 
         lvm_driver._delete_volume(fake_snapshot, is_snapshot=True)
 
+    def _get_background_clear_driver(self):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.volume_clear_size = 0
+        configuration.lvm_clear_in_background = True
+        configuration.lvm_clear_rate_limit = 0
+        configuration.lvm_clear_state_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, configuration.lvm_clear_state_path)
+        return lvm.LVMVolumeDriver(configuration=configuration,
+                                   vg_obj=self.mox.CreateMockAnything())
+
+    def test_delete_volume_clear_in_background(self):
+        lvm_driver = self._get_background_clear_driver()
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        self.mox.StubOutWithMock(eventlet, 'spawn')
+        lvm_driver.vg.rename_volume('test1', 'clear-test1')
+        eventlet.spawn(lvm_driver._run_background_clear).AndReturn('thread')
+        self.mox.ReplayAll()
+
+        lvm_driver._delete_volume(dict(self.FAKE_VOLUME, size=2))
+
+        self.assertEqual([('clear-test1', 2048)], lvm_driver._clear_queue)
+        self.assertEqual('thread', lvm_driver._clear_thread)
+
+    def test_background_clear_resumes_at_progress(self):
+        lvm_driver = self._get_background_clear_driver()
+        progress_file = lvm_driver._get_clear_progress_file('clear-test1')
+        fileutils.ensure_tree(os.path.dirname(progress_file))
+        with open(progress_file, 'w') as f:
+            f.write('1024')
+        lvm_driver._clear_queue.append(('clear-test1', 3072))
+
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        for offset in (1024, 2048):
+            volutils.clear_volume(3072, mox.IgnoreArg(),
+                                  volume_clear='zero',
+                                  volume_clear_size=1024,
+                                  offset_in_m=offset)
+        lvm_driver.vg.delete('clear-test1')
+        self.mox.ReplayAll()
+
+        lvm_driver._run_background_clear()
+
+        self.assertEqual([], lvm_driver._clear_queue)
+        self.assertIsNone(lvm_driver._clear_thread)
+        self.assertFalse(os.path.exists(progress_file))
+
+    def test_background_clear_keeps_lv_on_failure(self):
+        lvm_driver = self._get_background_clear_driver()
+        lvm_driver._clear_queue.append(('clear-test1', 1024))
+
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        volutils.clear_volume(
+            1024, mox.IgnoreArg(), volume_clear='zero',
+            volume_clear_size=1024, offset_in_m=0).AndRaise(
+                processutils.ProcessExecutionError())
+        self.mox.ReplayAll()
+
+        lvm_driver._run_background_clear()
+
+        self.assertEqual([], lvm_driver._clear_queue)
+
+    def test_resume_background_clear(self):
+        lvm_driver = self._get_background_clear_driver()
+        self.mox.StubOutWithMock(lvm_driver, '_start_background_clear')
+        lvm_driver.vg.get_volumes().AndReturn(
+            [{'vg': 'cinder-volumes', 'name': 'clear-test1', 'size': '2.00g'},
+             {'vg': 'cinder-volumes', 'name': 'test2', 'size': '1.00g'}])
+        lvm_driver._start_background_clear()
+        self.mox.ReplayAll()
+
+        lvm_driver._resume_background_clear()
+
+        self.assertEqual([('clear-test1', 2048)], lvm_driver._clear_queue)
+
+    def _get_image_cache_driver(self, lvm_type='default'):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.lvm_type = lvm_type
+        configuration.image_volume_cache_dir = tempfile.mkdtemp()
+        configuration.image_volume_cache_max_size_gb = 0
+        configuration.image_volume_cache_max_count = 0
+        self.addCleanup(shutil.rmtree, configuration.image_volume_cache_dir)
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration,
+                                         vg_obj=self.mox.CreateMockAnything())
+        # The driver registered the option, it is read with safe_get.
+        CONF.set_override('image_volume_cache_enabled', True, 'fake_group')
+        return lvm_driver
+
+    def test_copy_image_to_volume_through_cache(self):
+        lvm_driver = self._get_image_cache_driver()
+        image_service = fake_image.FakeImageService()
+        image_id = 'c905cedb-7281-47e4-8a62-f26bc5fc4c77'
+
+        def fake_fetch_to_raw(context, image_service, image_id, dest,
+                              blocksize, size=None):
+            with open(dest, 'w') as f:
+                f.write('image')
+
+        self.stubs.Set(image_utils, 'fetch_to_raw', fake_fetch_to_raw)
+        self.mox.StubOutWithMock(volutils, 'copy_volume')
+        for name in ('vol1', 'vol2'):
+            volutils.copy_volume(mox.IgnoreArg(),
+                                 lvm_driver.local_path({'name': name}),
+                                 1024, mox.IgnoreArg(),
+                                 execute=lvm_driver._execute, sparse=False)
+        self.mox.ReplayAll()
+
+        for name in ('vol1', 'vol2'):
+            lvm_driver.copy_image_to_volume(self.context,
+                                            {'name': name, 'size': 1},
+                                            image_service, image_id)
+
+    def test_clone_image_from_cache(self):
+        lvm_driver = self._get_image_cache_driver(lvm_type='thin')
+        image_service = fake_image.FakeImageService()
+        image_id = 'c905cedb-7281-47e4-8a62-f26bc5fc4c77'
+        image_meta = image_service.show(self.context, image_id)
+        lv_name = lvm.IMAGE_CACHE_PREFIX + image_cache.get_cache_key(
+            image_id, image_meta)
+
+        def fake_fetch_to_raw(context, image_service, image_id, dest,
+                              blocksize, size=None):
+            with open(dest, 'w') as f:
+                f.write('image')
+
+        self.stubs.Set(image_utils, 'fetch_to_raw', fake_fetch_to_raw)
+        self.mox.StubOutWithMock(volutils, 'copy_volume')
+        # The cached LV is sized for the image, not for the first volume.
+        lvm_driver.vg.create_volume(lv_name, '1g', 'thin', 0)
+        volutils.copy_volume(mox.IgnoreArg(),
+                             lvm_driver.local_path({'name': lv_name}),
+                             1, mox.IgnoreArg(),
+                             execute=lvm_driver._execute, sparse=True)
+        volutils.copy_volume(lvm_driver.local_path({'name': lv_name}),
+                             lvm_driver.local_path({'name': 'vol1'}),
+                             1024, mox.IgnoreArg(),
+                             execute=lvm_driver._execute, sparse=True)
+        lvm_driver.vg.create_lv_snapshot('vol2', lv_name, 'thin')
+        lvm_driver.vg.activate_lv('vol2', is_snapshot=True)
+        lvm_driver.vg.create_lv_snapshot('vol3', lv_name, 'thin')
+        lvm_driver.vg.activate_lv('vol3', is_snapshot=True)
+        lvm_driver.vg.extend_volume('vol3', '3g')
+        self.mox.ReplayAll()
+
+        # Nothing is cached yet, the first volume is created and copied.
+        self.assertEqual((None, False),
+                         lvm_driver.clone_image({'name': 'vol1', 'size': 2},
+                                                None, image_id, image_meta))
+        lvm_driver.copy_image_to_volume(self.context,
+                                        {'name': 'vol1', 'size': 2},
+                                        image_service, image_id)
+        # Volumes smaller than the first one are cloned as well.
+        self.assertEqual((None, True),
+                         lvm_driver.clone_image({'name': 'vol2', 'size': 1},
+                                                None, image_id, image_meta))
+        self.assertEqual((None, True),
+                         lvm_driver.clone_image({'name': 'vol3', 'size': 3},
+                                                None, image_id, image_meta))
+
 
 class ISCSITestCase(DriverTestCase):
     """Test Case for ISCSIDriver"""
@@ -101,6 +101,24 @@ class VolumeGlanceMetadataTestCase(test.TestCase):
         self._assert_metadata_equals('2', 'key2', 'value2', metadata[1])
         self._assert_metadata_equals('2', 'key22', 'value22', metadata[2])
 
+        metadata = db.volume_glance_metadata_get_all(ctxt,
+                                                     volume_ids=['2', '3'])
+        self.assertEqual(len(metadata), 2)
+        self._assert_metadata_equals('2', 'key2', 'value2', metadata[0])
+        self._assert_metadata_equals('2', 'key22', 'value22', metadata[1])
+
+    def test_vols_get_glance_metadata_by_project(self):
+        ctxt = context.get_admin_context()
+        db.volume_create(ctxt, {'id': '1', 'project_id': 'project1'})
+        db.volume_create(ctxt, {'id': '2', 'project_id': 'project2'})
+        db.volume_glance_metadata_create(ctxt, '1', 'key1', 'value1')
+        db.volume_glance_metadata_create(ctxt, '2', 'key2', 'value2')
+
+        user_ctxt = context.RequestContext('user1', 'project1')
+        metadata = db.volume_glance_metadata_get_all(user_ctxt)
+        self.assertEqual(len(metadata), 1)
+        self._assert_metadata_equals('1', 'key1', 'value1', metadata[0])
+
     def _assert_metadata_equals(self, volume_id, key, value, observed):
         self.assertEqual(volume_id, observed.volume_id)
         self.assertEqual(key, observed.key)
@@ -25,8 +25,10 @@ from cinder import db
 from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import processutils
 from cinder import test
 from cinder.tests import fake_notifier
+from cinder import units
 from cinder import utils
 from cinder.volume import utils as volume_utils
 
@@ -105,6 +107,74 @@ class LVMVolumeDriverTestCase(test.TestCase):
         self.assertEqual(count, 1024)
 
 
+class CopyVolumeTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CopyVolumeTestCase, self).setUp()
+        self.stubs.Set(volume_utils, '_native_copy_available', None)
+        self.stubs.Set(volume_utils, '_odirect_support', {})
+        self.cmds = []
+
+    def fake_execute(self, *cmd, **kwargs):
+        self.cmds.append(cmd)
+        if 'cinder-volume-copy' in cmd:
+            return ('{"bytes": 1048576, "skipped": 0, "seconds": 0.5, '
+                    '"direct": true}', '')
+        return ('', '')
+
+    def test_copy_volume_native(self):
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 1024, '1M',
+                                 sync=True, execute=self.fake_execute,
+                                 ionice='-c3', sparse=True)
+        self.assertEqual([('ionice', '-c3', 'cinder-volume-copy',
+                           '/dev/src', '/dev/dest', str(units.GiB),
+                           '--blocksize=%d' % units.MiB, '--sparse',
+                           '--sync')], self.cmds)
+
+    def test_copy_volume_falls_back_to_dd(self):
+        def fake_execute(*cmd, **kwargs):
+            self.cmds.append(cmd)
+            if 'cinder-volume-copy' in cmd:
+                raise processutils.ProcessExecutionError(exit_code=99)
+            return ('', '')
+
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 1, '1M',
+                                 execute=fake_execute)
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 1, '1M',
+                                 execute=fake_execute)
+
+        # The helper and the O_DIRECT probe are only tried once.
+        dd_copy = ('dd', 'if=/dev/src', 'of=/dev/dest', 'count=1', 'bs=1M',
+                   'iflag=direct', 'oflag=direct')
+        self.assertEqual([('cinder-volume-copy', '/dev/src', '/dev/dest',
+                           str(units.MiB), '--blocksize=%d' % units.MiB),
+                          ('dd', 'count=0', 'if=/dev/src', 'of=/dev/dest',
+                           'iflag=direct', 'oflag=direct'),
+                          dd_copy, dd_copy], self.cmds)
+
+    def test_copy_volume_native_error(self):
+        def fake_execute(*cmd, **kwargs):
+            raise processutils.ProcessExecutionError(exit_code=1)
+
+        self.assertRaises(processutils.ProcessExecutionError,
+                          volume_utils.copy_volume, '/dev/src', '/dev/dest',
+                          1, '1M', execute=fake_execute)
+
+    def test_copy_volume_dd_without_odirect(self):
+        self.flags(volume_copy_method='dd')
+
+        def fake_execute(*cmd, **kwargs):
+            self.cmds.append(cmd)
+            if 'count=0' in cmd:
+                raise processutils.ProcessExecutionError(exit_code=1)
+            return ('', '')
+
+        volume_utils.copy_volume('/dev/src', '/dev/dest', 1, '1M', sync=True,
+                                 execute=fake_execute)
+        self.assertEqual(('dd', 'if=/dev/src', 'of=/dev/dest', 'count=1',
+                          'bs=1M', 'conv=fdatasync'), self.cmds[-1])
+
+
 class ClearVolumeTestCase(test.TestCase):
 
     def test_clear_volume(self):
@@ -115,7 +185,8 @@ class ClearVolumeTestCase(test.TestCase):
         self.mox.StubOutWithMock(volume_utils, 'copy_volume')
         volume_utils.copy_volume("/dev/zero", "volume_path", 1024,
                                  CONF.volume_dd_blocksize, sync=True,
-                                 ionice=None, execute=utils.execute)
+                                 ionice=None, execute=utils.execute,
+                                 offset_in_m=0, discard=True)
         self.mox.ReplayAll()
         volume_utils.clear_volume(1024, "volume_path")
 
@@ -126,7 +197,8 @@ class ClearVolumeTestCase(test.TestCase):
         self.mox.StubOutWithMock(volume_utils, 'copy_volume')
         volume_utils.copy_volume("/dev/zero", "volume_path", 1,
                                  CONF.volume_dd_blocksize, sync=True,
-                                 ionice=None, execute=utils.execute)
+                                 ionice=None, execute=utils.execute,
+                                 offset_in_m=0, discard=True)
         self.mox.ReplayAll()
         volume_utils.clear_volume(1024, "volume_path")
 
@@ -139,7 +211,8 @@ class ClearVolumeTestCase(test.TestCase):
         volume_utils.copy_volume("/dev/zero", "volume_path", 1024,
                                  CONF.volume_dd_blocksize, sync=True,
                                  ionice=CONF.volume_clear_ionice,
-                                 execute=utils.execute)
+                                 execute=utils.execute,
+                                 offset_in_m=0, discard=True)
         self.mox.ReplayAll()
         volume_utils.clear_volume(1024, "volume_path")
 
@@ -151,7 +224,8 @@ class ClearVolumeTestCase(test.TestCase):
         volume_utils.copy_volume("/dev/zero", "volume_path", 1,
                                  CONF.volume_dd_blocksize, sync=True,
                                  ionice=CONF.volume_clear_ionice,
-                                 execute=utils.execute)
+                                 execute=utils.execute,
+                                 offset_in_m=0, discard=True)
         self.mox.ReplayAll()
         volume_utils.clear_volume(1024, "volume_path")
 
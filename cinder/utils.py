@@ -30,6 +30,7 @@ import shutil
 import stat
 import sys
 import tempfile
+import time
 
 from eventlet import pools
 from oslo.config import cfg
@@ -130,12 +131,81 @@ def check_exclusive_options(**kwargs):
 
 
 def execute(*cmd, **kwargs):
-    """Convenience wrapper around oslo's execute() method."""
+    """Convenience wrapper around oslo's execute() method.
+
+    Commands run as root with cinder's own root helper go through the
+    rootwrap daemon when use_rootwrap_daemon is set.
+    """
     if 'run_as_root' in kwargs and not 'root_helper' in kwargs:
         kwargs['root_helper'] = get_root_helper()
+    if (CONF.use_rootwrap_daemon and kwargs.get('run_as_root') and
+            kwargs['root_helper'] == get_root_helper() and
+            not kwargs.get('shell')):
+        return _execute_with_rootwrap_daemon(*cmd, **kwargs)
     return processutils.execute(*cmd, **kwargs)
 
 
+# Clients of the rootwrap daemons, by rootwrap configuration file.
+_rootwrap_clients = {}
+
+
+@synchronized('rootwrap-client')
+def _get_rootwrap_client(rootwrap_config):
+    """Return the client of the rootwrap daemon using rootwrap_config.
+
+    The daemon is started with sudo on the first command and keeps its
+    filters loaded for the following ones.
+    """
+    if rootwrap_config not in _rootwrap_clients:
+        from oslo.rootwrap import client as rootwrap_client
+        _rootwrap_clients[rootwrap_config] = rootwrap_client.Client(
+            ['sudo', 'cinder-rootwrap-daemon', rootwrap_config])
+    return _rootwrap_clients[rootwrap_config]
+
+
+def _execute_with_rootwrap_daemon(*cmd, **kwargs):
+    """Run a command as root through the rootwrap daemon.
+
+    Takes the arguments of processutils.execute and behaves the same on
+    exit codes and retries.
+    """
+    process_input = kwargs.pop('process_input', None)
+    check_exit_code = kwargs.pop('check_exit_code', [0])
+    ignore_exit_code = False
+    delay_on_retry = kwargs.pop('delay_on_retry', True)
+    attempts = kwargs.pop('attempts', 1)
+    kwargs.pop('run_as_root')
+    kwargs.pop('root_helper')
+    kwargs.pop('shell', None)
+    if kwargs:
+        raise processutils.UnknownArgumentError(
+            _('Got unknown keyword args to utils.execute: %r') % kwargs)
+
+    if isinstance(check_exit_code, bool):
+        ignore_exit_code = not check_exit_code
+        check_exit_code = [0]
+    elif isinstance(check_exit_code, int):
+        check_exit_code = [check_exit_code]
+
+    cmd = map(str, cmd)
+    client = _get_rootwrap_client(CONF.rootwrap_config)
+    while attempts > 0:
+        attempts -= 1
+        LOG.debug(_('Running cmd (rootwrap daemon): %s'), ' '.join(cmd))
+        returncode, stdout, stderr = client.execute(cmd, process_input)
+        if (not returncode or ignore_exit_code or
+                returncode in check_exit_code):
+            return stdout, stderr
+        LOG.debug(_('Result was %s') % returncode)
+        if not attempts:
+            raise processutils.ProcessExecutionError(
+                exit_code=returncode, stdout=stdout, stderr=stderr,
+                cmd=' '.join(cmd))
+        LOG.debug(_('%r failed. Retrying.'), cmd)
+        if delay_on_retry:
+            time.sleep(random.randint(20, 200) / 100.0)
+
+
 def check_ssh_injection(cmd_list):
     ssh_injection_pattern = ['`', '$', '|', '||', ';', '&', '&&', '>', '>>',
                              '<']
@@ -727,7 +797,7 @@ def brick_get_connector_properties():
 
 
 def brick_get_connector(protocol, driver=None,
-                        execute=processutils.execute,
+                        execute=execute,
                         use_multipath=False,
                         device_scan_attempts=3,
                         *args, **kwargs):
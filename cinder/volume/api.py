@@ -134,7 +134,7 @@ class API(base.Base):
     def create(self, context, size, name, description, snapshot=None,
                image_id=None, volume_type=None, metadata=None,
                availability_zone=None, source_volume=None,
-               scheduler_hints=None, backup_source_volume=None):
+               scheduler_hints=None, backup_source_volume=None, batch=None):
 
         if source_volume and volume_type:
             if volume_type['id'] != source_volume['volume_type_id']:
@@ -180,7 +180,8 @@ class API(base.Base):
                                                  self.db,
                                                  self.image_service,
                                                  check_volume_az_zone,
-                                                 create_what)
+                                                 create_what,
+                                                 batch)
         except Exception:
             LOG.exception(_("Failed to create api volume flow"))
             raise exception.CinderException(
@@ -190,6 +191,25 @@ class API(base.Base):
         volume = flow_engine.storage.fetch('volume')
         return volume
 
+    def create_volumes(self, context, count, size, name, description,
+                       **kwargs):
+        """Create count identical volumes, scheduled in a single pass.
+
+        Each volume goes through the same validation, quota and database
+        steps as create(), but the scheduler is sent one request for the
+        whole batch.  Takes the same optional arguments as create().
+        """
+        batch = create_volume.SchedulerCastBatch(self.scheduler_rpcapi)
+        volumes = []
+        try:
+            for i in xrange(count):
+                volumes.append(self.create(context, size, name, description,
+                                           batch=batch, **kwargs))
+        finally:
+            # Volumes created before a failure still have to be scheduled.
+            batch.cast(context)
+        return volumes
+
     @wrap_check_policy
     def delete(self, context, volume, force=False, unmanage_only=False):
         if context.is_admin and context.project_id != volume['project_id']:
@@ -267,7 +287,7 @@ class API(base.Base):
         return volume
 
     def get_all(self, context, marker=None, limit=None, sort_key='created_at',
-                sort_dir='desc', filters=None):
+                sort_dir='desc', filters=None, columns=None):
         check_policy(context, 'get_all')
         if filters == None:
             filters = {}
@@ -296,13 +316,15 @@ class API(base.Base):
             # Need to remove all_tenants to pass the filtering below.
             del filters['all_tenants']
             volumes = self.db.volume_get_all(context, marker, limit, sort_key,
-                                             sort_dir, filters=filters)
+                                             sort_dir, filters=filters,
+                                             columns=columns)
         else:
             volumes = self.db.volume_get_all_by_project(context,
                                                         context.project_id,
                                                         marker, limit,
                                                         sort_key, sort_dir,
-                                                        filters=filters)
+                                                        filters=filters,
+                                                        columns=columns)
 
         return volumes
 
@@ -316,11 +338,17 @@ class API(base.Base):
         rv = self.db.volume_get(context, volume_id)
         return dict(rv.iteritems())
 
-    def get_all_snapshots(self, context, search_opts=None):
+    def get_all_snapshots(self, context, search_opts=None, limit=None,
+                          sort_key=None, sort_dir=None, cursor=None):
         check_policy(context, 'get_all_snapshots')
 
         search_opts = search_opts or {}
 
+        if limit is not None or sort_key is not None or cursor is not None:
+            # Paginated listings are filtered by the database as well.
+            return self._get_snapshots_page(context, search_opts, limit,
+                                            sort_key, sort_dir, cursor)
+
         if (context.is_admin and 'all_tenants' in search_opts):
             # Need to remove all_tenants to pass the filtering below.
             del search_opts['all_tenants']
@@ -343,6 +371,23 @@ class API(base.Base):
             snapshots = results
         return snapshots
 
+    def _get_snapshots_page(self, context, filters, limit, sort_key,
+                            sort_dir, cursor):
+        if filters:
+            LOG.debug(_("Searching by: %s") % filters)
+        if (context.is_admin and 'all_tenants' in filters):
+            del filters['all_tenants']
+            return self.db.snapshot_get_all(context, filters=filters,
+                                            limit=limit, sort_key=sort_key,
+                                            sort_dir=sort_dir, cursor=cursor)
+        return self.db.snapshot_get_all_by_project(context,
+                                                   context.project_id,
+                                                   filters=filters,
+                                                   limit=limit,
+                                                   sort_key=sort_key,
+                                                   sort_dir=sort_dir,
+                                                   cursor=cursor)
+
     @wrap_check_policy
     def check_attach(self, volume):
         # TODO(vish): abstract status checking?
@@ -681,9 +726,10 @@ class API(base.Base):
     def get_snapshot_metadata_value(self, snapshot, key):
         pass
 
-    def get_volumes_image_metadata(self, context):
+    def get_volumes_image_metadata(self, context, volume_ids=None):
         check_policy(context, 'get_volumes_image_metadata')
-        db_data = self.db.volume_glance_metadata_get_all(context)
+        db_data = self.db.volume_glance_metadata_get_all(
+            context, volume_ids=volume_ids)
         results = collections.defaultdict(dict)
         for meta_entry in db_data:
             results[meta_entry['volume_id']].update({meta_entry['key']:
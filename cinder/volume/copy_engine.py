@@ -0,0 +1,227 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Copy volume data in process.
+
+This is what the cinder-volume-copy command runs.  cinder-volume runs that
+command as root through rootwrap in place of dd, see
+cinder.volume.utils.copy_volume.
+"""
+
+import errno
+import fcntl
+import io
+import mmap
+import os
+import stat
+import struct
+import time
+
+from cinder import units
+
+
+# O_DIRECT needs buffers, offsets and lengths aligned to the logical block
+# size of the device, which is at most the page size.
+ALIGNMENT = 4096
+
+# Block device ioctls from linux/fs.h
+BLKDISCARD = 0x1277
+BLKDISCARDZEROES = 0x127c
+BLKZEROOUT = 0x127f
+
+# Ranges passed to a single zeroing ioctl, so the copy can report progress
+# and a failure does not lose much work.
+ZERO_RANGE = 256 * units.MiB
+
+
+def _open(path, flags, direct):
+    """Open path with O_DIRECT if asked for and supported by its device.
+
+    :returns: the file descriptor and whether O_DIRECT is in use
+    """
+    if direct:
+        try:
+            return os.open(path, flags | os.O_DIRECT, 0o666), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    return os.open(path, flags, 0o666), False
+
+
+def _clear_direct(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_DIRECT)
+
+
+def _is_dev_zero(fd):
+    st = os.fstat(fd)
+    return (stat.S_ISCHR(st.st_mode) and
+            (os.major(st.st_rdev), os.minor(st.st_rdev)) == (1, 5))
+
+
+def _zero_range(fd, offset, length, discard):
+    """Zero a range of a block device without writing the zeroes ourselves.
+
+    Uses BLKDISCARD if discard is set and the device guarantees that
+    discarded blocks read back as zeroes, else BLKZEROOUT, which lets the
+    kernel use WRITE SAME or unmap the blocks of thin devices.
+
+    :returns: False if the device supports neither ioctl
+    """
+    rng = struct.pack('QQ', offset, length)
+    if discard:
+        try:
+            zeroes = fcntl.ioctl(fd, BLKDISCARDZEROES, struct.pack('I', 0))
+            if struct.unpack('I', zeroes)[0]:
+                fcntl.ioctl(fd, BLKDISCARD, rng)
+                return True
+        except IOError as e:
+            if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY,
+                               errno.EINVAL):
+                raise
+    try:
+        fcntl.ioctl(fd, BLKZEROOUT, rng)
+    except IOError as e:
+        if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL):
+            raise
+        return False
+    return True
+
+
+def _zero_device(dest_fd, offset, length, discard, progress,
+                 progress_interval):
+    last_report = time.time()
+    done = 0
+    while done < length:
+        size = min(ZERO_RANGE, length - done)
+        if not _zero_range(dest_fd, offset + done, size, discard):
+            if done:
+                raise IOError(errno.EIO, 'zeroing ioctl stopped working')
+            return False
+        done += size
+        if progress is not None and (time.time() - last_report >=
+                                     progress_interval):
+            progress(done, length)
+            last_report = time.time()
+    return True
+
+
+def _write(dest, data):
+    written = dest.write(data)
+    while written < len(data):
+        written += dest.write(buffer(data, written))
+
+
+def copy_data(src_path, dest_path, length, blocksize=units.MiB, direct=True,
+              sparse=False, sync=False, progress=None, progress_interval=10,
+              offset=0, discard=False):
+    """Copy length bytes, or up to the end of the source, between paths.
+
+    Reads and writes go through one page aligned buffer, with O_DIRECT on
+    the devices which support it so the copy does not flush the page cache
+    of the host.  Like dd, a regular destination file is truncated first,
+    unless an offset is given.
+
+    Copying /dev/zero to a block device zeroes it with an ioctl instead,
+    see _zero_range.
+
+    :param direct: use O_DIRECT where the device supports it
+    :param sparse: seek over blocks of zeroes instead of writing them;
+                   only for destinations which read back zeroes, like new
+                   thin LVs or the truncated file
+    :param sync: flush the destination to disk before returning
+    :param progress: called as progress(copied, length) every
+                     progress_interval seconds
+    :param offset: byte offset to start at, in both source and destination
+    :param discard: allow discarding blocks when zeroing a block device
+    :returns: dict with the bytes copied, the bytes of zeroes skipped, the
+              seconds taken and whether O_DIRECT was used
+    """
+    blocksize = max(ALIGNMENT, blocksize - blocksize % ALIGNMENT)
+    src_fd, src_direct = _open(src_path, os.O_RDONLY, direct)
+    try:
+        dest_fd, dest_direct = _open(dest_path, os.O_WRONLY | os.O_CREAT,
+                                     direct)
+        try:
+            dest_mode = os.fstat(dest_fd).st_mode
+            if (stat.S_ISBLK(dest_mode) and _is_dev_zero(src_fd) and
+                    not sparse):
+                start = time.time()
+                if _zero_device(dest_fd, offset, length, discard, progress,
+                                progress_interval):
+                    if sync:
+                        os.fdatasync(dest_fd)
+                    return {'bytes': length,
+                            'skipped': 0,
+                            'seconds': time.time() - start,
+                            'direct': True}
+
+            is_file = stat.S_ISREG(dest_mode)
+            if is_file and not offset:
+                os.ftruncate(dest_fd, 0)
+            if offset:
+                os.lseek(src_fd, offset, os.SEEK_SET)
+                os.lseek(dest_fd, offset, os.SEEK_SET)
+            used_direct = src_direct and dest_direct
+            src = io.FileIO(src_fd, 'r', closefd=False)
+            dest = io.FileIO(dest_fd, 'w', closefd=False)
+            buf = mmap.mmap(-1, blocksize)
+            zeroes = buffer('\0' * blocksize)
+
+            start = last_report = time.time()
+            copied = 0
+            skipped = 0
+            while copied < length:
+                size = min(blocksize, length - copied)
+                if size < blocksize:
+                    # The tail is shorter than the aligned buffer.
+                    if src_direct:
+                        _clear_direct(src_fd)
+                        src_direct = False
+                    buf = bytearray(size)
+                count = src.readinto(buf)
+                if not count:
+                    break
+                data = buffer(buf, 0, count)
+                if sparse and data == buffer(zeroes, 0, count):
+                    os.lseek(dest_fd, count, os.SEEK_CUR)
+                    skipped += count
+                else:
+                    if dest_direct and (count % ALIGNMENT or
+                                        isinstance(buf, bytearray)):
+                        _clear_direct(dest_fd)
+                        dest_direct = False
+                    _write(dest, data)
+                copied += count
+
+                if progress is not None:
+                    now = time.time()
+                    if now - last_report >= progress_interval:
+                        progress(copied, length)
+                        last_report = now
+
+            if is_file and os.fstat(dest_fd).st_size < offset + copied:
+                os.ftruncate(dest_fd, offset + copied)
+            if sync:
+                os.fdatasync(dest_fd)
+            return {'bytes': copied,
+                    'skipped': skipped,
+                    'seconds': time.time() - start,
+                    'direct': used_direct}
+        finally:
+            os.close(dest_fd)
+    finally:
+        os.close(src_fd)
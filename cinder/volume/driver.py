@@ -18,16 +18,20 @@ Drivers for volumes.
 
 """
 
+import os
 import time
 
+from eventlet import greenpool
 from oslo.config import cfg
 
 from cinder import exception
+from cinder.image import image_cache
 from cinder.image import image_utils
 from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder import units
 from cinder import utils
 from cinder.volume import iscsi
 from cinder.volume import rpcapi as volume_rpcapi
@@ -103,6 +107,34 @@ volume_opts = [
                default='1M',
                help='The default block size used when copying/clearing '
                     'volumes'),
+    cfg.StrOpt('volume_copy_method',
+               default='native',
+               help='Method used to copy volume data (valid options are: '
+                    'native, dd). native runs the cinder-volume-copy '
+                    'helper, which skips zero blocks when copying to thin '
+                    'volumes and avoids the dd probe for O_DIRECT support'),
+    cfg.IntOpt('ensure_export_workers',
+               default=1,
+               help='Number of volumes to re-export concurrently when the '
+                    'volume service starts'),
+    cfg.BoolOpt('image_volume_cache_enabled',
+                default=False,
+                help='Cache the images volumes are created from, so that '
+                     'further volumes created from the same image are '
+                     'copied or cloned from the cache instead of '
+                     'downloading and converting the image again'),
+    cfg.StrOpt('image_volume_cache_dir',
+               default='$state_path/image_volume_cache',
+               help='Directory of the image cache, each backend uses a '
+                    'subdirectory named after it'),
+    cfg.IntOpt('image_volume_cache_max_size_gb',
+               default=0,
+               help='Maximum size in GiB of the image cache of a backend, '
+                    '0 for no limit'),
+    cfg.IntOpt('image_volume_cache_max_count',
+               default=0,
+               help='Maximum number of images in the image cache of a '
+                    'backend, 0 for no limit'),
 ]
 
 # for backward compatibility
@@ -148,6 +180,7 @@ class VolumeDriver(object):
             self.configuration.append_config_values(volume_opts)
         self.set_execute(execute)
         self._stats = {}
+        self._image_cache = None
 
         # set True by manager after successful check_for_setup
         self._initialized = False
@@ -232,6 +265,30 @@ class VolumeDriver(object):
         """Synchronously recreates an export for a volume."""
         raise NotImplementedError()
 
+    def ensure_exports(self, context, volumes):
+        """Recreates the exports of several volumes.
+
+        Calls ensure_export for up to ensure_export_workers volumes at a
+        time.  Returns a dict of volume id: exception for the volumes
+        which could not be re-exported.
+        """
+        workers = 1
+        if self.configuration:
+            workers = self.configuration.safe_get('ensure_export_workers')
+        failed = {}
+
+        def _ensure_export(volume):
+            try:
+                self.ensure_export(context, volume)
+            except Exception as ex:
+                failed[volume['id']] = ex
+
+        pool = greenpool.GreenPool(max(1, workers or 1))
+        for volume in volumes:
+            pool.spawn_n(_ensure_export, volume)
+        pool.waitall()
+        return failed
+
     def create_export(self, context, volume):
         """Exports the volume. Can optionally return a Dictionary of changes
         to the volume object to be persisted.
@@ -338,15 +395,74 @@ class VolumeDriver(object):
         attach_info = self._attach_volume(context, volume, properties)
 
         try:
-            image_utils.fetch_to_raw(context,
-                                     image_service,
-                                     image_id,
-                                     attach_info['device']['path'],
-                                     self.configuration.volume_dd_blocksize,
-                                     size=volume['size'])
+            self._copy_image_to_device(context, volume, image_service,
+                                       image_id,
+                                       attach_info['device']['path'])
         finally:
             self._detach_volume(context, attach_info, volume, properties)
 
+    def _get_image_cache(self):
+        """Return the image cache of this backend, None if it is disabled."""
+        if (self._image_cache is None and self.configuration and
+                self.configuration.safe_get('image_volume_cache_enabled')):
+            backend = (self.configuration.safe_get('volume_backend_name') or
+                       self.__class__.__name__)
+            self._image_cache = image_cache.ImageCache(
+                os.path.join(self.configuration.image_volume_cache_dir,
+                             backend),
+                self._create_image_cache_entry,
+                self._delete_image_cache_entry,
+                max_size_gb=self.configuration.image_volume_cache_max_size_gb,
+                max_count=self.configuration.image_volume_cache_max_count)
+        return self._image_cache
+
+    def _create_image_cache_entry(self, context, image_service, image_id,
+                                  key, size=None):
+        """Store an image converted to raw in a file of the image cache.
+
+        Besides its location, the entry records the path its data is read
+        from and the size in GiB of the volumes it fits in.
+        """
+        path = os.path.join(self._get_image_cache().index_dir, key)
+        tmp_path = path + '.part'
+        with fileutils.remove_path_on_error(tmp_path):
+            image_utils.fetch_to_raw(context, image_service, image_id,
+                                     tmp_path,
+                                     self.configuration.volume_dd_blocksize,
+                                     size=size)
+            os.rename(tmp_path, path)
+        stat = os.stat(path)
+        return {'location': path,
+                'path': path,
+                'size': stat.st_blocks * 512,
+                'volume_size': -(-stat.st_size // units.GiB)}
+
+    def _delete_image_cache_entry(self, location):
+        fileutils.delete_if_exists(location)
+
+    def _copy_image_to_device(self, context, volume, image_service, image_id,
+                              dev_path, sparse=False):
+        """Write an image to a volume, through the image cache if enabled.
+
+        :param sparse: the device reads back zeroes, see copy_volume
+        """
+        blocksize = self.configuration.volume_dd_blocksize
+        cache = self._get_image_cache()
+        if cache is not None:
+            image_meta = image_service.show(context, image_id)
+            with cache.get(context, image_service, image_id, image_meta,
+                           size=volume['size']) as entry:
+                # Larger entries may hold an image which does not fit, the
+                # download checks that.
+                if entry['volume_size'] <= volume['size']:
+                    volume_utils.copy_volume(
+                        entry['path'], dev_path,
+                        entry['volume_size'] * units.KiB, blocksize,
+                        execute=self._execute, sparse=sparse)
+                    return
+        image_utils.fetch_to_raw(context, image_service, image_id, dev_path,
+                                 blocksize, size=volume['size'])
+
     def copy_volume_to_image(self, context, volume, image_service, image_meta):
         """Copy the volume to the specified image."""
         LOG.debug(_('copy_volume_to_image %s.') % volume['name'])
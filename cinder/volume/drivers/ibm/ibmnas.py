@@ -120,7 +120,7 @@ class IBMNAS_NFSDriver(nfs.NfsDriver, san.SanDriver):
         global_capacity = 0
         global_free = 0
         for share in self._mounted_shares:
-            capacity, free, _used = self._get_capacity_info(share)
+            capacity, free, _used = self._get_share_capacity_info(share)
             global_capacity += capacity
             global_free += free
 
@@ -195,6 +195,8 @@ class IBMNAS_NFSDriver(nfs.NfsDriver, san.SanDriver):
         LOG.info(_('Extending volume %s.'), volume['name'])
         path = self.local_path(volume)
         self._resize_volume_file(path, new_size)
+        self._update_share_allocation(volume['provider_location'],
+                                      new_size - volume['size'])
 
     def _delete_snapfiles(self, fchild, mount_point):
         LOG.debug(_('Enter _delete_snapfiles: fchild %(fchild)s, '
@@ -255,6 +257,7 @@ class IBMNAS_NFSDriver(nfs.NfsDriver, san.SanDriver):
         # Delete all dependent snapshots, the snapshot will get deleted
         # if the link count goes to zero, else rm will fail silently
         self._delete_snapfiles(volume_path, mount_point)
+        self._remove_volume_allocation(volume)
 
     def create_snapshot(self, snapshot):
         """Creates a volume snapshot."""
@@ -301,6 +304,8 @@ class IBMNAS_NFSDriver(nfs.NfsDriver, san.SanDriver):
 
         #Extend the volume if required
         self._resize_volume_file(volume_path, volume['size'])
+        self._update_share_allocation(volume['provider_location'],
+                                      volume['size'])
         return {'provider_location': volume['provider_location']}
 
     def create_cloned_volume(self, volume, src_vref):
@@ -324,5 +329,7 @@ class IBMNAS_NFSDriver(nfs.NfsDriver, san.SanDriver):
 
         #Extend the volume if required
         self._resize_volume_file(volume_path, volume['size'])
+        self._update_share_allocation(volume['provider_location'],
+                                      volume['size'])
 
         return {'provider_location': volume['provider_location']}
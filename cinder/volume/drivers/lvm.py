@@ -21,13 +21,16 @@ Driver for Linux servers running LVM.
 import math
 import os
 import socket
+import time
 
+import eventlet
 from oslo.config import cfg
 
 from cinder.brick import exception as brick_exception
 from cinder.brick.local_dev import lvm as lvm
 from cinder import exception
 from cinder.image import image_utils
+from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
@@ -49,12 +52,44 @@ volume_opts = [
     cfg.StrOpt('lvm_type',
                default='default',
                help='Type of LVM volumes to deploy; (default or thin)'),
+    cfg.IntOpt('lvm_lv_cache_ttl',
+               default=60,
+               help='Seconds for which logical volume lookups may be '
+                    'answered from the last listing of the volume group. '
+                    'Volumes created or deleted by Cinder are tracked '
+                    'regardless, this only bounds how long changes made '
+                    'outside of Cinder go unnoticed. 0 disables the cache'),
+    cfg.BoolOpt('lvm_clear_in_background',
+                default=False,
+                help='Clear deleted volumes in the background rather than '
+                     'before their deletion completes. The LV is renamed '
+                     'and only removed, freeing its space, once cleared. '
+                     'Clearing resumes where it stopped after a restart'),
+    cfg.IntOpt('lvm_clear_rate_limit',
+               default=0,
+               help='Maximum rate in MiB/s at which volumes are cleared in '
+                    'the background, 0 for no limit'),
+    cfg.StrOpt('lvm_clear_state_path',
+               default='$state_path/lvm_clear',
+               help='Directory where the progress of background clearing '
+                    'is recorded'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(volume_opts)
 
 
+# Prefix of the LVs of deleted volumes waiting to be cleared.
+CLEAR_PREFIX = 'clear-'
+
+# Prefix of the thin LVs holding cached images.
+IMAGE_CACHE_PREFIX = 'image-cache-'
+
+# Amount cleared per step of a background clear, after which the progress
+# is recorded.
+CLEAR_CHUNK_MB = units.KiB
+
+
 class LVMVolumeDriver(driver.VolumeDriver):
     """Executes commands relating to Volumes."""
 
@@ -68,6 +103,9 @@ class LVMVolumeDriver(driver.VolumeDriver):
         self.backend_name =\
             self.configuration.safe_get('volume_backend_name') or 'LVM'
         self.protocol = 'local'
+        # LVs waiting for the background clear, as (name, size in MiB)
+        self._clear_queue = []
+        self._clear_thread = None
 
     def set_execute(self, execute):
         self._execute = execute
@@ -77,10 +115,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
         if self.vg is None:
             root_helper = utils.get_root_helper()
             try:
-                self.vg = lvm.LVM(self.configuration.volume_group,
-                                  root_helper,
-                                  lvm_type=self.configuration.lvm_type,
-                                  executor=self._execute)
+                self.vg = lvm.LVM(
+                    self.configuration.volume_group,
+                    root_helper,
+                    lvm_type=self.configuration.lvm_type,
+                    executor=self._execute,
+                    lv_cache_ttl=self.configuration.lvm_lv_cache_ttl)
             except brick_exception.VolumeGroupNotFound:
                 message = ("Volume Group %s does not exist" %
                            self.configuration.volume_group)
@@ -113,6 +153,9 @@ class LVMVolumeDriver(driver.VolumeDriver):
                     raise exception.VolumeBackendAPIException(
                         data=exception_message)
 
+        if self.configuration.lvm_clear_in_background:
+            self._resume_background_clear()
+
     def _sizestr(self, size_in_g):
         if int(size_in_g) == 0:
             return '100m'
@@ -125,6 +168,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
         """Deletes a logical volume."""
         if self.configuration.volume_clear != 'none' and \
                 self.configuration.lvm_type != 'thin':
+            # NOTE: snapshots are cleared right away, a snapshot waiting
+            # to be cleared would keep its origin from being deleted.
+            if (self.configuration.lvm_clear_in_background and
+                    not is_snapshot):
+                self._queue_background_clear(volume)
+                return
             self._clear_volume(volume, is_snapshot)
 
         name = volume['name']
@@ -170,6 +219,106 @@ class LVMVolumeDriver(driver.VolumeDriver):
             volume_clear=self.configuration.volume_clear,
             volume_clear_size=self.configuration.volume_clear_size)
 
+    def _get_clear_progress_file(self, lv_name):
+        return os.path.join(self.configuration.lvm_clear_state_path,
+                            self.configuration.volume_group, lv_name)
+
+    def _queue_background_clear(self, volume):
+        """Hide the LV of a deleted volume and clear it in the background."""
+        size_in_g = volume.get('size', volume.get('volume_size', None))
+        if size_in_g is None:
+            msg = (_("Size for volume: %s not found, "
+                     "cannot secure delete.") % volume['id'])
+            LOG.error(msg)
+            raise exception.InvalidParameterValue(msg)
+
+        lv_name = CLEAR_PREFIX + volume['name']
+        self.vg.rename_volume(volume['name'], lv_name)
+        LOG.info(_("Volume %(name)s queued for clearing as %(lv)s") %
+                 {'name': volume['name'], 'lv': lv_name})
+        self._clear_queue.append((lv_name, size_in_g * units.KiB))
+        self._start_background_clear()
+
+    def _resume_background_clear(self):
+        """Queue the LVs which were left to clear before a restart."""
+        queued = set(name for name, _size in self._clear_queue)
+        for lv in self.vg.get_volumes():
+            name = lv['name']
+            if name.startswith(CLEAR_PREFIX) and name not in queued:
+                size_in_m = float(lv['size'].rstrip('gG')) * units.KiB
+                self._clear_queue.append((name, int(size_in_m)))
+        if self._clear_queue:
+            LOG.info(_("Resuming the clearing of %d deleted volumes"),
+                     len(self._clear_queue))
+            self._start_background_clear()
+
+    def _start_background_clear(self):
+        if self._clear_thread is None:
+            self._clear_thread = eventlet.spawn(self._run_background_clear)
+
+    def _run_background_clear(self):
+        try:
+            while self._clear_queue:
+                lv_name, size_in_m = self._clear_queue[0]
+                try:
+                    self._clear_lv_in_steps(lv_name, size_in_m)
+                    self.vg.delete(lv_name)
+                    progress_file = self._get_clear_progress_file(lv_name)
+                    if os.path.exists(progress_file):
+                        os.unlink(progress_file)
+                except Exception:
+                    # The LV stays, the next restart tries again.
+                    LOG.exception(_("Failed to clear deleted volume %s"),
+                                  lv_name)
+                self._clear_queue.pop(0)
+        finally:
+            self._clear_thread = None
+
+    def _clear_lv_in_steps(self, lv_name, size_in_m):
+        """Clear an LV, recording the progress after every step.
+
+        Only volume_clear zero can start part way through, other methods
+        clear the whole LV in one step.
+        """
+        dev_path = self.local_path({'name': lv_name})
+        clear_size = self.configuration.volume_clear_size or size_in_m
+        clear_size = min(clear_size, size_in_m)
+        if self.configuration.volume_clear != 'zero':
+            volutils.clear_volume(
+                size_in_m, dev_path,
+                volume_clear=self.configuration.volume_clear,
+                volume_clear_size=clear_size)
+            return
+
+        progress_file = self._get_clear_progress_file(lv_name)
+        done = 0
+        if os.path.exists(progress_file):
+            with open(progress_file) as f:
+                done = int(f.read() or 0)
+            LOG.info(_("Resuming clearing of %(lv)s at %(done)d MiB") %
+                     {'lv': lv_name, 'done': done})
+        else:
+            fileutils.ensure_tree(os.path.dirname(progress_file))
+
+        rate = self.configuration.lvm_clear_rate_limit
+        step = CLEAR_CHUNK_MB
+        if rate:
+            # Keep each step to about ten seconds, so the rate holds.
+            step = max(1, min(step, rate * 10))
+        while done < clear_size:
+            size = min(step, clear_size - done)
+            start = time.time()
+            volutils.clear_volume(size_in_m, dev_path,
+                                  volume_clear='zero',
+                                  volume_clear_size=size,
+                                  offset_in_m=done)
+            done += size
+            with open(progress_file, 'w') as f:
+                f.write(str(done))
+            if rate:
+                eventlet.sleep(max(0, float(size) / rate -
+                                   (time.time() - start)))
+
     def _escape_snapshot(self, snapshot_name):
         # Linux LVM reserves name that starts with snapshot, so that
         # such volume name can't be created. Mangle it.
@@ -212,7 +361,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
                              self.local_path(volume),
                              snapshot['volume_size'] * units.KiB,
                              self.configuration.volume_dd_blocksize,
-                             execute=self._execute)
+                             execute=self._execute,
+                             sparse=self.configuration.lvm_type == 'thin')
 
     def delete_volume(self, volume):
         """Deletes a logical volume."""
@@ -261,12 +411,52 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
     def copy_image_to_volume(self, context, volume, image_service, image_id):
         """Fetch the image from image_service and write it to the volume."""
-        image_utils.fetch_to_raw(context,
-                                 image_service,
-                                 image_id,
-                                 self.local_path(volume),
-                                 self.configuration.volume_dd_blocksize,
-                                 size=volume['size'])
+        thin = self.configuration.lvm_type == 'thin'
+        self._copy_image_to_device(context, volume, image_service, image_id,
+                                   self.local_path(volume), sparse=thin)
+
+    def _create_image_cache_entry(self, context, image_service, image_id,
+                                  key, size=None):
+        """Store an image in a thin LV, which volumes are snapshots of.
+
+        Thick LVs do not make usable clones, their images are cached in
+        files.
+        """
+        if self.configuration.lvm_type != 'thin':
+            return super(LVMVolumeDriver, self)._create_image_cache_entry(
+                context, image_service, image_id, key, size=size)
+
+        lv_name = IMAGE_CACHE_PREFIX + key
+        path = self.local_path({'name': lv_name})
+        blocksize = self.configuration.volume_dd_blocksize
+        with image_utils.temporary_file() as tmp:
+            # Size the LV for the image rather than for the volume asking for
+            # it, so that smaller volumes can be snapshots of it too.
+            image_utils.fetch_to_raw(context, image_service, image_id, tmp,
+                                     blocksize, size=size)
+            stat = os.stat(tmp)
+            volume_size = max(1, -(-stat.st_size // units.GiB))
+            self._create_volume(lv_name, self._sizestr(volume_size), 'thin',
+                                0)
+            try:
+                volutils.copy_volume(tmp, path,
+                                     -(-stat.st_size // units.MiB),
+                                     blocksize, execute=self._execute,
+                                     sparse=True)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    self.vg.delete(lv_name)
+        # Only the data of the image is allocated in the thin pool.
+        return {'location': lv_name,
+                'path': path,
+                'size': stat.st_blocks * 512,
+                'volume_size': volume_size}
+
+    def _delete_image_cache_entry(self, location):
+        if location.startswith(IMAGE_CACHE_PREFIX):
+            self.vg.delete(location)
+        else:
+            super(LVMVolumeDriver, self)._delete_image_cache_entry(location)
 
     def copy_volume_to_image(self, context, volume, image_service, image_meta):
         """Copy the volume to the specified image."""
@@ -306,12 +496,34 @@ class LVMVolumeDriver(driver.VolumeDriver):
                 self.local_path(volume),
                 src_vref['size'] * units.KiB,
                 self.configuration.volume_dd_blocksize,
-                execute=self._execute)
+                execute=self._execute,
+                sparse=self.configuration.lvm_type == 'thin')
         finally:
             self.delete_snapshot(temp_snapshot)
 
     def clone_image(self, volume, image_location, image_id, image_meta):
-        return None, False
+        """Create a thin volume as a snapshot of a cached image."""
+        cache = self._get_image_cache()
+        if cache is None or self.configuration.lvm_type != 'thin':
+            return None, False
+
+        with cache.lookup(image_id, image_meta) as entry:
+            if (entry is None or
+                    not entry['location'].startswith(IMAGE_CACHE_PREFIX) or
+                    entry['volume_size'] > volume['size']):
+                return None, False
+            LOG.info(_("Creating volume %(volume)s from cached image "
+                       "%(image_id)s") % {'volume': volume['name'],
+                                          'image_id': image_id})
+            self.vg.create_lv_snapshot(volume['name'], entry['location'],
+                                       'thin')
+            # Some configurations of LVM do not automatically activate
+            # ThinLVM snapshot LVs.
+            self.vg.activate_lv(volume['name'], is_snapshot=True)
+            if volume['size'] > entry['volume_size']:
+                self.vg.extend_volume(volume['name'],
+                                      self._sizestr(volume['size']))
+        return None, True
 
     def backup_volume(self, context, backup, backup_service):
         """Create a new backup from an existing volume."""
@@ -506,12 +718,16 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
                                   'creation for target: %s') % iscsi_name)
         return tid
 
-    def ensure_export(self, context, volume):
+    def _get_export_names(self, volume):
         volume_name = volume['name']
         iscsi_name = "%s%s" % (self.configuration.iscsi_target_prefix,
                                volume_name)
         volume_path = "/dev/%s/%s" % (self.configuration.volume_group,
                                       volume_name)
+        return iscsi_name, volume_path
+
+    def ensure_export(self, context, volume):
+        iscsi_name, volume_path = self._get_export_names(volume)
         # NOTE(jdg): For TgtAdm case iscsi_name is the ONLY param we need
         # should clean this all up at some point in the future
         model_update = self.target_helper.ensure_export(context, volume,
@@ -520,6 +736,12 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
         if model_update:
             self.db.volume_update(context, volume['id'], model_update)
 
+    def ensure_exports(self, context, volumes):
+        exports = [(volume,) + self._get_export_names(volume)
+                   for volume in volumes]
+        return self.target_helper.ensure_exports(
+            context, exports, self.configuration.ensure_export_workers)
+
     def create_export(self, context, volume):
         return self._create_export(context, volume)
 
@@ -105,6 +105,7 @@ class NetAppNFSDriver(nfs.NfsDriver):
             raise exception.CinderException(
                 _("NFS file %s not discovered.") % volume['name'])
 
+        self._update_share_allocation(share, vol_size)
         return {'provider_location': volume['provider_location']}
 
     def create_snapshot(self, snapshot):
@@ -212,6 +213,7 @@ class NetAppNFSDriver(nfs.NfsDriver):
             raise exception.CinderException(
                 _("NFS file %s not discovered.") % volume['name'])
 
+        self._update_share_allocation(share, vol_size)
         return {'provider_location': volume['provider_location']}
 
     def _update_volume_stats(self):
@@ -393,6 +395,9 @@ class NetAppNFSDriver(nfs.NfsDriver):
                                                 image_id)
             if cloned:
                 post_clone = self._post_clone_image(volume)
+            if post_clone:
+                self._update_share_allocation(volume['provider_location'],
+                                              volume['size'])
         except Exception as e:
             msg = e.msg if getattr(e, 'msg', None) else e.__str__()
             LOG.info(_('Image cloning unsuccessful for image'
@@ -611,6 +616,8 @@ class NetAppNFSDriver(nfs.NfsDriver):
         LOG.info(_('Extending volume %s.'), volume['name'])
         path = self.local_path(volume)
         self._resize_image_file(path, new_size)
+        self._update_share_allocation(volume['provider_location'],
+                                      new_size - volume['size'])
 
     def _is_share_vol_compatible(self, volume, share):
         """Checks if share is compatible with volume to host it."""
@@ -783,6 +790,7 @@ class NetAppDirectCmodeNfsDriver (NetAppDirectNfsDriver):
                 volume['provider_location'] = sh
                 LOG.info(_('casted to %s') % volume['provider_location'])
                 self._do_create_volume(volume)
+                self._add_volume_allocation(volume)
                 return {'provider_location': volume['provider_location']}
             except Exception:
                 LOG.warn(_("Exception creating vol %(name)s"
@@ -807,7 +815,7 @@ class NetAppDirectCmodeNfsDriver (NetAppDirectNfsDriver):
             containers = self._mounted_shares
         for sh in containers:
             if self._is_share_eligible(sh, size):
-                size, avl, alloc = self._get_capacity_info(sh)
+                size, avl, alloc = self._get_share_capacity_info(sh)
                 shares.append((sh, avl))
         shares = [a for a, b in sorted(
             shares, key=lambda x: x[1], reverse=True)]
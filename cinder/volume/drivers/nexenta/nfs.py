@@ -178,6 +178,7 @@ class NexentaNfsDriver(nfs.NfsDriver):  # pylint: disable=R0921
                             {'vol': vol, 'folder': folder})
             raise
 
+        self._update_share_allocation(nfs_share, volume['size'])
         return {'provider_location': volume['provider_location']}
 
     def create_cloned_volume(self, volume, src_vref):
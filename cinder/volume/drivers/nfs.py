@@ -16,7 +16,9 @@
 import errno
 import os
 import re
+import time
 
+import eventlet
 from oslo.config import cfg
 
 from cinder.brick.remotefs import remotefs
@@ -58,6 +60,11 @@ volume_opts = [
                default=None,
                help=('Mount options passed to the nfs client. See section '
                      'of the nfs man page for details.')),
+    cfg.IntOpt('nfs_capacity_reconcile_interval',
+               default=600,
+               help=('Seconds between rescans of the space allocated on each '
+                     'nfs share. Allocations made by this driver in between '
+                     'are accounted for without rescanning.')),
 ]
 
 nas_opts = [
@@ -356,7 +363,7 @@ class RemoteFsDriver(driver.VolumeDriver):
         global_capacity = 0
         global_free = 0
         for share in self._mounted_shares:
-            capacity, free, used = self._get_capacity_info(share)
+            capacity, free, used = self._get_share_capacity_info(share)
             global_capacity += capacity
             global_free += free
 
@@ -384,6 +391,10 @@ class RemoteFsDriver(driver.VolumeDriver):
     def _get_capacity_info(self, nfs_share):
         raise NotImplementedError()
 
+    def _get_share_capacity_info(self, nfs_share):
+        """Return the capacity of a share, possibly from a cache."""
+        return self._get_capacity_info(nfs_share)
+
     def _find_share(self, volume_size_in_gib):
         raise NotImplementedError()
 
@@ -404,6 +415,10 @@ class NfsDriver(RemoteFsDriver):
     def __init__(self, execute=putils.execute, *args, **kwargs):
         self._remotefsclient = None
         super(NfsDriver, self).__init__(*args, **kwargs)
+        # share : [total size, available, allocated, time of last scan]
+        self._share_capacity = {}
+        # share : bytes allocated since the running scan of it started
+        self._share_scans = {}
         self.configuration.append_config_values(volume_opts)
         root_helper = utils.get_root_helper()
         # base bound to instance is used in RemoteFsConnector.
@@ -463,6 +478,44 @@ class NfsDriver(RemoteFsDriver):
             else:
                 raise exc
 
+    def create_volume(self, volume):
+        """Creates a volume.
+
+        :param volume: volume reference
+        """
+        model_update = super(NfsDriver, self).create_volume(volume)
+        self._add_volume_allocation(volume)
+        return model_update
+
+    def delete_volume(self, volume):
+        """Deletes a logical volume.
+
+        :param volume: volume reference
+        """
+        super(NfsDriver, self).delete_volume(volume)
+        self._remove_volume_allocation(volume)
+
+    def _add_volume_allocation(self, volume):
+        """Account for a new volume file in the allocation ledger.
+
+        Subclasses overriding create_volume must call this once the volume
+        file exists, clones call _update_share_allocation instead.
+        """
+        self._update_share_allocation(
+            volume['provider_location'], volume['size'],
+            sparse=getattr(self.configuration,
+                           self.driver_prefix + '_sparsed_volumes'))
+
+    def _remove_volume_allocation(self, volume):
+        """Account for a deleted volume in the allocation ledger.
+
+        Subclasses overriding delete_volume without calling it must call
+        this once the volume file is gone.
+        """
+        if volume['provider_location']:
+            self._update_share_allocation(volume['provider_location'],
+                                          -volume['size'])
+
     def _ensure_share_mounted(self, nfs_share):
         mnt_flags = []
         if self.shares.get(nfs_share) is not None:
@@ -488,7 +541,7 @@ class NfsDriver(RemoteFsDriver):
             if not self._is_share_eligible(nfs_share, volume_size_in_gib):
                 continue
             total_size, total_available, total_allocated = \
-                self._get_capacity_info(nfs_share)
+                self._get_share_capacity_info(nfs_share)
             if target_share is not None:
                 if target_share_reserved > total_allocated:
                     target_share = nfs_share
@@ -524,7 +577,7 @@ class NfsDriver(RemoteFsDriver):
         requested_volume_size = volume_size_in_gib * units.GiB
 
         total_size, total_available, total_allocated = \
-            self._get_capacity_info(nfs_share)
+            self._get_share_capacity_info(nfs_share)
         apparent_size = max(0, total_size * oversub_ratio)
         apparent_available = max(0, apparent_size - total_allocated)
         used = (total_size - total_available) / total_size
@@ -568,5 +621,74 @@ class NfsDriver(RemoteFsDriver):
         total_allocated = float(du.split()[0])
         return total_size, total_available, total_allocated
 
+    def _get_share_capacity_info(self, nfs_share):
+        """Return the capacity of the share from the allocation ledger.
+
+        The share is scanned with _get_capacity_info the first time it is
+        looked up. After that the ledger is kept up to date as volumes are
+        created, deleted, extended and cloned, and the share is rescanned in
+        the background every nfs_capacity_reconcile_interval seconds to pick
+        up changes made by others, e.g. volume files growing or snapshots.
+
+        :param nfs_share: example 172.18.194.100:/var/nfs
+        """
+        capacity = self._share_capacity.get(nfs_share)
+        if capacity is None:
+            # Scan the share once, other lookups wait for that scan.
+            @utils.synchronized('nfs-share-capacity-%s' % nfs_share)
+            def _seed_share_capacity():
+                if nfs_share not in self._share_capacity:
+                    self._reconcile_share_capacity(nfs_share)
+
+            _seed_share_capacity()
+            capacity = self._share_capacity[nfs_share]
+        elif (nfs_share not in self._share_scans and
+              time.time() - capacity[3] >
+                self.configuration.nfs_capacity_reconcile_interval):
+            self._share_scans[nfs_share] = 0
+            eventlet.spawn_n(self._reconcile_share_capacity, nfs_share)
+        return tuple(capacity[:3])
+
+    def _reconcile_share_capacity(self, nfs_share):
+        """Rescan a share and replace its entry in the allocation ledger."""
+        self._share_scans.setdefault(nfs_share, 0)
+        try:
+            total_size, total_available, total_allocated = \
+                self._get_capacity_info(nfs_share)
+            # NOTE: allocations made while du was running may or may not have
+            # been counted by it; assume they were not, the next scan will
+            # correct any difference.
+            total_allocated += self._share_scans[nfs_share]
+            self._share_capacity[nfs_share] = [total_size, total_available,
+                                               total_allocated, time.time()]
+        except Exception as exc:
+            if nfs_share not in self._share_capacity:
+                raise
+            LOG.warning(_('Failed to rescan nfs share %(share)s, keeping '
+                          'the previous capacity: %(exc)s') %
+                        {'share': nfs_share, 'exc': exc})
+        finally:
+            self._share_scans.pop(nfs_share, None)
+
+    def _update_share_allocation(self, nfs_share, size_in_gib, sparse=True):
+        """Account for size_in_gib being allocated on a share.
+
+        :param nfs_share: share the allocation was made on
+        :param size_in_gib: size allocated, negative if space was freed
+        :param sparse: whether the space was allocated as a sparse file
+        """
+        if (nfs_share not in self._share_scans and
+                nfs_share not in self._share_capacity):
+            # Not looked up yet, the first lookup scans the share.
+            return
+        size = int(size_in_gib) * units.GiB
+        if nfs_share in self._share_scans:
+            self._share_scans[nfs_share] += size
+        capacity = self._share_capacity.get(nfs_share)
+        if capacity is not None:
+            capacity[2] = max(0, capacity[2] + size)
+            if not sparse:
+                capacity[1] = max(0, capacity[1] - size)
+
     def _get_mount_point_base(self):
         return self.base
@@ -18,12 +18,14 @@ import io
 import json
 import os
 import tempfile
+import time
 import urllib
 
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.image import image_utils
+from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import strutils
@@ -67,7 +69,16 @@ rbd_opts = [
                default=5,
                help='maximum number of nested clones that can be taken of a '
                     'volume before enforcing a flatten prior to next clone. '
-                    'A value of zero disables cloning')]
+                    'A value of zero disables cloning'),
+    cfg.IntOpt('rbd_connection_pool_size',
+               default=4,
+               help='maximum number of connections to the ceph cluster kept '
+                    'open and shared between operations. A value of zero '
+                    'connects for each operation'),
+    cfg.IntOpt('rbd_connection_pool_idle_timeout',
+               default=300,
+               help='number of seconds a pooled connection to the ceph '
+                    'cluster may be unused before it is closed')]
 
 CONF = cfg.CONF
 CONF.register_opts(rbd_opts)
@@ -191,6 +202,109 @@ class RBDImageIOWrapper(io.RawIOBase):
         pass
 
 
+class RADOSConnection(object):
+    """A connection to the ceph cluster held by a RADOSConnectionPool."""
+    def __init__(self, client):
+        self.client = client
+        self.ioctxs = {}
+        self.users = 0
+        self.last_used = time.time()
+        self.broken = False
+
+    def get_ioctx(self, pool):
+        if pool not in self.ioctxs:
+            self.ioctxs[pool] = self.client.open_ioctx(pool)
+        return self.ioctxs[pool]
+
+    def is_usable(self):
+        return (not self.broken and
+                getattr(self.client, 'state', 'connected') == 'connected')
+
+    def close(self):
+        # closing an ioctx cannot raise an exception
+        for ioctx in self.ioctxs.values():
+            ioctx.close()
+        self.ioctxs = {}
+        # shutdown cannot raise an exception
+        self.client.shutdown()
+
+
+class RADOSConnectionPool(object):
+    """A bounded pool of connections to the ceph cluster.
+
+    Connecting to the monitors costs more than most rbd operations, so
+    connections and the ioctxs opened on them are kept and reused. librados
+    clients and ioctxs are thread safe, so once max_size connections are open
+    they are shared between users rather than waited for; this also allows
+    one user to hold several, e.g. when copying between pools.
+
+    Connections which are no longer connected, or which failed to open an
+    ioctx, are discarded. Connections unused for idle_timeout seconds are
+    closed the next time the pool is used.
+    """
+    def __init__(self, connect, max_size, idle_timeout):
+        self._connect = connect
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._connections = []
+        # discarded connections still in use, closed once given back
+        self._retired = []
+
+    def _discard(self, conn):
+        conn.broken = True
+        self._connections.remove(conn)
+        if conn.users:
+            self._retired.append(conn)
+        else:
+            conn.close()
+
+    def _reap(self):
+        now = time.time()
+        for conn in list(self._connections):
+            if not conn.is_usable():
+                self._discard(conn)
+            elif (not conn.users and
+                    now - conn.last_used > self._idle_timeout):
+                LOG.debug(_('closing idle connection to ceph cluster'))
+                self._discard(conn)
+
+    def get(self, pool):
+        """Return a (client, ioctx) tuple for pool.
+
+        Every tuple returned must be given back with put().
+        """
+        self._reap()
+        conn = None
+        if self._connections:
+            conn = min(self._connections, key=lambda c: c.users)
+        if conn is None or (conn.users and
+                            len(self._connections) < self._max_size):
+            conn = RADOSConnection(self._connect())
+            self._connections.append(conn)
+        conn.users += 1
+        try:
+            return conn.client, conn.get_ioctx(pool)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                conn.users -= 1
+                self._discard(conn)
+
+    def put(self, client):
+        """Give back a client returned by get()."""
+        conn = [c for c in self._connections + self._retired
+                if c.client is client][0]
+        conn.users -= 1
+        conn.last_used = time.time()
+        if conn.broken and not conn.users:
+            self._retired.remove(conn)
+            conn.close()
+
+    def close(self):
+        """Close all connections not currently in use."""
+        for conn in list(self._connections):
+            self._discard(conn)
+
+
 class RBDVolumeProxy(object):
     """Context manager for dealing with an existing rbd volume.
 
@@ -253,6 +367,10 @@ class RBDDriver(driver.VolumeDriver):
         # allow overrides for testing
         self.rados = kwargs.get('rados', rados)
         self.rbd = kwargs.get('rbd', rbd)
+        self._rados_pool = RADOSConnectionPool(
+            self._new_rados_client,
+            self.configuration.rbd_connection_pool_size,
+            self.configuration.rbd_connection_pool_idle_timeout)
 
     def check_for_setup_error(self):
         """Returns an error if prerequisites aren't met."""
@@ -275,24 +393,36 @@ class RBDDriver(driver.VolumeDriver):
             args.extend(['--conf', self.configuration.rbd_ceph_conf])
         return args
 
-    def _connect_to_rados(self, pool=None):
+    def _new_rados_client(self):
         ascii_user = ascii_str(self.configuration.rbd_user)
         ascii_conf = ascii_str(self.configuration.rbd_ceph_conf)
         client = self.rados.Rados(rados_id=ascii_user, conffile=ascii_conf)
         try:
             client.connect()
-            pool_to_open = str(pool or self.configuration.rbd_pool)
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
+            return client
         except self.rados.Error:
             # shutdown cannot raise an exception
             client.shutdown()
             raise
 
+    def _connect_to_rados(self, pool=None):
+        pool_to_open = str(pool or self.configuration.rbd_pool)
+        if not self.configuration.rbd_connection_pool_size:
+            client = self._new_rados_client()
+            try:
+                return client, client.open_ioctx(pool_to_open)
+            except self.rados.Error:
+                client.shutdown()
+                raise
+        return self._rados_pool.get(pool_to_open)
+
     def _disconnect_from_rados(self, client, ioctx):
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+        if not self.configuration.rbd_connection_pool_size:
+            # closing an ioctx cannot raise an exception
+            ioctx.close()
+            client.shutdown()
+            return
+        self._rados_pool.put(client)
 
     def _get_backup_snaps(self, rbd_image):
         """Get list of any backup snapshots that exist on this volume.
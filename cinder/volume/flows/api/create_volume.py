@@ -12,7 +12,6 @@
 
 
 from oslo.config import cfg
-import taskflow.engines
 from taskflow.patterns import linear_flow
 from taskflow.utils import misc
 
@@ -34,6 +33,8 @@ CONF = cfg.CONF
 GB = units.GiB
 QUOTAS = quota.QUOTAS
 
+_FLOWS = flow_utils.FlowCache()
+
 # Only in these 'sources' status can we attempt to create a volume from a
 # source volume or a source snapshot, other status states we can not create
 # from, 'error' being the common example.
@@ -59,13 +60,10 @@ class ExtractVolumeRequestTask(flow_utils.CinderTask):
                             'source_volid', 'volume_type', 'volume_type_id',
                             'encryption_key_id'])
 
-    def __init__(self, image_service, az_check_functor=None, **kwargs):
+    def __init__(self, image_service, **kwargs):
         super(ExtractVolumeRequestTask, self).__init__(addons=[ACTION],
                                                        **kwargs)
         self.image_service = image_service
-        self.az_check_functor = az_check_functor
-        if not self.az_check_functor:
-            self.az_check_functor = lambda az: True
 
     @staticmethod
     def _extract_snapshot(snapshot):
@@ -220,7 +218,7 @@ class ExtractVolumeRequestTask(flow_utils.CinderTask):
                 raise exception.InvalidVolumeMetadataSize(reason=msg)
 
     def _extract_availability_zone(self, availability_zone, snapshot,
-                                   source_volume):
+                                   source_volume, az_check_functor=None):
         """Extracts and returns a validated availability zone.
 
         This function will extract the availability zone (if not provided) from
@@ -250,7 +248,7 @@ class ExtractVolumeRequestTask(flow_utils.CinderTask):
             else:
                 # For backwards compatibility use the storage_availability_zone
                 availability_zone = CONF.storage_availability_zone
-        if not self.az_check_functor(availability_zone):
+        if az_check_functor and not az_check_functor(availability_zone):
             msg = _("Availability zone '%s' is invalid") % (availability_zone)
             LOG.warn(msg)
             raise exception.InvalidInput(reason=msg)
@@ -325,7 +323,7 @@ class ExtractVolumeRequestTask(flow_utils.CinderTask):
 
     def execute(self, context, size, snapshot, image_id, source_volume,
                 availability_zone, volume_type, metadata,
-                key_manager, backup_source_volume):
+                key_manager, backup_source_volume, az_check_functor):
 
         utils.check_exclusive_options(snapshot=snapshot,
                                       imageRef=image_id,
@@ -342,7 +340,8 @@ class ExtractVolumeRequestTask(flow_utils.CinderTask):
 
         availability_zone = self._extract_availability_zone(availability_zone,
                                                             snapshot,
-                                                            source_volume)
+                                                            source_volume,
+                                                            az_check_functor)
 
         # TODO(joel-coffman): This special handling of snapshots to ensure that
         # their volume type matches the source volume is too convoluted. We
@@ -591,6 +590,34 @@ class QuotaCommitTask(flow_utils.CinderTask):
                           volume['id'])
 
 
+class SchedulerCastBatch(object):
+    """Collects volume creates for the scheduler to cast them all at once.
+
+    Given to get_flow(), the flow adds its scheduler bound request to the
+    batch instead of casting it; cast() then sends all the collected
+    requests to the scheduler in a single create_volumes call.
+    """
+
+    def __init__(self, scheduler_rpcapi):
+        self.scheduler_rpcapi = scheduler_rpcapi
+        self.request_specs = []
+        self.filter_properties_list = []
+
+    def add(self, request_spec, filter_properties):
+        self.request_specs.append(request_spec)
+        self.filter_properties_list.append(filter_properties)
+
+    def cast(self, context):
+        if not self.request_specs:
+            return
+        self.scheduler_rpcapi.create_volumes(context,
+                                             CONF.volume_topic,
+                                             self.request_specs,
+                                             self.filter_properties_list)
+        self.request_specs = []
+        self.filter_properties_list = []
+
+
 class VolumeCastTask(flow_utils.CinderTask):
     """Performs a volume create cast to the scheduler or to the volume manager.
 
@@ -601,7 +628,7 @@ class VolumeCastTask(flow_utils.CinderTask):
     """
 
     def __init__(self, scheduler_rpcapi, volume_rpcapi, db):
-        requires = ['image_id', 'scheduler_hints', 'snapshot_id',
+        requires = ['batch', 'image_id', 'scheduler_hints', 'snapshot_id',
                     'source_volid', 'volume_id', 'volume_type',
                     'volume_properties']
         super(VolumeCastTask, self).__init__(addons=[ACTION],
@@ -610,7 +637,8 @@ class VolumeCastTask(flow_utils.CinderTask):
         self.scheduler_rpcapi = scheduler_rpcapi
         self.db = db
 
-    def _cast_create_volume(self, context, request_spec, filter_properties):
+    def _cast_create_volume(self, context, request_spec, filter_properties,
+                            batch=None):
         source_volid = request_spec['source_volid']
         volume_id = request_spec['volume_id']
         snapshot_id = request_spec['snapshot_id']
@@ -631,7 +659,11 @@ class VolumeCastTask(flow_utils.CinderTask):
             source_volume_ref = self.db.volume_get(context, source_volid)
             host = source_volume_ref['host']
 
-        if not host:
+        if not host and batch is not None:
+            # The scheduler will place this volume together with the other
+            # volumes of the batch.
+            batch.add(request_spec, filter_properties)
+        elif not host:
             # Cast to the scheduler and let it handle whatever is needed
             # to select the target host for this volume.
             self.scheduler_rpcapi.create_volume(
@@ -659,13 +691,14 @@ class VolumeCastTask(flow_utils.CinderTask):
                 image_id=image_id,
                 source_volid=source_volid)
 
-    def execute(self, context, **kwargs):
+    def execute(self, context, batch, **kwargs):
         scheduler_hints = kwargs.pop('scheduler_hints', None)
         request_spec = kwargs.copy()
         filter_properties = {}
         if scheduler_hints:
             filter_properties['scheduler_hints'] = scheduler_hints
-        self._cast_create_volume(context, request_spec, filter_properties)
+        self._cast_create_volume(context, request_spec, filter_properties,
+                                 batch)
 
     def revert(self, context, result, flow_failures, **kwargs):
         if isinstance(result, misc.Failure):
@@ -682,28 +715,12 @@ class VolumeCastTask(flow_utils.CinderTask):
         LOG.error(_('Unexpected build error:'), exc_info=exc_info)
 
 
-def get_flow(scheduler_rpcapi, volume_rpcapi, db,
-             image_service,
-             az_check_functor,
-             create_what):
-    """Constructs and returns the api entrypoint flow.
-
-    This flow will do the following:
-
-    1. Inject keys & values for dependent tasks.
-    2. Extracts and validates the input keys & values.
-    3. Reserves the quota (reverts quota on any failures).
-    4. Creates the database entry.
-    5. Commits the quota.
-    6. Casts to volume manager or scheduler for further processing.
-    """
-
+def _build_flow(scheduler_rpcapi, volume_rpcapi, db, image_service):
     flow_name = ACTION.replace(":", "_") + "_api"
     api_flow = linear_flow.Flow(flow_name)
 
     api_flow.add(ExtractVolumeRequestTask(
         image_service,
-        az_check_functor,
         rebind={'size': 'raw_size',
                 'availability_zone': 'raw_availability_zone',
                 'volume_type': 'raw_volume_type'}))
@@ -714,6 +731,36 @@ def get_flow(scheduler_rpcapi, volume_rpcapi, db,
     # This will cast it out to either the scheduler or volume manager via
     # the rpc apis provided.
     api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db))
+    return api_flow
+
+
+def get_flow(scheduler_rpcapi, volume_rpcapi, db,
+             image_service,
+             az_check_functor,
+             create_what,
+             batch=None):
+    """Constructs and returns the api entrypoint flow.
+
+    This flow will do the following:
+
+    1. Inject keys & values for dependent tasks.
+    2. Extracts and validates the input keys & values.
+    3. Reserves the quota (reverts quota on any failures).
+    4. Creates the database entry.
+    5. Commits the quota.
+    6. Casts to volume manager or scheduler for further processing, or
+       adds the request to the given SchedulerCastBatch.
+
+    The flow is built once for a set of rpc apis, db and image service and
+    reused by later requests, only the engine is new for each request.
+    """
+
+    api_flow = _FLOWS.get((scheduler_rpcapi, volume_rpcapi, db,
+                           image_service),
+                          lambda: _build_flow(scheduler_rpcapi, volume_rpcapi,
+                                              db, image_service))
+
+    store = dict(create_what, az_check_functor=az_check_functor, batch=batch)
 
     # Now load (but do not run) the flow using the provided initial data.
-    return taskflow.engines.load(api_flow, store=create_what)
+    return flow_utils.load_flow(api_flow, store)
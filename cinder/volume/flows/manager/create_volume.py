@@ -13,7 +13,6 @@
 import traceback
 
 from oslo.config import cfg
-import taskflow.engines
 from taskflow.patterns import linear_flow
 from taskflow.utils import misc
 
@@ -32,6 +31,8 @@ LOG = logging.getLogger(__name__)
 ACTION = 'volume:create'
 CONF = cfg.CONF
 
+_FLOWS = flow_utils.FlowCache()
+
 # These attributes we will attempt to save for the volume if they exist
 # in the source image metadata.
 IMAGE_ATTRIBUTES = (
@@ -52,14 +53,14 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
     this volume elsewhere.
     """
 
-    def __init__(self, reschedule_context, db, scheduler_rpcapi):
+    def __init__(self, db, scheduler_rpcapi):
         requires = ['filter_properties', 'image_id', 'request_spec',
-                    'snapshot_id', 'volume_id', 'context']
+                    'reschedule_context', 'snapshot_id', 'volume_id',
+                    'context']
         super(OnFailureRescheduleTask, self).__init__(addons=[ACTION],
                                                       requires=requires)
         self.scheduler_rpcapi = scheduler_rpcapi
         self.db = db
-        self.reschedule_context = reschedule_context
         # These exception types will trigger the volume to be set into error
         # status rather than being rescheduled.
         self.no_reschedule_types = [
@@ -142,7 +143,8 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
             LOG.exception(_("Volume %s: resetting 'creating' status failed."),
                           volume_id)
 
-    def revert(self, context, result, flow_failures, **kwargs):
+    def revert(self, context, result, flow_failures, reschedule_context,
+               **kwargs):
         # Check if we have a cause which can tell us not to reschedule.
         for failure in flow_failures.values():
             if failure.check(*self.no_reschedule_types):
@@ -150,8 +152,8 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
 
         volume_id = kwargs['volume_id']
         # Use a different context when rescheduling.
-        if self.reschedule_context:
-            context = self.reschedule_context
+        if reschedule_context:
+            context = reschedule_context
             try:
                 cause = list(flow_failures.values())[0]
                 self._pre_reschedule(context, volume_id)
@@ -656,6 +658,22 @@ class CreateVolumeOnFinishTask(NotifyVolumeActionTask):
         })
 
 
+def _build_flow(db, driver, scheduler_rpcapi, host, reschedule):
+    flow_name = ACTION.replace(":", "_") + "_manager"
+    volume_flow = linear_flow.Flow(flow_name)
+
+    volume_flow.add(ExtractVolumeRefTask(db, host))
+
+    if reschedule:
+        volume_flow.add(OnFailureRescheduleTask(db, scheduler_rpcapi))
+
+    volume_flow.add(ExtractVolumeSpecTask(db),
+                    NotifyVolumeActionTask(db, "create.start"),
+                    CreateVolumeFromSpecTask(db, driver),
+                    CreateVolumeOnFinishTask(db, "create.end"))
+    return volume_flow
+
+
 def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
              allow_reschedule, reschedule_context, request_spec,
              filter_properties, snapshot_id=None, image_id=None,
@@ -673,10 +691,16 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
     6. Creates a volume from the extracted volume specification.
     7. Attaches a on-success *only* task that notifies that the volume creation
        has ended and performs further database status updates.
+
+    The flow is built once for a set of db, driver, scheduler rpc api and
+    host (with and without rescheduling) and reused by later requests, only
+    the engine is new for each request.
     """
 
-    flow_name = ACTION.replace(":", "_") + "_manager"
-    volume_flow = linear_flow.Flow(flow_name)
+    reschedule = bool(allow_reschedule and request_spec)
+    volume_flow = _FLOWS.get((db, driver, scheduler_rpcapi, host, reschedule),
+                             lambda: _build_flow(db, driver, scheduler_rpcapi,
+                                                 host, reschedule))
 
     # This injects the initial starting flow values into the workflow so that
     # the dependency order of the tasks provides/requires can be correctly
@@ -686,21 +710,11 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
         'filter_properties': filter_properties,
         'image_id': image_id,
         'request_spec': request_spec,
+        'reschedule_context': reschedule_context,
         'snapshot_id': snapshot_id,
         'source_volid': source_volid,
         'volume_id': volume_id,
     }
 
-    volume_flow.add(ExtractVolumeRefTask(db, host))
-
-    if allow_reschedule and request_spec:
-        volume_flow.add(OnFailureRescheduleTask(reschedule_context,
-                                                db, scheduler_rpcapi))
-
-    volume_flow.add(ExtractVolumeSpecTask(db),
-                    NotifyVolumeActionTask(db, "create.start"),
-                    CreateVolumeFromSpecTask(db, driver),
-                    CreateVolumeOnFinishTask(db, "create.end"))
-
     # Now load (but do not run) the flow using the provided initial data.
-    return taskflow.engines.load(volume_flow, store=create_what)
+    return flow_utils.load_flow(volume_flow, create_what)
@@ -16,6 +16,7 @@
 import os
 import re
 
+from eventlet import greenpool
 from oslo.config import cfg
 
 from cinder.brick import exception
@@ -92,6 +93,26 @@ class _ExportMixin(object):
                        "provisioned for volume: %s"), volume['id'])
             return
         chap_auth = None
+        old_name = self._get_old_name(context, volume)
+        self.create_iscsi_target(iscsi_name, iscsi_target, 0, volume_path,
+                                 chap_auth, check_exit_code=False,
+                                 old_name=old_name)
+
+    def ensure_exports(self, context, exports, workers=1):
+        """Recreate several exports, one at a time.
+
+        :param exports: list of (volume, iscsi_name, volume_path) tuples
+        :returns: dict of volume id: exception for the failed exports
+        """
+        failed = {}
+        for volume, iscsi_name, volume_path in exports:
+            try:
+                self.ensure_export(context, volume, iscsi_name, volume_path)
+            except Exception as ex:
+                failed[volume['id']] = ex
+        return failed
+
+    def _get_old_name(self, context, volume):
         # Check for https://bugs.launchpad.net/cinder/+bug/1065702
         old_name = None
         if (volume['provider_location'] is not None and
@@ -102,9 +123,7 @@ class _ExportMixin(object):
             old_name = self._fix_id_migration(context, volume)
             if 'in-use' in volume['status']:
                 old_name = None
-        self.create_iscsi_target(iscsi_name, iscsi_target, 0, volume_path,
-                                 chap_auth, check_exit_code=False,
-                                 old_name=old_name)
+        return old_name
 
     def _ensure_iscsi_targets(self, context, host):
         """Ensure that target ids have been created in datastore."""
@@ -194,7 +213,50 @@ class _ExportMixin(object):
         return old_name
 
 
-class TgtAdm(_ExportMixin, iscsi.TgtAdm):
+class _TgtAdmExportMixin(_ExportMixin):
+
+    def ensure_exports(self, context, exports, workers=1):
+        """Recreate several exports with a single tgt-admin update.
+
+        Targets which the batch update did not bring up are created again
+        one by one, up to workers at a time.
+        """
+        volumes = {}
+        targets = []
+        for volume, iscsi_name, volume_path in exports:
+            if self._get_target_for_ensure_export(context,
+                                                  volume['id']) is None:
+                LOG.info(_("Skipping ensure_export. No iscsi_target "
+                           "provisioned for volume: %s"), volume['id'])
+                continue
+            volumes[iscsi_name] = volume
+            targets.append((iscsi_name, volume_path, None,
+                            self._get_old_name(context, volume)))
+        try:
+            retry = self.create_iscsi_targets(targets)
+        except Exception:
+            LOG.exception(_("Failed to create iscsi targets in a batch"))
+            retry = targets
+
+        failed = {}
+
+        def _create_target(target):
+            name, path, chap_auth, old_name = target
+            try:
+                self.create_iscsi_target(name, 1, 0, path, chap_auth,
+                                         check_exit_code=False,
+                                         old_name=old_name)
+            except Exception as ex:
+                failed[volumes[name]['id']] = ex
+
+        pool = greenpool.GreenPool(max(1, workers))
+        for target in retry:
+            pool.spawn_n(_create_target, target)
+        pool.waitall()
+        return failed
+
+
+class TgtAdm(_TgtAdmExportMixin, iscsi.TgtAdm):
 
     def _get_target_and_lun(self, context, volume):
         lun = 1  # For tgtadm the controller is lun 0, dev starts at lun 1
@@ -262,5 +324,5 @@ class IetAdm(_ExportMixin, iscsi.IetAdm):
     pass
 
 
-class ISERTgtAdm(_ExportMixin, iscsi.ISERTgtAdm):
+class ISERTgtAdm(_TgtAdmExportMixin, iscsi.ISERTgtAdm):
     pass
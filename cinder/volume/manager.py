@@ -238,6 +238,7 @@ class VolumeManager(manager.SchedulerDependentManager):
         LOG.info(_("Starting volume driver %(driver_name)s (%(version)s)") %
                  {'driver_name': self.driver.__class__.__name__,
                   'version': self.driver.get_version()})
+        start = time.time()
         try:
             self.driver.do_setup(ctxt)
             self.driver.check_for_setup_error()
@@ -249,6 +250,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             # we don't want to continue since we failed
             # to initialize the driver correctly.
             return
+        start = self._log_init_phase('driver setup', start)
 
         volumes = self.db.volume_get_all_by_host(ctxt, self.host)
         LOG.debug(_("Re-exporting %s volumes"), len(volumes))
@@ -256,20 +258,13 @@ class VolumeManager(manager.SchedulerDependentManager):
         try:
             sum = 0
             self.stats.update({'allocated_capacity_gb': sum})
+            exports = []
             for volume in volumes:
                 if volume['status'] in ['in-use']:
                     # calculate allocated capacity for driver
                     sum += volume['size']
                     self.stats['allocated_capacity_gb'] = sum
-                    try:
-                        self.driver.ensure_export(ctxt, volume)
-                    except Exception as export_ex:
-                        LOG.error(_("Failed to re-export volume %s: "
-                                    "setting to error state"), volume['id'])
-                        LOG.exception(export_ex)
-                        self.db.volume_update(ctxt,
-                                              volume['id'],
-                                              {'status': 'error'})
+                    exports.append(volume)
                 elif volume['status'] == 'downloading':
                     LOG.info(_("volume %s stuck in a downloading state"),
                              volume['id'])
@@ -279,6 +274,17 @@ class VolumeManager(manager.SchedulerDependentManager):
                                           {'status': 'error'})
                 else:
                     LOG.info(_("volume %s: skipping export"), volume['id'])
+
+            failed = self.driver.ensure_exports(ctxt, exports)
+            for volume in exports:
+                if volume['id'] in failed:
+                    LOG.error(_("Failed to re-export volume %(id)s: "
+                                "%(error)s: setting to error state"),
+                              {'id': volume['id'],
+                               'error': failed[volume['id']]})
+                    self.db.volume_update(ctxt,
+                                          volume['id'],
+                                          {'status': 'error'})
         except Exception as ex:
             LOG.error(_("Error encountered during "
                         "re-exporting phase of driver initialization: "
@@ -286,6 +292,8 @@ class VolumeManager(manager.SchedulerDependentManager):
                       {'name': self.driver.__class__.__name__})
             LOG.exception(ex)
             return
+        start = self._log_init_phase('re-export of %d volumes' %
+                                     len(exports), start)
 
         # at this point the driver is considered initialized.
         self.driver.set_initialized()
@@ -303,9 +311,18 @@ class VolumeManager(manager.SchedulerDependentManager):
                 else:
                     # By default, delete volumes sequentially
                     self.delete_volume(ctxt, volume['id'])
+        start = self._log_init_phase('resuming deletes', start)
 
         # collect and publish service capabilities
         self.publish_service_capabilities(ctxt)
+        self._log_init_phase('publishing capabilities', start)
+
+    def _log_init_phase(self, phase, start):
+        """Log how long a phase of init_host took and return the time."""
+        now = time.time()
+        LOG.info(_("init_host: %(phase)s took %(seconds).2f seconds"),
+                 {'phase': phase, 'seconds': now - start})
+        return now
 
     def create_volume(self, context, volume_id, request_spec=None,
                       filter_properties=None, allow_reschedule=True,
@@ -445,7 +462,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             QUOTAS.commit(context, reservations, project_id=project_id)
 
         self.stats['allocated_capacity_gb'] -= volume_ref['size']
-        self.publish_service_capabilities(context)
+        self.publish_service_capabilities(context, full=False)
 
         return True
 
@@ -1100,10 +1117,10 @@ class VolumeManager(manager.SchedulerDependentManager):
                 # queue it to be sent to the Schedulers.
                 self.update_service_capabilities(volume_stats)
 
-    def publish_service_capabilities(self, context):
+    def publish_service_capabilities(self, context, full=True):
         """Collect driver status and then publish."""
         self._report_driver_status(context)
-        self._publish_service_capabilities(context)
+        self._publish_service_capabilities(context, full=full)
 
     def notification(self, context, event):
         LOG.info(_("Notification {%s} received"), event)
@@ -1276,7 +1293,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             QUOTAS.commit(context, old_reservations, project_id=project_id)
         if new_reservations:
             QUOTAS.commit(context, new_reservations, project_id=project_id)
-        self.publish_service_capabilities(context)
+        self.publish_service_capabilities(context, full=False)
 
     def manage_existing(self, ctxt, volume_id, ref=None):
         LOG.debug('manage_existing: managing %s' % ref)
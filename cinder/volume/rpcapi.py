@@ -124,8 +124,11 @@ class VolumeAPI(object):
         return cctxt.call(ctxt, 'terminate_connection', volume_id=volume['id'],
                           connector=connector, force=force)
 
-    def publish_service_capabilities(self, ctxt):
-        cctxt = self.client.prepare(fanout=True, version='1.2')
+    def publish_service_capabilities(self, ctxt, host=None):
+        if host:
+            cctxt = self.client.prepare(server=host, version='1.2')
+        else:
+            cctxt = self.client.prepare(fanout=True, version='1.2')
         cctxt.cast(ctxt, 'publish_service_capabilities')
 
     def accept_transfer(self, ctxt, volume, new_user, new_project):
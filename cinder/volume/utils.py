@@ -16,11 +16,14 @@
 
 
 import math
+import os
+import stat
 
 from oslo.config import cfg
 
 from cinder.brick.local_dev import lvm as brick_lvm
 from cinder import exception
+from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
 from cinder.openstack.common import strutils
@@ -127,17 +130,56 @@ def _calculate_count(size_in_m, blocksize):
     return blocksize, int(count)
 
 
-def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
-                execute=utils.execute, ionice=None):
-    # Use O_DIRECT to avoid thrashing the system buffer cache
-    extra_flags = ['iflag=direct', 'oflag=direct']
+# Exit codes meaning the command could not be run at all: rootwrap's
+# "no executable found" and "unauthorized command", and the shell's
+# "command not found".
+_COMMAND_UNAVAILABLE = (96, 99, 127)
+
+# Whether the cinder-volume-copy helper could be run, once tried.
+_native_copy_available = None
+
+# O_DIRECT support found by dd, per pair of devices.
+_odirect_support = {}
 
-    # Check whether O_DIRECT is supported
+
+def _get_device_key(path):
+    """Identify the device, or the filesystem, that path lives on."""
     try:
-        execute('dd', 'count=0', 'if=%s' % srcstr, 'of=%s' % deststr,
-                *extra_flags, run_as_root=True)
-    except processutils.ProcessExecutionError:
-        extra_flags = []
+        st = os.stat(path)
+    except OSError:
+        path = os.path.dirname(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return path
+    if stat.S_ISBLK(st.st_mode) or stat.S_ISCHR(st.st_mode):
+        return ('dev', st.st_rdev)
+    return ('fs', st.st_dev)
+
+
+def check_for_odirect_support(src, dest, execute=utils.execute):
+    """Check whether dd can use O_DIRECT between src and dest.
+
+    The result is cached per pair of devices, as every volume of a backend
+    lives on the same kind of device.
+    """
+    key = (_get_device_key(src), _get_device_key(dest))
+    if key not in _odirect_support:
+        try:
+            execute('dd', 'count=0', 'if=%s' % src, 'of=%s' % dest,
+                    'iflag=direct', 'oflag=direct', run_as_root=True)
+            _odirect_support[key] = True
+        except processutils.ProcessExecutionError:
+            _odirect_support[key] = False
+    return _odirect_support[key]
+
+
+def _copy_volume_with_dd(srcstr, deststr, size_in_m, blocksize, sync,
+                         execute, ionice, offset_in_m):
+    # Use O_DIRECT to avoid thrashing the system buffer cache
+    extra_flags = []
+    if check_for_odirect_support(srcstr, deststr, execute=execute):
+        extra_flags = ['iflag=direct', 'oflag=direct']
 
     # If the volume is being unprovisioned then
     # request the data is persisted before returning,
@@ -149,6 +191,10 @@ def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
 
     cmd = ['dd', 'if=%s' % srcstr, 'of=%s' % deststr,
            'count=%d' % count, 'bs=%s' % blocksize]
+    if offset_in_m:
+        offset = int(offset_in_m * units.MiB)
+        cmd.extend(['skip=%d' % offset, 'seek=%d' % offset,
+                    'iflag=skip_bytes', 'oflag=seek_bytes'])
     cmd.extend(extra_flags)
 
     if ionice is not None:
@@ -158,9 +204,87 @@ def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
     execute(*cmd, run_as_root=True)
 
 
+def _copy_volume_native(srcstr, deststr, size_in_m, blocksize, sync,
+                        execute, ionice, sparse, offset_in_m, discard):
+    blocksize, _count = _calculate_count(size_in_m, blocksize)
+    cmd = ['cinder-volume-copy', srcstr, deststr,
+           str(int(size_in_m * units.MiB)),
+           '--blocksize=%d' % strutils.string_to_bytes('%sB' % blocksize)]
+    if offset_in_m:
+        cmd.append('--offset=%d' % int(offset_in_m * units.MiB))
+    if sparse:
+        cmd.append('--sparse')
+    if sync:
+        cmd.append('--sync')
+    if discard:
+        cmd.append('--discard')
+
+    if ionice is not None:
+        cmd = ['ionice', ionice] + cmd
+
+    (out, err) = execute(*cmd, run_as_root=True)
+    try:
+        stats = jsonutils.loads(out)
+    except (TypeError, ValueError):
+        return
+    seconds = max(stats['seconds'], 0.001)
+    LOG.info(_("Copied %(size)d MiB from %(src)s to %(dest)s in "
+               "%(seconds).2f seconds (%(rate).1f MiB/s, %(skipped)d MiB "
+               "of zeroes skipped, O_DIRECT: %(direct)s)") %
+             {'size': stats['bytes'] / units.MiB,
+              'src': srcstr,
+              'dest': deststr,
+              'seconds': seconds,
+              'rate': stats['bytes'] / units.MiB / seconds,
+              'skipped': stats['skipped'] / units.MiB,
+              'direct': stats['direct']})
+
+
+def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
+                execute=utils.execute, ionice=None, sparse=False,
+                offset_in_m=0, discard=False):
+    """Copy size_in_m MiB of data from srcstr to deststr.
+
+    :param sync: flush the data to disk before returning
+    :param ionice: ionice class option to run the copy with, e.g. -c3
+    :param sparse: skip writing blocks of zeroes, only for destinations
+                   which read back zeroes, like newly created thin LVs
+    :param offset_in_m: MiB to skip at the start of source and destination
+    :param discard: when copying /dev/zero, allow the native helper to
+                    discard the blocks of devices which then read zeroes
+    """
+    global _native_copy_available
+    if (CONF.volume_copy_method == 'native' and
+            _native_copy_available is not False):
+        try:
+            _copy_volume_native(srcstr, deststr, size_in_m, blocksize, sync,
+                                execute, ionice, sparse, offset_in_m,
+                                discard)
+            _native_copy_available = True
+            return
+        except processutils.ProcessExecutionError as e:
+            if (_native_copy_available or
+                    e.exit_code not in _COMMAND_UNAVAILABLE):
+                raise
+            LOG.warn(_("Unable to run cinder-volume-copy, falling back to "
+                       "dd. Check that the rootwrap filters allow it: %s")
+                     % e)
+            _native_copy_available = False
+
+    _copy_volume_with_dd(srcstr, deststr, size_in_m, blocksize, sync,
+                         execute, ionice, offset_in_m)
+
+
 def clear_volume(volume_size, volume_path, volume_clear=None,
-                 volume_clear_size=None, volume_clear_ionice=None):
-    """Unprovision old volumes to prevent data leaking between users."""
+                 volume_clear_size=None, volume_clear_ionice=None,
+                 offset_in_m=0):
+    """Unprovision old volumes to prevent data leaking between users.
+
+    With volume_clear 'zero' and the native copy method, devices are
+    zeroed with BLKDISCARD or BLKZEROOUT where they support it, rather
+    than by writing out every block.  offset_in_m starts clearing part way
+    into the volume, which only 'zero' supports.
+    """
     if volume_clear is None:
         volume_clear = CONF.volume_clear
 
@@ -179,7 +303,11 @@ def clear_volume(volume_size, volume_path, volume_clear=None,
         return copy_volume('/dev/zero', volume_path, volume_clear_size,
                            CONF.volume_dd_blocksize,
                            sync=True, execute=utils.execute,
-                           ionice=volume_clear_ionice)
+                           ionice=volume_clear_ionice,
+                           offset_in_m=offset_in_m, discard=True)
+    elif offset_in_m:
+        raise exception.InvalidParameterValue(
+            err=_('Only volume_clear zero can start at an offset'))
     elif volume_clear == 'shred':
         clear_cmd = ['shred', '-n3']
         if volume_clear_size:
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the locking and the optimistic quota drivers under concurrency.
+
+Runs greenthreads which repeatedly reserve and commit quota in a single
+project, like concurrent volume creations, against each quota driver.
+
+    python tools/benchmarks/quota_reserve.py [--connection URL]
+        [--threads N] [--iterations N]
+
+Without --connection a temporary sqlite database is used.  Note that
+sqlite serializes writers and its driver blocks the whole process, so
+the contention the optimistic driver avoids only shows on a server
+database such as MySQL.
+"""
+
+from __future__ import print_function
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from oslo.config import cfg
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder.common import config  # noqa
+from cinder import context
+from cinder import db
+from cinder.db import migration
+from cinder import exception
+from cinder import quota
+
+
+CONF = cfg.CONF
+CONF.import_opt('connection', 'cinder.openstack.common.db.sqlalchemy.session',
+                group='database')
+DRIVERS = ['cinder.quota.DbQuotaDriver',
+           'cinder.quota.OptimisticDbQuotaDriver']
+
+
+def _worker(engine, ctxt, iterations, latencies, errors):
+    for _i in range(iterations):
+        start = time.time()
+        try:
+            reservations = engine.reserve(ctxt, volumes=1, gigabytes=1)
+            engine.commit(ctxt, reservations)
+            reservations = engine.reserve(ctxt, volumes=-1, gigabytes=-1)
+            engine.commit(ctxt, reservations)
+        except exception.CinderException as e:
+            errors.append(e)
+        latencies.append(time.time() - start)
+
+
+def _run(driver, project_id, threads, iterations):
+    engine = quota.VolumeTypeQuotaEngine(quota_driver_class=driver)
+    ctxt = context.RequestContext('fake', project_id, is_admin=False)
+    admin = context.get_admin_context()
+    for resource in ('volumes', 'gigabytes'):
+        db.quota_create(admin, project_id, resource, threads * 2)
+    # Create the usages up front, as existing projects have them.
+    engine.commit(ctxt, engine.reserve(ctxt, volumes=0, gigabytes=0))
+
+    latencies = []
+    errors = []
+    pool = eventlet.GreenPool(threads)
+    start = time.time()
+    for _i in range(threads):
+        pool.spawn_n(_worker, engine, ctxt, iterations, latencies, errors)
+    pool.waitall()
+    elapsed = time.time() - start
+
+    latencies.sort()
+    return (len(latencies) * 2 / elapsed,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000,
+            len(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connection')
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    CONF([], project='cinder')
+    tmpdir = None
+    if args.connection is None:
+        tmpdir = tempfile.mkdtemp()
+        args.connection = 'sqlite:///%s' % os.path.join(tmpdir, 'cinder.db')
+    CONF.set_override('connection', args.connection, 'database')
+    try:
+        migration.db_sync()
+        print('%40s %10s %10s %10s %8s' % ('driver', 'reserve/s', 'p50 ms',
+                                           'p99 ms', 'errors'))
+        for i, driver in enumerate(DRIVERS):
+            print('%40s %10.1f %10.2f %10.2f %8d' % (
+                (driver,) + _run(driver, 'bench-%d-%d' % (os.getpid(), i),
+                                 args.threads, args.iterations)))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
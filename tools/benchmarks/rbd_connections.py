@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the cost of RADOS connections in the RBD volume driver.
+
+Runs stats updates and volume creations through RBDDriver against fake
+rados and rbd modules whose calls sleep for a configurable time, with the
+connection pool disabled and enabled.
+
+    python tools/benchmarks/rbd_connections.py [--connect-ms N]
+        [--op-ms N] [--iterations N] [--pool-sizes N [N ...]]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from oslo.config import cfg
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder.volume import configuration
+from cinder.volume.drivers import rbd as rbd_driver
+
+
+CONF = cfg.CONF
+
+
+class FakeRados(object):
+    """Fake rados module, counting the connections made."""
+
+    class Error(Exception):
+        pass
+
+    def __init__(self, connect_latency, op_latency):
+        self.connections = 0
+        fake = self
+
+        class Rados(object):
+            def __init__(self, rados_id=None, conffile=None):
+                self.state = 'configuring'
+
+            def connect(self):
+                # librados blocks the whole process while connecting.
+                time.sleep(connect_latency)
+                fake.connections += 1
+                self.state = 'connected'
+
+            def open_ioctx(self, pool):
+                return FakeIoctx()
+
+            def get_cluster_stats(self):
+                time.sleep(op_latency)
+                return {'kb': 1024 ** 3, 'kb_avail': 1024 ** 3}
+
+            def shutdown(self):
+                self.state = 'shutdown'
+
+        self.Rados = Rados
+
+
+class FakeIoctx(object):
+
+    def close(self):
+        pass
+
+
+class FakeRbd(object):
+    """Fake rbd module."""
+
+    RBD_FEATURE_LAYERING = 1
+
+    class Error(Exception):
+        pass
+
+    def __init__(self, op_latency):
+        class RBD(object):
+            def create(self, ioctx, name, size, old_format=True,
+                       features=0):
+                time.sleep(op_latency)
+
+        self.RBD = RBD
+
+
+def _run(driver, iterations):
+    start = time.time()
+    for i in range(iterations):
+        driver._update_volume_stats()
+        driver.create_volume({'name': 'volume-%d' % i, 'size': 1})
+    return (time.time() - start) / (iterations * 2) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connect-ms', type=float, default=50)
+    parser.add_argument('--op-ms', type=float, default=2)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[0, 4])
+    args = parser.parse_args()
+
+    CONF([], project='cinder')
+    print('%10s %12s %12s' % ('pool size', 'mean op ms', 'connections'))
+    for pool_size in args.pool_sizes:
+        CONF.set_override('rbd_connection_pool_size', pool_size)
+        fake_rados = FakeRados(args.connect_ms / 1000.0, args.op_ms / 1000.0)
+        driver = rbd_driver.RBDDriver(
+            configuration=configuration.Configuration(rbd_driver.rbd_opts),
+            rados=fake_rados, rbd=FakeRbd(args.op_ms / 1000.0))
+        latency = _run(driver, args.iterations)
+        print('%10d %12.2f %12d' % (pool_size, latency,
+                                    fake_rados.connections))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare commands run as root through sudo and the rootwrap daemon.
+
+Runs the same command as root through utils.execute, first with a new
+sudo cinder-rootwrap for each command, then through cinder-rootwrap-daemon,
+and prints the commands run per second.
+
+    python tools/benchmarks/rootwrap_daemon.py [--config-file FILE]
+        [--iterations N] [-- COMMAND ...]
+
+Needs the sudoers entries of cinder-rootwrap and cinder-rootwrap-daemon
+for the user running it, and a command allowed by the rootwrap filters;
+the default is the lvs run by the LVM driver.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from oslo.config import cfg
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder import utils
+
+
+CONF = cfg.CONF
+
+
+def _run(command, iterations):
+    start = time.time()
+    for _i in range(iterations):
+        utils.execute(*command, run_as_root=True)
+    return iterations / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config-file', default='/etc/cinder/cinder.conf')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('command', nargs='*',
+                        default=['env', 'LC_ALL=C', 'lvs', '--version'])
+    args = parser.parse_args()
+
+    CONF(['--config-file', args.config_file], project='cinder')
+    print('%10s %14s' % ('path', 'commands/s'))
+    for use_daemon in (False, True):
+        CONF.set_override('use_rootwrap_daemon', use_daemon)
+        if use_daemon:
+            # Start the daemon outside of the measurement.
+            utils.execute(*args.command, run_as_root=True)
+        rate = _run(args.command, args.iterations)
+        print('%10s %14.1f' % ('daemon' if use_daemon else 'sudo', rate))
+
+
+if __name__ == '__main__':
+    main()
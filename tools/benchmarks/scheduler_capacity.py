@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare per-host and batch capacity filtering and weighing.
+
+Runs CapacityFilter, CapacityWeigher and AllocatedCapacityWeigher over
+synthetic host states through both the per-host and the batch handlers.
+
+    python tools/benchmarks/scheduler_capacity.py [hosts ...]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import timeit
+
+from oslo.config import cfg
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder.openstack.common.scheduler import filters
+from cinder.openstack.common.scheduler import weights
+from cinder.scheduler import filters as batch_filters
+from cinder.scheduler.filters import capacity_filter
+from cinder.scheduler import host_manager
+from cinder.scheduler import weights as batch_weights
+from cinder.scheduler.weights import capacity
+
+
+FILTER_CLASSES = [capacity_filter.CapacityFilter]
+WEIGHER_CLASSES = [capacity.CapacityWeigher,
+                   capacity.AllocatedCapacityWeigher]
+
+
+def _make_hosts(count):
+    hosts = []
+    for i in range(count):
+        host_state = host_manager.HostState('host%d' % i)
+        host_state.total_capacity_gb = random.choice([1024, 2048, 4096])
+        host_state.free_capacity_gb = random.choice(
+            [random.randint(0, host_state.total_capacity_gb)] * 8 +
+            ['infinite', 'unknown'])
+        host_state.allocated_capacity_gb = random.randint(0, 4096)
+        host_state.reserved_percentage = random.choice([0, 5, 10])
+        hosts.append(host_state)
+    return hosts
+
+
+def _schedule(filter_handler, weight_handler, hosts):
+    properties = {'size': 100}
+    hosts = filter_handler.get_filtered_objects(FILTER_CLASSES, hosts,
+                                                properties)
+    return weight_handler.get_weighed_objects(WEIGHER_CLASSES, hosts,
+                                              properties)
+
+
+def main(argv):
+    cfg.CONF([], project='cinder')
+    # Keep the per-host warnings of CapacityFilter out of the timings.
+    capacity_filter.LOG.logger.disabled = True
+
+    counts = [int(arg) for arg in argv] or [10, 1000, 10000]
+    modes = [('per-host', filters.HostFilterHandler,
+              weights.HostWeightHandler),
+             ('batch', batch_filters.BatchHostFilterHandler,
+              batch_weights.BatchHostWeightHandler)]
+
+    print('%8s %10s %12s %12s' % ('hosts', 'mode', 'ms/request', 'speedup'))
+    for count in counts:
+        hosts = _make_hosts(count)
+        number = max(1, 100000 // count)
+        baseline = None
+        for name, filter_handler_cls, weight_handler_cls in modes:
+            filter_handler = filter_handler_cls('cinder.scheduler.filters')
+            weight_handler = weight_handler_cls('cinder.scheduler.weights')
+            elapsed = min(timeit.repeat(
+                lambda: _schedule(filter_handler, weight_handler, hosts),
+                number=number, repeat=3)) / number * 1000
+            baseline = baseline or elapsed
+            print('%8d %10s %12.3f %11.2fx' % (count, name, elapsed,
+                                               baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
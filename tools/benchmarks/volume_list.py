@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the latency of the v2 volume list API.
+
+Creates volumes with metadata, admin metadata and image metadata in one
+project, then times GET /v2/<project>/volumes and /volumes/detail
+through the v2 API router (so the enabled extensions run too) and counts
+the SQL statements each request issues.
+
+    python tools/benchmarks/volume_list.py [--connection URL]
+        [--volumes N [N ...]] [--repeat N]
+
+Without --connection a temporary sqlite database is used.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from oslo.config import cfg
+from sqlalchemy import event
+
+from cinder.openstack.common import gettextutils
+gettextutils.install('cinder')
+
+from cinder.api.openstack import wsgi
+from cinder.api.v2 import router
+from cinder.common import config  # noqa
+from cinder import context
+from cinder import db
+from cinder.db import migration
+from cinder.db.sqlalchemy import api as sqlalchemy_api
+from cinder.db.sqlalchemy import models
+from cinder import rpc
+
+
+CONF = cfg.CONF
+CONF.import_opt('connection', 'cinder.openstack.common.db.sqlalchemy.session',
+                group='database')
+CONF.import_opt('policy_file', 'cinder.policy')
+PROJECT_ID = 'bench'
+STATEMENTS = []
+TOP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir, os.pardir))
+
+
+def _create_volumes(count, volume_type_id):
+    session = sqlalchemy_api.get_session()
+    with session.begin():
+        for i in xrange(count):
+            volume_id = str(uuid.uuid4())
+            session.add(models.Volume(id=volume_id, project_id=PROJECT_ID,
+                                      user_id='bench',
+                                      display_name='vol-%d' % i, size=1,
+                                      status='available',
+                                      volume_type_id=volume_type_id))
+            session.add(models.VolumeMetadata(volume_id=volume_id,
+                                              key='index', value=str(i)))
+            session.add(models.VolumeAdminMetadata(volume_id=volume_id,
+                                                   key='readonly',
+                                                   value='False'))
+            session.add(models.VolumeGlanceMetadata(volume_id=volume_id,
+                                                    key='image_id',
+                                                    value='image-%d' % i))
+
+
+def _time_request(app, path, repeat):
+    latencies = []
+    for _i in range(repeat):
+        req = wsgi.Request.blank(path, base_url='http://localhost/v2')
+        req.environ['cinder.context'] = context.RequestContext(
+            'bench', PROJECT_ID, is_admin=False)
+        del STATEMENTS[:]
+        start = time.time()
+        res = req.get_response(app)
+        latencies.append(time.time() - start)
+        assert res.status_int == 200, res.body
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, len(STATEMENTS)
+
+
+def _count_statement(*args, **kwargs):
+    STATEMENTS.append(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connection')
+    parser.add_argument('--volumes', type=int, nargs='+',
+                        default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    CONF([], project='cinder')
+    CONF.set_override('policy_file',
+                      os.path.join(TOP_DIR, 'etc', 'cinder', 'policy.json'))
+    CONF.set_override('osapi_max_limit', max(args.volumes))
+    # The API controllers create RPC clients, though listing never casts.
+    rpc.init(CONF)
+    tmpdir = None
+    if args.connection is None:
+        tmpdir = tempfile.mkdtemp()
+        args.connection = 'sqlite:///%s' % os.path.join(tmpdir, 'cinder.db')
+    CONF.set_override('connection', args.connection, 'database')
+    try:
+        migration.db_sync()
+        event.listen(sqlalchemy_api.get_engine(), 'before_cursor_execute',
+                     _count_statement)
+        volume_type = db.volume_type_create(context.get_admin_context(),
+                                            {'name': 'bench'})
+        app = router.APIRouter()
+        print('%8s %8s %12s %8s' % ('volumes', 'view', 'p50 ms', 'queries'))
+        created = 0
+        for count in sorted(args.volumes):
+            _create_volumes(count - created, volume_type['id'])
+            created = count
+            for view, path in (('index', '/%s/volumes' % PROJECT_ID),
+                               ('detail', '/%s/volumes/detail' % PROJECT_ID)):
+                print('%8d %8s %12.1f %8d' % (
+                    (count, view) + _time_request(app, path, args.repeat)))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()